@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+from server.batch_processor import BatchProcessor, calibrate_board
+from tracking.detectors import registry
+
+
+def main():
+
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Runs a detector over the frames of a recorded session, a directory of images or a video file using a pool of processes, and writes the results as JSON lines.')
+    parser.add_argument('detector', help='Detector: %s' % ", ".join(sorted(registry.detector_factories.keys())))
+    parser.add_argument('source', help='Recorded session directory, directory of images or video file')
+    parser.add_argument('-o', '--output', default='-', help='JSON lines output file. Defaults to stdout')
+    parser.add_argument('--options', default='{}', help='Detector options as JSON, fx. \'{"sourceImage": "image.png"}\'')
+    parser.add_argument('-p', '--processes', type=int, help='Number of worker processes. Defaults to the number of CPUs')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Consecutive frames per task. Defaults to 16')
+    parser.add_argument('--start', type=int, default=0, help='First frame. Defaults to 0')
+    parser.add_argument('--end', type=int, help='Frame to stop before. Defaults to all frames')
+    parser.add_argument('--corners', help='Board corners as JSON [[x, y], ...] (top left, bottom left, bottom right, top right) to warp all frames with, instead of the corners recorded in a session')
+    parser.add_argument('--calibrate', nargs='?', const='resources/calibration/board_calibration.png', help='Detect board corners in the first frames, optionally with the given board calibration image')
+    args = parser.parse_args()
+
+    # Find board corners
+    corners = json.loads(args.corners) if args.corners is not None else None
+
+    if args.calibrate is not None:
+        corners = calibrate_board(args.source, board_image_filename=args.calibrate)
+        if corners is None:
+            print('Board not found in %s' % args.source, file=sys.stderr)
+            sys.exit(1)
+        print('Board corners: %s' % corners, file=sys.stderr)
+
+    # Process frames
+    processor = BatchProcessor(args.source, args.detector, json.loads(args.options), corners=corners,
+                               processes=args.processes, chunk_size=args.chunk_size)
+
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        stats = processor.run(output_file, start=args.start, end=args.end)
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print('%i frames processed in %.1f seconds (%.1f frames/s) by %i processes, %i errors' %
+          (stats["frames"], stats["duration"], stats["framesPerSecond"], stats["processes"], stats["errors"]), file=sys.stderr)
+
+    if stats["errors"] > 0:
+        sys.exit(1)
+
+
+# Worker processes may be spawned, and import this module without processing
+if __name__ == "__main__":
+    main()
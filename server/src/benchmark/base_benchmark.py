@@ -0,0 +1,101 @@
+import collections
+import contextlib
+import sys
+import time
+import tracemalloc
+
+from util import metrics
+
+
+class BaseBenchmark(object):
+    """
+    Base class for detector benchmarks.
+
+    Resources are loaded once in prepare. Each benchmark function returned by get_benchmarks runs a single iteration,
+    and is timed over many iterations after a few warmup iterations. Stages within an iteration can be timed with
+    stage, and all metrics recorded by the code under benchmark (fx. board warp and image conversion) are included
+    in the result.
+    """
+
+    def run(self, iterations=30, warmup_iterations=3):
+        """
+        Runs all benchmarks of this class.
+
+        :param iterations: Number of timed iterations per benchmark
+        :param warmup_iterations: Number of untimed iterations per benchmark, run before the timed ones
+        :return: {benchmark name: result}
+        """
+        print('\nBenchmark class: %s' % type(self).__name__)
+
+        self.prepare()
+
+        results = collections.OrderedDict()
+
+        for f in self.get_benchmarks():
+            print('Running benchmark: %s... ' % f.__name__, end='')
+            sys.stdout.flush()
+
+            result = self.run_benchmark(f, iterations, warmup_iterations)
+            results["%s.%s" % (type(self).__name__, f.__name__)] = result
+
+            print('p50 %.2f ms, p95 %.2f ms, peak memory %.1f MB' % (result["latency"]["p50"] * 1000.0,
+                                                                     result["latency"]["p95"] * 1000.0,
+                                                                     result["peakMemoryBytes"] / (1024.0 * 1024.0)))
+
+        return results
+
+    def run_benchmark(self, f, iterations, warmup_iterations):
+        """
+        Runs a single benchmark.
+
+        :param f: Benchmark function running a single iteration
+        :param iterations: Number of timed iterations
+        :param warmup_iterations: Number of untimed iterations
+        :return: {iterations, latency, stages, metrics, peakMemoryBytes}
+        """
+        for _ in range(0, warmup_iterations):
+            f()
+
+        # Time iterations
+        metrics.get_metrics().reset()
+
+        latency = metrics.Histogram(window_size=max(iterations, 1))
+        for _ in range(0, iterations):
+            start_time = time.perf_counter()
+            f()
+            latency.record(time.perf_counter() - start_time)
+
+        stats = metrics.get_metrics().stats()
+        stages = stats.pop("benchmark_stage_seconds", {})
+
+        # Measure peak memory in a separate iteration, as tracing allocations slows down the code under benchmark
+        tracemalloc.start()
+        try:
+            f()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {"iterations": iterations,
+                "latency": latency.stats(),
+                "stages": {stage[len("stage="):]: stage_stats for stage, stage_stats in stages.items()},
+                "metrics": stats,
+                "peakMemoryBytes": peak_memory}
+
+    def prepare(self):
+        pass
+
+    def get_benchmarks(self):
+        return []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Times a stage of a benchmark iteration.
+
+        Usage:
+            with self.stage("calibration"):
+                ...
+        """
+        with metrics.get_metrics().timer("benchmark_stage_seconds", stage=name):
+            yield
@@ -0,0 +1,31 @@
+import cv2
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.calibrators.board_calibrator import BoardCalibrator
+
+
+class BoardDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+        self.board_calibrator = BoardCalibrator(board_image_filename='test/resources/board_detection/board_detection_source.png')
+
+        self.images = [cv2.imread(filename) for filename in [
+            'test/resources/board_detection/board_detection_1.jpg',
+            'test/resources/board_detection/board_detection_2.jpg',
+            'test/resources/board_detection/board_detection_3.jpg',
+            'test/resources/board_detection/board_detection_4.jpg'
+        ]]
+
+    def get_benchmarks(self):
+        return [
+            self.detection_benchmark
+        ]
+
+    def detection_benchmark(self):
+        for image in self.images:
+
+            # Features are found in the grayscale image
+            with self.stage("convert"):
+                grayscale_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+            with self.stage("detect"):
+                self.board_calibrator.detect(grayscale_image)
@@ -0,0 +1,35 @@
+import cv2
+import json
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.detectors.colored_brick_detector import ColoredBrickDetector
+from tracking.util.derived_image_cache import DerivedImageCache, ImageColorspace, mean_shift_filtering
+
+
+class ColoredBrickDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+
+        # Load test images from JSON
+        with open('test/resources/colored_brick_detection/tests.json') as f:
+            tests = json.load(f)
+
+        self.images = [cv2.imread(test_dict["image"]) for test_dict in tests]
+
+        self.colored_brick_detector = ColoredBrickDetector(detector_id=0)
+
+    def get_benchmarks(self):
+        return [
+            self.detection_benchmark
+        ]
+
+    def detection_benchmark(self):
+        for image in self.images:
+
+            # Mean shift filtered images, shared between detectors through the derived images of a board area
+            with self.stage("convert"):
+                derived_images = DerivedImageCache(image)
+                derived_images.image(ImageColorspace.BGR, mean_shift_filtering(21, 51))
+                derived_images.image(ImageColorspace.HSV, mean_shift_filtering(21, 51))
+
+            with self.stage("detect"):
+                self.colored_brick_detector.detect_in_image(image, derived_images=derived_images)
@@ -0,0 +1,56 @@
+import cv2
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.board.board_snapshot import resize_to_snapshot_size
+from tracking.calibrators.hand_calibrator import HandCalibrator
+from tracking.detectors.hand_detector import HandDetector
+from tracking.util.derived_image_cache import DerivedImageCache, ImageColorspace, gaussian_blur
+
+
+class HandDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+        image_filenames = ['test/resources/hand_detection/hand_detection_%i' % i for i in range(1, 6)]
+
+        self.calibration_images = []
+        self.detectors = []
+
+        for i, image_filename in enumerate(image_filenames):
+            calibration_image = cv2.imread("%s_calibration.png" % image_filename)
+            test_image = cv2.imread("%s_test.png" % image_filename)
+
+            self.calibration_images.append(calibration_image)
+
+            # Calibrate hand detector
+            thresholds = HandCalibrator().detect(calibration_image)
+            if thresholds is None:
+                print('%s: Could not calibrate hand. Skipping detection' % image_filename)
+                continue
+
+            hand_detector = HandDetector(i, thresholds)
+            self.detectors.append((hand_detector, test_image))
+
+    def get_benchmarks(self):
+        return [
+            self.calibration_benchmark,
+            self.detection_benchmark
+        ]
+
+    def calibration_benchmark(self):
+        for calibration_image in self.calibration_images:
+            with self.stage("calibrate"):
+                HandCalibrator().detect(calibration_image)
+
+    def detection_benchmark(self):
+        for hand_detector, test_image in self.detectors:
+
+            # Scale image to detector input resolution, as board snapshots do
+            with self.stage("resize"):
+                image = resize_to_snapshot_size(test_image, hand_detector.preferred_input_image_resolution())
+
+            # Blurred HSV image, shared between detectors through the derived images of a board area
+            with self.stage("convert"):
+                derived_images = DerivedImageCache(image)
+                derived_images.image(ImageColorspace.HSV, gaussian_blur(7))
+
+            with self.stage("detect"):
+                hand_detector.detect_in_image(image, derived_images)
@@ -0,0 +1,197 @@
+import asyncio
+import itertools
+import json
+import struct
+import time
+
+import websockets
+
+from server import globals
+from server.message_encoding import FLOAT32_ARRAY_EXT_TYPE
+from tracking.detectors.hand_detector import HandDetector, handDetectorId
+from util import misc_util
+
+if misc_util.module_exists("msgpack"):
+    import msgpack
+else:
+    msgpack = None
+
+
+# Request IDs shared by all clients
+_request_ids = itertools.count(1)
+
+
+class HeadlessClient(object):
+    """
+    Minimal asyncio client speaking the same protocol as the client library, for benchmarks and load tests.
+
+    Every request gets a request ID unique among all clients in the process, since the server keeps requests from
+    all connections by request ID. All messages for that request are handed to the handler given when sending
+    the request, together with the time the message was received.
+    """
+
+    def __init__(self, url="ws://localhost:9001", encoding="json"):
+        """
+        :param url: Server URL
+        :param encoding: Preferred message encoding, "json" or "msgpack"
+        """
+        if encoding == "msgpack" and msgpack is None:
+            raise Exception("MessagePack encoding requires the msgpack module")
+
+        self.url = url
+        self.encoding = encoding
+
+        self.websocket = None
+        self.receive_task = None
+
+        self.handlers = {}
+
+        self.sent_count = 0
+        self.received_count = 0
+        self.unmatched_count = 0
+
+    async def connect(self):
+        subprotocols = ["msgpack", "json"] if self.encoding == "msgpack" else ["json"]
+
+        self.websocket = await websockets.connect(self.url, subprotocols=subprotocols, max_size=None)
+        self.receive_task = asyncio.ensure_future(self._receive())
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+            self.websocket = None
+
+        if self.receive_task is not None:
+            self.receive_task.cancel()
+            self.receive_task = None
+
+    async def send(self, action, payload=None, handler=None):
+        """
+        Sends a request.
+
+        :param action: Action
+        :param payload: (Optional) Payload
+        :param handler: (Optional) handler(message, receive_time) called for every message received for the request
+        :return: Request ID
+        """
+        request_id = next(_request_ids)
+
+        payload = dict(payload) if payload is not None else {}
+        payload["requestId"] = request_id
+
+        if handler is not None:
+            self.handlers[request_id] = handler
+
+        await self.websocket.send(json.dumps({"action": action, "payload": payload}))
+        self.sent_count += 1
+
+        return request_id
+
+    async def request(self, action, payload=None, timeout=None):
+        """
+        Sends a request and waits for the first message for it.
+
+        :param action: Action
+        :param payload: (Optional) Payload
+        :param timeout: (Optional) Maximum time in seconds to wait
+        :return: Message
+        """
+        future = asyncio.get_event_loop().create_future()
+
+        def handler(message, receive_time):
+            if not future.done():
+                future.set_result(message)
+
+        request_id = await self.send(action, payload, handler)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.handlers.pop(request_id, None)
+
+    def remove_handler(self, request_id):
+        self.handlers.pop(request_id, None)
+
+    async def _receive(self):
+        async for data in self.websocket:
+            receive_time = time.time()
+
+            message = self.decode(data)
+
+            # Pending messages are sent batched in an array
+            for single_message in message if isinstance(message, list) else [message]:
+                self.received_count += 1
+
+                handler = self.handlers.get(single_message["requestId"]) if "requestId" in single_message else None
+                if handler is not None:
+                    handler(single_message, receive_time)
+                else:
+                    self.unmatched_count += 1
+
+    def decode(self, data):
+        if isinstance(data, bytes):
+            return msgpack.unpackb(data, raw=False, ext_hook=decode_ext)
+        return json.loads(data)
+
+
+async def connect(url="ws://localhost:9001", encoding="json", timeout=10.0):
+    """
+    Connects to the server, retrying until it has started.
+
+    :param url: Server URL
+    :param encoding: Preferred message encoding, "json" or "msgpack"
+    :param timeout: Maximum time in seconds to wait for the server
+    :return: Connected client
+    """
+    deadline = time.perf_counter() + timeout
+
+    while True:
+        client = HeadlessClient(url, encoding)
+        try:
+            await client.connect()
+            return client
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def prepare_board(client, tile_count=(32, 20)):
+    """
+    Resets the server, calibrates the board and initializes a tiled board area covering the whole board. Must be
+    called on a server running in the same process, replaying frames with the board in view.
+
+    Hand detection calibration needs a hand in view, so a hand detector with default thresholds is installed directly
+    instead.
+
+    :param client: Connected client
+    :param tile_count: Tile count [tile_count_x, tile_count_y] of tiled board area
+    :return: Tiled board area ID
+    """
+    await client.request("reset", timeout=30.0)
+
+    message = await client.request("calibrateBoard", timeout=30.0)
+    if message["result"] != "OK":
+        raise Exception("Board calibration failed: %s" % message["result"])
+
+    message = await client.request("initializeTiledBoardArea", {"tileCountX": tile_count[0], "tileCountY": tile_count[1],
+                                                                "x1": 0.0, "y1": 0.0, "x2": 1.0, "y2": 1.0}, timeout=10.0)
+    if message["result"] != "OK":
+        raise Exception("Could not initialize tiled board area: %s" % message["result"])
+
+    globals.get_state().set_detector(HandDetector(handDetectorId))
+
+    return message["payload"]["id"]
+
+
+def decode_ext(code, data):
+    """
+    Decodes packed float32 arrays (see server.message_encoding.MessagePackEncoding) into lists.
+    """
+    if code != FLOAT32_ARRAY_EXT_TYPE:
+        return msgpack.ExtType(code, data)
+
+    row_length = data[0]
+    values = list(struct.unpack("<%if" % ((len(data) - 1) // 4), data[1:]))
+    if row_length == 0:
+        return values
+    return [values[i:i + row_length] for i in range(0, len(values), row_length)]
@@ -0,0 +1,37 @@
+import cv2
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.board.board_snapshot import SnapshotSize, resize_to_snapshot_size
+from tracking.detectors.image_detector import ImageDetector
+
+
+class ImageDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+        tests = [  # [Filename prefix, input resolution]
+            ['test/resources/image_detection/image_detection_1', SnapshotSize.SMALL],
+            ['test/resources/image_detection/image_detection_2', SnapshotSize.LARGE],
+            ['test/resources/image_detection/image_detection_3', SnapshotSize.LARGE],
+        ]
+
+        self.detectors = []
+
+        for i, (image_filename, input_resolution) in enumerate(tests):
+            source_image = cv2.imread("%s_source.png" % image_filename)
+            test_image = cv2.imread("%s_test.png" % image_filename)
+
+            self.detectors.append((ImageDetector(i, source_image, input_resolution=input_resolution), test_image))
+
+    def get_benchmarks(self):
+        return [
+            self.detection_benchmark
+        ]
+
+    def detection_benchmark(self):
+        for image_detector, test_image in self.detectors:
+
+            # Scale image to detector input resolution, as board snapshots do
+            with self.stage("resize"):
+                image = resize_to_snapshot_size(test_image, image_detector.preferred_input_image_resolution())
+
+            with self.stage("detect"):
+                image_detector.detect(image)
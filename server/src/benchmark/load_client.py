@@ -0,0 +1,220 @@
+import asyncio
+import time
+
+from benchmark.headless_client import connect
+from tracking.board.board_area import BoardAreaId_FULL_BOARD
+from util import metrics
+
+
+# Action mixes of the kinds of clients connected to an installation:
+#
+# streams -- Requests kept running for the whole run
+# loops -- One-shot requests issued again as soon as the result is received
+# periodic -- One-shot requests issued at a fixed interval in seconds
+PROFILES = {
+    "game": {"streams": ["detectGestures", "detectNonobstructedArea"],
+             "loops": ["detectTiledBricks"],
+             "periodic": []},
+    "admin": {"streams": [],
+              "loops": [],
+              "periodic": [("getStats", 1.0), ("detectTiledBricks", 0.5)]},
+    "debug": {"streams": ["detectGesturesChanges"],
+              "loops": [],
+              "periodic": [("getStats", 0.25)]}
+}
+
+
+class LoadClient(object):
+    """
+    Websocket connection replaying the action mix of a client profile (see PROFILES), recording result latency,
+    response times, error codes and message loss of the connection.
+
+    Result latency is the time from capture of the frame a result was detected in until the result is received.
+    Response time is the time from sending a one-shot request until its response is received. One-shot requests
+    never answered are counted as lost.
+    """
+
+    def __init__(self, client_index, profile_name, url, encoding, tiled_area_id, valid_positions):
+        """
+        :param client_index: Client index
+        :param profile_name: Client profile, fx. "game"
+        :param url: Server URL
+        :param encoding: Preferred message encoding, "json" or "msgpack"
+        :param tiled_area_id: Tiled board area to detect bricks in
+        :param valid_positions: Tile positions to detect bricks in
+        """
+        self.client_index = client_index
+        self.profile_name = profile_name
+        self.profile = PROFILES[profile_name]
+        self.url = url
+        self.encoding = encoding
+        self.tiled_area_id = tiled_area_id
+        self.valid_positions = valid_positions
+
+        self.client = None
+        self.running = False
+        self.measuring = False
+
+        self.stream_request_ids = []
+        self.periodic_tasks = []
+        self.pending_requests = {}
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.result_latencies = metrics.Histogram(window_size=1000000)
+        self.response_times = metrics.Histogram(window_size=1000000)
+        self.result_count = 0
+        self.error_results = {}
+        self.sent_count = 0
+        self.answered_count = 0
+        self.lost_count = 0
+
+    async def start(self):
+        """
+        Connects and starts the action mix.
+        """
+        self.client = await connect(self.url, self.encoding)
+        self.running = True
+
+        for action in self.profile["streams"]:
+            self.stream_request_ids.append(await self.client.send(*self.payload(action, keep_running=True), handler=self.handle_result))
+
+        for action in self.profile["loops"]:
+            await self.send_one_shot(action, loop=True)
+
+        for action, interval in self.profile["periodic"]:
+            self.periodic_tasks.append(asyncio.ensure_future(self.run_periodic(action, interval)))
+
+    async def stop(self, drain_time=1.0):
+        """
+        Stops the action mix, cancels running requests and disconnects. One-shot requests still unanswered after the
+        drain time are counted as lost.
+
+        :param drain_time: Time in seconds to wait for outstanding responses
+        """
+        self.running = False
+
+        for task in self.periodic_tasks:
+            task.cancel()
+        self.periodic_tasks = []
+
+        # Cancel own requests only, since cancelRequests would cancel the requests of all connections
+        for request_id in self.stream_request_ids:
+            await self.client.request("cancelRequest", {"id": request_id}, timeout=10.0)
+        self.stream_request_ids = []
+
+        deadline = time.perf_counter() + drain_time
+        while len(self.pending_requests) > 0 and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+
+        for request_id, request in list(self.pending_requests.items()):
+            self.client.remove_handler(request_id)
+            if request["counted"]:
+                self.lost_count += 1
+        self.pending_requests = {}
+
+        await self.client.close()
+
+    def payload(self, action, keep_running=False):
+        """
+        Returns the action and payload to send for an action of the profile.
+
+        :return: (action, payload)
+        """
+        if action == "detectGestures":
+            return action, {"areaId": BoardAreaId_FULL_BOARD, "keepRunning": keep_running}
+        if action == "detectGesturesChanges":
+            return "detectGestures", {"areaId": BoardAreaId_FULL_BOARD, "keepRunning": keep_running, "sendOnlyChanges": True}
+        if action == "detectNonobstructedArea":
+            target_position = [0.2 + 0.6 * ((self.client_index * 0.37) % 1.0), 0.2 + 0.6 * ((self.client_index * 0.61) % 1.0)]
+            return action, {"areaId": BoardAreaId_FULL_BOARD, "targetSize": [0.2, 0.2], "targetPosition": target_position,
+                            "stableTime": 0.0, "keepRunning": keep_running}
+        if action == "detectTiledBricks":
+            return action, {"areaId": self.tiled_area_id, "validPositions": self.valid_positions}
+        return action, {}
+
+    async def send_one_shot(self, action, loop=False):
+        """
+        Sends a one-shot request.
+
+        :param action: Profile action
+        :param loop: If True, the request is sent again when the response is received
+        """
+        if not self.running:
+            return
+
+        action_name, payload = self.payload(action)
+
+        # The response may arrive before send returns
+        request = {"sendTime": time.time(), "counted": self.measuring, "answered": False}
+        if request["counted"]:
+            self.sent_count += 1
+
+        def handler(message, receive_time):
+            self.handle_response(request, message, receive_time)
+            if loop:
+                asyncio.ensure_future(self.send_one_shot(action, loop=True))
+
+        request["requestId"] = await self.client.send(action_name, payload, handler)
+
+        if not request["answered"]:
+            self.pending_requests[request["requestId"]] = request
+
+    async def run_periodic(self, action, interval):
+        next_time = time.perf_counter()
+
+        while self.running:
+            await self.send_one_shot(action)
+
+            next_time += interval
+            await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def handle_response(self, request, message, receive_time):
+        if request["answered"]:
+            return
+
+        request["answered"] = True
+        self.pending_requests.pop(message["requestId"], None)
+        self.client.remove_handler(message["requestId"])
+
+        if request["counted"]:
+            self.answered_count += 1
+            self.response_times.record(receive_time - request["sendTime"])
+
+        self.handle_result(message, receive_time)
+
+    def handle_result(self, message, receive_time):
+        if not self.measuring:
+            return
+
+        if message["result"] != "OK":
+            self.error_results[message["result"]] = self.error_results.get(message["result"], 0) + 1
+            return
+
+        self.result_count += 1
+        if "captureTimestamp" in message:
+            self.result_latencies.record(receive_time - message["captureTimestamp"])
+
+    def stats(self, duration):
+        """
+        Returns connection statistics.
+
+        :param duration: Measured duration in seconds
+        :return: {client, profile, results, resultsPerSecond, errorResults, sent, answered, lost, unmatched,
+                  resultLatency, responseTime}
+        """
+        result_latencies = self.result_latencies.stats()
+        response_times = self.response_times.stats()
+
+        return {"client": self.client_index,
+                "profile": self.profile_name,
+                "results": self.result_count,
+                "resultsPerSecond": self.result_count / duration if duration > 0.0 else 0.0,
+                "errorResults": self.error_results,
+                "sent": self.sent_count,
+                "answered": self.answered_count,
+                "lost": self.lost_count,
+                "unmatched": self.client.unmatched_count if self.client is not None else 0,
+                "resultLatency": {key: result_latencies[key] for key in ["count", "p50", "p95", "p99", "max"]},
+                "responseTime": {key: response_times[key] for key in ["count", "p50", "p95", "p99", "max"]}}
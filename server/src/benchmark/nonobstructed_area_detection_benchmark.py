@@ -0,0 +1,32 @@
+import cv2
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.board.board_snapshot import resize_to_snapshot_size
+from tracking.detectors.nonobstructed_area_detector import NonobstructedAreaDetector
+
+
+class NonobstructedAreaDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+        tests = [  # [Filename prefix, target size, target point]
+            ['test/resources/nonobstructed_area_detection/image_detection_1', [0.2, 0.2], [0.3, 0.5]],
+            ['test/resources/nonobstructed_area_detection/image_detection_2', [0.2, 0.2], [0.5, 0.8]],
+            ['test/resources/nonobstructed_area_detection/image_detection_3', [0.2, 0.2], [0.5, 0.0]],
+        ]
+
+        self.detectors = [(NonobstructedAreaDetector(target_size, target_point), cv2.imread("%s_test.png" % image_filename))
+                          for image_filename, target_size, target_point in tests]
+
+    def get_benchmarks(self):
+        return [
+            self.detection_benchmark
+        ]
+
+    def detection_benchmark(self):
+        for nonobstructed_area_detector, test_image in self.detectors:
+
+            # Scale image to detector input resolution, as board snapshots do
+            with self.stage("resize"):
+                image = resize_to_snapshot_size(test_image, nonobstructed_area_detector.preferred_input_image_resolution())
+
+            with self.stage("detect"):
+                nonobstructed_area_detector.detect(image)
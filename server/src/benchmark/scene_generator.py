@@ -0,0 +1,361 @@
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+from tracking.detectors.hand_detector import HandGesture
+from tracking.detectors.tiled_brick_detector import BrickColor
+
+
+# Brick colors as HSV ranges (OpenCV hue 0-180) inside the hue ranges of the tiled brick detector
+BRICK_COLORS = {
+    BrickColor.BLACK: {"hue": (0, 180), "saturation": (0, 60), "value": (20, 45)},
+    BrickColor.RED: {"hue": (174, 180), "saturation": (170, 230), "value": (140, 210)},
+    BrickColor.GREEN: {"hue": (55, 75), "saturation": (150, 220), "value": (110, 180)},
+    BrickColor.BLUE: {"hue": (108, 120), "saturation": (170, 230), "value": (120, 190)},
+    BrickColor.YELLOW: {"hue": (26, 32), "saturation": (170, 230), "value": (180, 230)}
+}
+
+# Skin color as HSV ranges, inside the default thresholds of the hand detector
+SKIN_COLOR = {"hue": (6, 16), "saturation": (80, 160), "value": (150, 230)}
+
+# Default target images
+DEFAULT_TARGET_IMAGE_FILENAMES = ["test/resources/image_detection/image_detection_1_source.png",
+                                  "test/resources/image_detection/image_detection_2_source.png",
+                                  "test/resources/image_detection/image_detection_3_source.png"]
+
+
+class SceneGenerator(object):
+    """
+    Generates labelled camera frames of the board, for benchmarking and testing detectors at scale.
+
+    Every scene is rendered in board coordinates first: synthetic bricks on a tile grid, target images and hand
+    silhouettes are drawn on the board content (the image shown on the board while playing). The board is then seen
+    by a camera with random perspective, lighting and sensor noise. Each scene also has a frame of the board showing
+    the board calibration image, seen by the same camera with the same lighting, for board calibration.
+
+    Scenes are deterministic: scene number i of a generator with a given seed is always the same.
+
+    Ground truth, relative to the board:
+    corners -- Board corners [[x, y], ...] in camera frame pixels, in the order of the board calibrator (top left,
+               bottom left, bottom right, top right)
+    bricks -- [{position: [tile x, tile y], class, occluded}], class as in BrickColor names, fx. "RED", and occluded
+              True if the center of the brick is covered by a hand
+    hands -- [{gesture, x, y, fingerPositions: [{x, y}, ...]}] with palm center x, y, gesture as in HandGesture names
+    images -- [{source, x, y, width, height, angle}] like the image detector results, with angle in degrees
+    """
+
+    def __init__(self, board_image_filename="resources/calibration/board_calibration.png", content_image_filename=None, resolution=(640, 480),
+                 tile_count=(32, 20), tile_padding=(0.1, 0.1), brick_count=(0, 6), hand_probability=0.3,
+                 image_count=(0, 2), target_image_filenames=DEFAULT_TARGET_IMAGE_FILENAMES,
+                 perspective=0.08, lighting=0.3, noise_level=6.0, seed=0):
+        """
+        :param board_image_filename: Board calibration image
+        :param content_image_filename: (Optional) Board content image. Defaults to a light, slightly textured surface
+        :param resolution: Camera frame resolution (width, height)
+        :param tile_count: Tile count [tile_count_x, tile_count_y] of the brick grid
+        :param tile_padding: Tile padding in percentage [horizontal, vertical]
+        :param brick_count: Range [min, max] of number of bricks per scene
+        :param hand_probability: Probability of a hand in a scene
+        :param image_count: Range [min, max] of number of target images per scene
+        :param target_image_filenames: Target images to place on board
+        :param perspective: Maximum displacement of each board corner as fraction of frame size
+        :param lighting: Maximum change of brightness as fraction, fx. 0.3 for 70% to 130%
+        :param noise_level: Maximum standard deviation of sensor noise
+        :param seed: Random seed
+        """
+        self.board_image = cv2.imread(board_image_filename)
+        if self.board_image is None:
+            raise Exception("Could not load board image: %s" % board_image_filename)
+
+        board_height, board_width = self.board_image.shape[:2]
+
+        self.content_image = None
+        if content_image_filename is not None:
+            self.content_image = cv2.imread(content_image_filename)
+            if self.content_image is None:
+                raise Exception("Could not load content image: %s" % content_image_filename)
+            self.content_image = cv2.resize(self.content_image, (board_width, board_height), interpolation=cv2.INTER_AREA)
+
+        self.target_image_filenames = target_image_filenames
+        self.target_images = [cv2.imread(filename) for filename in target_image_filenames]
+        for filename, image in zip(target_image_filenames, self.target_images):
+            if image is None:
+                raise Exception("Could not load target image: %s" % filename)
+
+        self.resolution = resolution
+        self.tile_count = tile_count
+        self.tile_padding = tile_padding
+        self.brick_count = brick_count
+        self.hand_probability = hand_probability
+        self.image_count = image_count
+        self.perspective = perspective
+        self.lighting = lighting
+        self.noise_level = noise_level
+        self.seed = seed
+
+    def generate(self, index):
+        """
+        Generates scene number index.
+
+        :param index: Scene number
+        :return: (board frame, scene frame, ground truth dict)
+        """
+        random = np.random.RandomState([self.seed, index])
+
+        board_image = self.content_image.copy() if self.content_image is not None else self.random_surface(random)
+
+        # Draw scene on board
+        images = self.draw_target_images(board_image, random)
+        bricks = self.draw_bricks(board_image, random)
+        hands = self.draw_hands(board_image, bricks, random) if random.uniform() < self.hand_probability else []
+
+        # View board through camera
+        corners = self.random_corners(random)
+        lighting = self.random_lighting(random)
+        noise_level = random.uniform(self.noise_level * 0.25, self.noise_level)
+        background_color = random.uniform(40, 120, 3)
+
+        board_frame = self.camera_frame(self.board_image, corners, lighting, background_color, noise_level, random)
+        scene_frame = self.camera_frame(board_image, corners, lighting, background_color, noise_level, random)
+
+        for brick in bricks:
+            del brick["center"]
+
+        return board_frame, scene_frame, {"corners": corners.tolist(),
+                                          "tileCount": list(self.tile_count),
+                                          "tilePadding": list(self.tile_padding),
+                                          "bricks": bricks,
+                                          "hands": hands,
+                                          "images": images}
+
+    def write_dataset(self, output_directory, count, start_index=0):
+        """
+        Generates scenes and writes frames and ground truth to a directory. Ground truth is written to tests.json as
+        a list of ground truth dicts (see class description), with the frame files in "board" and "image".
+
+        :param output_directory: Output directory
+        :param count: Number of scenes
+        :param start_index: Number of first scene
+        :return: List of ground truth dicts
+        """
+        os.makedirs(output_directory, exist_ok=True)
+
+        tests = []
+        for index in range(start_index, start_index + count):
+            board_frame, scene_frame, ground_truth = self.generate(index)
+
+            board_filename = os.path.join(output_directory, "scene_%06i_board.png" % index)
+            scene_filename = os.path.join(output_directory, "scene_%06i_test.png" % index)
+
+            cv2.imwrite(board_filename, board_frame)
+            cv2.imwrite(scene_filename, scene_frame)
+
+            tests.append(dict({"board": board_filename, "image": scene_filename}, **ground_truth))
+
+        with open(os.path.join(output_directory, "tests.json"), "w") as tests_file:
+            json.dump(tests, tests_file, indent=4)
+
+        return tests
+
+    def random_surface(self, random):
+        """
+        Returns a light surface with low frequency texture, of board size.
+
+        :return: Surface image
+        """
+        board_height, board_width = self.board_image.shape[:2]
+
+        texture = cv2.resize(random.normal(0.0, 8.0, (board_height // 32, board_width // 32)).astype(np.float32),
+                             (board_width, board_height), interpolation=cv2.INTER_CUBIC)
+        surface = random.uniform(190.0, 230.0) + texture
+
+        return cv2.cvtColor(np.clip(surface, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+    def draw_bricks(self, board_image, random):
+        """
+        Draws bricks on random tiles.
+
+        :return: [{position, class}]
+        """
+        board_height, board_width = board_image.shape[:2]
+        tile_width = float(board_width) / float(self.tile_count[0])
+        tile_height = float(board_height) / float(self.tile_count[1])
+
+        count = random.randint(self.brick_count[0], self.brick_count[1] + 1)
+        tiles = random.choice(self.tile_count[0] * self.tile_count[1], count, replace=False)
+
+        bricks = []
+        for tile in tiles:
+            x, y = int(tile % self.tile_count[0]), int(tile // self.tile_count[0])
+            color = int(random.randint(0, len(BrickColor.names)))
+
+            # Round brick filling the tile except for the padding, with a darker rim
+            center = (int((x + 0.5) * tile_width), int((y + 0.5) * tile_height))
+            radius = int(min(tile_width * (1.0 - self.tile_padding[0]), tile_height * (1.0 - self.tile_padding[1])) * 0.5)
+
+            bgr = random_bgr(BRICK_COLORS[color], random)
+            cv2.circle(board_image, center, radius, bgr, -1)
+            cv2.circle(board_image, center, radius, scale_color(bgr, 0.7), max(1, radius // 6))
+
+            bricks.append({"position": [x, y], "class": BrickColor.names[color], "occluded": False,
+                           "center": center})
+
+        return bricks
+
+    def draw_target_images(self, board_image, random):
+        """
+        Draws target images at random positions, sizes and rotations.
+
+        :return: [{source, x, y, width, height, angle}]
+        """
+        board_height, board_width = board_image.shape[:2]
+
+        images = []
+        for _ in range(0, random.randint(self.image_count[0], self.image_count[1] + 1)):
+            image_index = random.randint(0, len(self.target_images))
+            source_image = self.target_images[image_index]
+            source_height, source_width = source_image.shape[:2]
+
+            scale = random.uniform(0.10, 0.20) * board_width / float(max(source_width, source_height))
+            angle = random.uniform(-180.0, 180.0)
+            x = random.uniform(0.2, 0.8) * board_width
+            y = random.uniform(0.2, 0.8) * board_height
+
+            # Image detector angles are clockwise in image coordinates, OpenCV rotations counter-clockwise
+            transform = cv2.getRotationMatrix2D((source_width / 2.0, source_height / 2.0), -angle, scale)
+            transform[0][2] += x - source_width / 2.0
+            transform[1][2] += y - source_height / 2.0
+
+            warped_image = cv2.warpAffine(source_image, transform, (board_width, board_height))
+            mask = cv2.warpAffine(np.full((source_height, source_width), 255, np.uint8), transform, (board_width, board_height))
+            board_image[mask > 127] = warped_image[mask > 127]
+
+            images.append({"source": self.target_image_filenames[image_index],
+                           "x": x / board_width,
+                           "y": y / board_height,
+                           "width": source_width * scale / board_width,
+                           "height": source_height * scale / board_height,
+                           "angle": angle})
+
+        return images
+
+    def draw_hands(self, board_image, bricks, random):
+        """
+        Draws a hand silhouette reaching in from the bottom of the board, either pointing or with an open hand, and
+        marks the bricks covered by it as occluded.
+
+        :return: [{gesture, x, y, fingerPositions}]
+        """
+        board_height, board_width = board_image.shape[:2]
+        size = board_width * random.uniform(0.8, 1.2)
+
+        gesture = HandGesture.POINTING if random.uniform() < 0.5 else HandGesture.OPEN_HAND
+        palm_center = np.array([random.uniform(0.25, 0.75) * board_width, random.uniform(0.35, 0.65) * board_height])
+        arm_angle = math.radians(random.uniform(-25.0, 25.0))
+
+        # Direction from wrist towards fingers
+        direction = np.array([math.sin(arm_angle), -math.cos(arm_angle)])
+
+        mask = np.zeros((board_height, board_width), np.uint8)
+
+        # Arm and palm
+        arm_end = palm_center - direction * board_height * 1.5
+        cv2.line(mask, tuple_int(palm_center), tuple_int(arm_end), 255, int(size * 0.07))
+        cv2.circle(mask, tuple_int(palm_center), int(size * 0.045), 255, -1)
+
+        # Fingers spread around the direction of the arm. The thumb is shorter
+        if gesture == HandGesture.POINTING:
+            finger_angles = [0.0]
+            finger_lengths = [0.10]
+        else:
+            finger_angles = [-80.0, -35.0, -12.0, 12.0, 35.0]
+            finger_lengths = [0.06, 0.085, 0.095, 0.09, 0.075]
+
+        finger_positions = []
+        for finger_angle, finger_length in zip(finger_angles, finger_lengths):
+            angle = arm_angle + math.radians(finger_angle + random.uniform(-4.0, 4.0))
+            finger_direction = np.array([math.sin(angle), -math.cos(angle)])
+
+            finger_base = palm_center + finger_direction * size * 0.035
+            fingertip = palm_center + finger_direction * size * (0.035 + finger_length)
+            cv2.line(mask, tuple_int(finger_base), tuple_int(fingertip), 255, int(size * 0.016))
+
+            finger_positions.append({"x": float(fingertip[0]) / board_width, "y": float(fingertip[1]) / board_height})
+
+        # Blend skin color with soft edges
+        skin_color = np.array(random_bgr(SKIN_COLOR, random), np.float32)
+        alpha = cv2.GaussianBlur(mask, (5, 5), 0).astype(np.float32)[:, :, np.newaxis] / 255.0
+        board_image[:] = (board_image.astype(np.float32) * (1.0 - alpha) + skin_color * alpha).astype(np.uint8)
+
+        for brick in bricks:
+            brick["occluded"] = bool(mask[brick["center"][1], brick["center"][0]] > 0)
+
+        return [{"gesture": HandGesture.names[gesture],
+                 "x": float(palm_center[0]) / board_width,
+                 "y": float(palm_center[1]) / board_height,
+                 "fingerPositions": finger_positions}]
+
+    def random_corners(self, random):
+        """
+        Returns random board corners in the camera frame.
+
+        :return: Corners [[x, y], ...] (top left, bottom left, bottom right, top right)
+        """
+        width, height = self.resolution
+
+        corners = np.float32([[0.10, 0.10], [0.10, 0.90], [0.90, 0.90], [0.90, 0.10]])
+        corners += random.uniform(-self.perspective, self.perspective, corners.shape).astype(np.float32)
+
+        return corners * np.float32([width, height])
+
+    def random_lighting(self, random):
+        """
+        Returns a lighting map of the camera frame: overall brightness with a linear gradient in a random direction.
+
+        :return: Lighting map of frame size
+        """
+        width, height = self.resolution
+
+        brightness = random.uniform(1.0 - self.lighting, 1.0 + self.lighting)
+        gradient = random.uniform(-self.lighting, self.lighting, 2)
+
+        xs = np.linspace(-0.5, 0.5, width, dtype=np.float32)[np.newaxis, :]
+        ys = np.linspace(-0.5, 0.5, height, dtype=np.float32)[:, np.newaxis]
+
+        return (brightness + gradient[0] * xs + gradient[1] * ys)[:, :, np.newaxis]
+
+    def camera_frame(self, board_image, corners, lighting, background_color, noise_level, random):
+        """
+        Renders the board image seen by the camera.
+
+        :return: Camera frame
+        """
+        board_height, board_width = board_image.shape[:2]
+        board_corners = np.float32([[0, 0], [0, board_height], [board_width, board_height], [board_width, 0]])
+
+        transform = cv2.getPerspectiveTransform(board_corners, corners)
+        frame = cv2.warpPerspective(board_image, transform, self.resolution, flags=cv2.INTER_AREA,
+                                    borderValue=tuple([float(c) for c in background_color]))
+
+        frame = frame.astype(np.float32) * lighting
+        frame += random.normal(0.0, noise_level, frame.shape)
+
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def random_bgr(hsv_ranges, random):
+    hsv = np.uint8([[[random.randint(hsv_ranges["hue"][0], hsv_ranges["hue"][1]),
+                      random.randint(hsv_ranges["saturation"][0], hsv_ranges["saturation"][1]),
+                      random.randint(hsv_ranges["value"][0], hsv_ranges["value"][1])]]])
+    return tuple([int(c) for c in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0][0]])
+
+
+def scale_color(bgr, factor):
+    return tuple([int(min(255, c * factor)) for c in bgr])
+
+
+def tuple_int(point):
+    return int(point[0]), int(point[1])
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+
+class SyntheticFrameSource(object):
+    """
+    Frame source for the file camera (see server.camera_file), rendering the board calibration image seen in
+    perspective by a camera, with a dark brick moving across the board and sensor noise.
+
+    Frames are rendered once up front and then replayed in a loop, so that rendering does not take CPU time from the
+    server being benchmarked.
+    """
+
+    def __init__(self, board_image_filename="resources/calibration/board_calibration.png", resolution=(640, 480),
+                 frame_count=64, noise_level=4.0, seed=0):
+        """
+        :param board_image_filename: Board image
+        :param resolution: Frame resolution (width, height)
+        :param frame_count: Number of distinct frames rendered
+        :param noise_level: Standard deviation of sensor noise
+        :param seed: Random seed
+        """
+        board_image = cv2.imread(board_image_filename)
+        if board_image is None:
+            raise Exception("Could not load board image: %s" % board_image_filename)
+
+        random = np.random.RandomState(seed)
+
+        self.frames = [self.render_frame(board_image, resolution, float(i) / float(frame_count), noise_level, random)
+                       for i in range(0, frame_count)]
+        self.index = 0
+        self.fps = None
+
+    def render_frame(self, board_image, resolution, phase, noise_level, random):
+        """
+        Renders a single frame.
+
+        :param board_image: Board image
+        :param resolution: Frame resolution (width, height)
+        :param phase: Animation phase (0-1)
+        :param noise_level: Standard deviation of sensor noise
+        :param random: Random state
+        :return: Frame
+        """
+        board_height, board_width = board_image.shape[:2]
+        width, height = resolution
+
+        # Draw brick moving across board
+        board_image = board_image.copy()
+        brick_center = (int(board_width * (0.2 + 0.6 * phase)), int(board_height * (0.5 + 0.2 * np.sin(phase * 2.0 * np.pi))))
+        cv2.circle(board_image, brick_center, int(board_width * 0.03), (30, 30, 30), -1)
+
+        # Project board into camera image, slightly tilted
+        board_corners = np.float32([[0, 0], [board_width, 0], [board_width, board_height], [0, board_height]])
+        image_corners = np.float32([[width * 0.10, height * 0.12], [width * 0.92, height * 0.08],
+                                    [width * 0.95, height * 0.90], [width * 0.06, height * 0.93]])
+
+        transform = cv2.getPerspectiveTransform(board_corners, image_corners)
+        frame = cv2.warpPerspective(board_image, transform, (width, height), borderValue=(70, 70, 70))
+
+        # Add sensor noise
+        noise = random.normal(0.0, noise_level, frame.shape)
+        return np.clip(frame.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+    def read(self):
+        """
+        Returns the next frame. Frames are repeated forever.
+
+        :return: Image
+        """
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        return frame
+
+    def rewind(self):
+        self.index = 0
+
+    def close(self):
+        pass
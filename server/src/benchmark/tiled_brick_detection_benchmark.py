@@ -0,0 +1,60 @@
+from random import Random
+
+import cv2
+
+from benchmark.base_benchmark import BaseBenchmark
+from tracking.board.board_descriptor import BoardDescriptor
+from tracking.board.tiled_board_area import TiledBoardArea
+from tracking.calibrators.board_calibrator import BoardCalibrator, State
+from tracking.detectors.tiled_brick_detector import TiledBrickDetector
+
+
+class TiledBrickDetectionBenchmark(BaseBenchmark):
+    def prepare(self):
+        image_filename = 'test/resources/tiled_brick_detection/brick_detection_5'
+        tile_count = [32, 20]
+        tile_padding = [0.1, 0.1]
+        brick_positions = [(0, 13), (3, 10), (10, 4), (11, 9), (22, 0)]
+
+        # Initial board detection
+        self.board_descriptor = BoardDescriptor()
+        self.board_descriptor.set_board_calibrator(BoardCalibrator(board_image_filename="test/resources/tiled_brick_detection/board_detection_source.png"))
+        self.board_descriptor.get_board_calibrator().detect_min_count = 1
+        self.board_descriptor.get_board_calibrator().detect_min_stable_time = 0.0
+
+        board_image = cv2.imread("%s_board.png" % image_filename)
+        if self.board_descriptor.get_board_calibrator().detect(board_image) is None:
+            raise Exception('%s: Could not detect board' % image_filename)
+
+        # Force update board descriptor to recognize board immediately
+        self.board_descriptor.get_board_calibrator().update(board_image)
+        self.board_descriptor.get_board_calibrator().state = State.DETECTED
+
+        self.test_image = cv2.imread("%s_test.png" % image_filename)
+
+        # Create detector
+        self.tiled_board_area = TiledBoardArea(0, tile_count, tile_padding, self.board_descriptor)
+        self.tiled_brick_detector = TiledBrickDetector(self.tiled_board_area)
+
+        # Search among a fixed set of positions with and without bricks, so that all iterations do the same work
+        random = Random(0)
+        other_positions = [(x, y) for y in range(0, tile_count[1]) for x in range(0, tile_count[0]) if (x, y) not in brick_positions]
+        self.positions = brick_positions + random.sample(other_positions, 20)
+
+    def get_benchmarks(self):
+        return [
+            self.detection_benchmark
+        ]
+
+    def detection_benchmark(self):
+
+        # A new snapshot for every iteration, so that the board area is warped from the camera image again
+        with self.stage("snapshot_update"):
+            self.board_descriptor.update(self.test_image)
+
+        with self.board_descriptor.pinned_snapshot():
+            with self.stage("find_brick"):
+                self.tiled_brick_detector.find_brick_among_tiles(self.positions)
+
+            with self.stage("find_bricks"):
+                self.tiled_brick_detector.find_bricks_among_tiles(self.positions)
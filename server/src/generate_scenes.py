@@ -0,0 +1,41 @@
+import argparse
+import time
+
+from benchmark.scene_generator import SceneGenerator
+
+
+# Parse arguments
+parser = argparse.ArgumentParser(description='Generates labelled camera frames of the board with bricks on tile grids, hands and target images, seen with random perspective, lighting and noise. Writes the frames and ground truth (tests.json) to the output directory.')
+parser.add_argument('output', help='Output directory')
+parser.add_argument('-n', '--count', type=int, default=100, help='Number of scenes. Defaults to 100')
+parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed. Defaults to 0')
+parser.add_argument('-r', '--resolution', default='640x480', help='Frame resolution. Defaults to 640x480')
+parser.add_argument('--board', default='resources/calibration/board_calibration.png', help='Board image. Defaults to resources/calibration/board_calibration.png')
+parser.add_argument('--tiles', default='32x20', help='Tile count of brick grid. Defaults to 32x20')
+parser.add_argument('--bricks', default='0,6', help='Minimum and maximum number of bricks per scene. Defaults to 0,6')
+parser.add_argument('--images', default='0,2', help='Minimum and maximum number of target images per scene. Defaults to 0,2')
+parser.add_argument('--hands', type=float, default=0.3, help='Probability of a hand in a scene. Defaults to 0.3')
+parser.add_argument('--perspective', type=float, default=0.08, help='Maximum displacement of board corners as fraction of frame size. Defaults to 0.08')
+parser.add_argument('--lighting', type=float, default=0.3, help='Maximum change of brightness as fraction. Defaults to 0.3')
+parser.add_argument('--noise', type=float, default=6.0, help='Maximum standard deviation of sensor noise. Defaults to 6')
+args = parser.parse_args()
+
+generator = SceneGenerator(board_image_filename=args.board,
+                           resolution=tuple([int(value) for value in args.resolution.split('x')]),
+                           tile_count=tuple([int(value) for value in args.tiles.split('x')]),
+                           brick_count=tuple([int(value) for value in args.bricks.split(',')]),
+                           hand_probability=args.hands,
+                           image_count=tuple([int(value) for value in args.images.split(',')]),
+                           perspective=args.perspective,
+                           lighting=args.lighting,
+                           noise_level=args.noise,
+                           seed=args.seed)
+
+# Generate scenes
+start_time = time.perf_counter()
+
+tests = generator.write_dataset(args.output, args.count)
+
+print('%i scenes with %i bricks, %i hands and %i images written to %s in %.1f seconds' %
+      (len(tests), sum([len(test["bricks"]) for test in tests]), sum([len(test["hands"]) for test in tests]),
+       sum([len(test["images"]) for test in tests]), args.output, time.perf_counter() - start_time))
@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import time
+
+from benchmark.headless_client import connect, prepare_board
+from benchmark.synthetic_frame_source import SyntheticFrameSource
+from server.server import Server
+from tracking.board.board_area import BoardAreaId_FULL_BOARD
+from util import metrics
+
+
+class LatencyRecorder(object):
+    """
+    Collects end-to-end latencies (frame capture to result received by client) of the results received while
+    recording.
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.latencies = metrics.Histogram(window_size=1000000)
+        self.result_count = 0
+        self.error_count = 0
+        self.error_results = {}
+
+    def handle_message(self, message, receive_time):
+        if not self.recording:
+            return
+
+        if message["result"] != "OK":
+            self.error_count += 1
+            self.error_results[message["result"]] = self.error_results.get(message["result"], 0) + 1
+            return
+
+        self.result_count += 1
+        if "captureTimestamp" in message:
+            self.latencies.record(receive_time - message["captureTimestamp"])
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def start_request(client, recorder, index, tiled_area_id, valid_positions):
+    """
+    Starts request number index of the request mix: gesture detection and nonobstructed area detection running
+    continuously, and tiled brick detection issued again as soon as a result is received.
+    """
+    kind = index % 3
+
+    if kind == 0:
+        await client.send("detectGestures", {"areaId": BoardAreaId_FULL_BOARD, "keepRunning": True}, recorder.handle_message)
+
+    elif kind == 1:
+        target_position = [0.2 + 0.6 * ((index * 0.37) % 1.0), 0.2 + 0.6 * ((index * 0.61) % 1.0)]
+        await client.send("detectNonobstructedArea", {"areaId": BoardAreaId_FULL_BOARD,
+                                                      "targetSize": [0.2, 0.2],
+                                                      "targetPosition": target_position,
+                                                      "stableTime": 0.0,
+                                                      "keepRunning": True}, recorder.handle_message)
+
+    else:
+        def handle_tiled_bricks(message, receive_time):
+            recorder.handle_message(message, receive_time)
+            if recorder.recording:
+                asyncio.ensure_future(client.send("detectTiledBricks", payload, handle_tiled_bricks))
+
+        payload = {"areaId": tiled_area_id, "validPositions": valid_positions}
+        await client.send("detectTiledBricks", payload, handle_tiled_bricks)
+
+
+async def run_level(client, request_count, duration, warmup, tiled_area_id, valid_positions):
+    """
+    Runs the given number of concurrent requests and measures throughput, latency and CPU use.
+
+    :return: Level results
+    """
+    recorder = LatencyRecorder()
+    recorder.recording = True
+
+    for index in range(0, request_count):
+        await start_request(client, recorder, index, tiled_area_id, valid_positions)
+
+    # Warm up
+    await asyncio.sleep(warmup)
+
+    recorder.latencies = metrics.Histogram(window_size=1000000)
+    recorder.result_count = 0
+    recorder.error_count = 0
+    recorder.error_results = {}
+
+    stats_before = (await client.request("getStats", timeout=10.0))["payload"]
+
+    # Measure
+    start_time = time.perf_counter()
+    start_cpu_time = cpu_time()
+
+    await asyncio.sleep(duration)
+
+    elapsed_time = time.perf_counter() - start_time
+    elapsed_cpu_time = cpu_time() - start_cpu_time
+    recorder.recording = False
+
+    stats_after = (await client.request("getStats", timeout=10.0))["payload"]
+
+    # Stop requests and let remaining results drain
+    await client.request("cancelRequests", timeout=10.0)
+    await asyncio.sleep(0.5)
+
+    latencies = recorder.latencies.stats()
+
+    return {"requests": request_count,
+            "duration": elapsed_time,
+            "results": recorder.result_count,
+            "resultsPerSecond": recorder.result_count / elapsed_time,
+            "errors": recorder.error_count,
+            "errorResults": recorder.error_results,
+            "latency": {key: latencies[key] for key in ["count", "mean", "p50", "p95", "p99", "max"]},
+            "cpuUsage": elapsed_cpu_time / elapsed_time,
+            "schedulerFrames": stats_after["scheduler"]["frames"] - stats_before["scheduler"]["frames"],
+            "skippedSteps": stats_after["scheduler"]["skippedSteps"] - stats_before["scheduler"]["skippedSteps"],
+            "connections": stats_after["connections"]}
+
+
+async def run(args):
+    client = await connect("ws://localhost:%i" % args.port, args.encoding)
+
+    try:
+
+        # Set up board and areas
+        tiled_area_id = await prepare_board(client, tile_count=(32, 20))
+        valid_positions = [[x, y] for y in range(0, 20, 2) for x in range(0, 32, 2)]
+
+        # Sweep concurrency levels
+        levels = []
+        for request_count in args.levels:
+            level = await run_level(client, request_count, args.duration, args.warmup, tiled_area_id, valid_positions)
+            levels.append(level)
+
+            print("%4i requests: %8.1f results/s   p50 %7.1f ms   p95 %7.1f ms   p99 %7.1f ms   CPU %5.0f%%   errors %i   skipped steps %i" %
+                  (request_count, level["resultsPerSecond"], level["latency"]["p50"] * 1000.0, level["latency"]["p95"] * 1000.0,
+                   level["latency"]["p99"] * 1000.0, level["cpuUsage"] * 100.0, level["errors"], level["skippedSteps"]))
+
+        return levels
+
+    finally:
+        await client.close()
+
+
+# Parse arguments
+parser = argparse.ArgumentParser(description='Measures end-to-end latency (frame capture to result received) of an in-process server replaying synthetic camera frames, for an increasing number of concurrent requests.')
+parser.add_argument('-l', '--levels', default='1,5,20,50', help='Comma separated numbers of concurrent requests. Defaults to 1,5,20,50')
+parser.add_argument('-d', '--duration', type=float, default=10.0, help='Seconds to measure per level. Defaults to 10')
+parser.add_argument('-w', '--warmup', type=float, default=2.0, help='Seconds to warm up per level. Defaults to 2')
+parser.add_argument('-f', '--fps', type=float, default=30.0, help='Camera frames per second, or 0 for as fast as possible. Defaults to 30')
+parser.add_argument('-p', '--port', type=int, default=9101, help='Websocket port. Defaults to 9101')
+parser.add_argument('-e', '--encoding', default='json', choices=['json', 'msgpack'], help='Message encoding. Defaults to json')
+parser.add_argument('-o', '--output', help='Write results as JSON to file')
+args = parser.parse_args()
+args.levels = [int(level) for level in args.levels.split(',')]
+
+# Start server with synthetic camera
+server = Server(port=args.port, camera_source=SyntheticFrameSource(), camera_fps=args.fps)
+server.start()
+
+try:
+    levels = asyncio.get_event_loop().run_until_complete(run(args))
+finally:
+    server.stop()
+
+# Write results
+results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+           "platform": platform.platform(),
+           "python": platform.python_version(),
+           "fps": args.fps,
+           "encoding": args.encoding,
+           "levels": levels}
+
+if args.output is not None:
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('\nResults written to %s' % args.output)
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import time
+
+from benchmark.headless_client import connect, prepare_board
+from benchmark.load_client import LoadClient, PROFILES
+from benchmark.synthetic_frame_source import SyntheticFrameSource
+from server.server import Server
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def parse_mix(mix):
+    """
+    Parses a client mix, fx. "game=2,admin=1,debug=1", into the sequence of profiles clients are assigned from.
+
+    :param mix: Comma separated profile=weight pairs
+    :return: List of profile names
+    """
+    profiles = []
+    for entry in mix.split(','):
+        name, weight = entry.split('=') if '=' in entry else (entry, '1')
+        if name not in PROFILES:
+            raise Exception("Unknown client profile: %s. Available: %s" % (name, ", ".join(sorted(PROFILES.keys()))))
+        profiles.extend([name] * int(weight))
+    return profiles
+
+
+async def run_level(control_client, control_connection_id, client_count, profiles, args, tiled_area_id, valid_positions):
+    """
+    Connects the given number of clients, replays their action mixes and measures throughput, latency, errors and
+    message loss per connection.
+
+    :return: Level results
+    """
+    url = "ws://localhost:%i" % args.port
+    clients = [LoadClient(index, profiles[index % len(profiles)], url, args.encoding, tiled_area_id, valid_positions)
+               for index in range(0, client_count)]
+
+    for client in clients:
+        await client.start()
+
+    # Warm up
+    await asyncio.sleep(args.warmup)
+
+    stats_before = (await control_client.request("getStats", timeout=10.0))["payload"]
+
+    # Measure
+    for client in clients:
+        client.reset_stats()
+        client.measuring = True
+
+    start_time = time.perf_counter()
+    start_cpu_time = cpu_time()
+
+    await asyncio.sleep(args.duration)
+
+    elapsed_time = time.perf_counter() - start_time
+    elapsed_cpu_time = cpu_time() - start_cpu_time
+
+    for client in clients:
+        client.measuring = False
+
+    stats_after = (await control_client.request("getStats", timeout=10.0))["payload"]
+
+    # Stop clients, counting unanswered requests as lost
+    for client in clients:
+        await client.stop(drain_time=args.drain)
+
+    connections = [client.stats(elapsed_time) for client in clients]
+
+    # Messages replaced or dropped by the outbound queues of the load clients
+    load_connection_stats = [connection for connection in stats_after["connections"]
+                             if connection["connectionId"] != control_connection_id]
+
+    results = sum([connection["results"] for connection in connections])
+
+    return {"clients": client_count,
+            "duration": elapsed_time,
+            "results": results,
+            "resultsPerSecond": results / elapsed_time,
+            "errors": sum([sum(connection["errorResults"].values()) for connection in connections]),
+            "sent": sum([connection["sent"] for connection in connections]),
+            "lost": sum([connection["lost"] for connection in connections]),
+            "replaced": sum([connection["replaced"] for connection in load_connection_stats]),
+            "dropped": sum([connection["dropped"] for connection in load_connection_stats]),
+            "cpuUsage": elapsed_cpu_time / elapsed_time,
+            "skippedSteps": stats_after["scheduler"]["skippedSteps"] - stats_before["scheduler"]["skippedSteps"],
+            "connections": connections}
+
+
+async def run(args):
+    profiles = parse_mix(args.mix)
+
+    control_client = await connect("ws://localhost:%i" % args.port, args.encoding)
+
+    try:
+
+        # Set up board and areas
+        tiled_area_id = await prepare_board(control_client, tile_count=(32, 20))
+        control_connection_id = (await control_client.request("getStats", timeout=10.0))["payload"]["connections"][0]["connectionId"]
+        valid_positions = [[x, y] for y in range(0, 20, 2) for x in range(0, 32, 2)]
+
+        # Sweep client counts
+        levels = []
+        for client_count in args.clients:
+            level = await run_level(control_client, control_connection_id, client_count, profiles, args, tiled_area_id, valid_positions)
+            levels.append(level)
+
+            print("%4i clients: %8.1f results/s (%.2fx)   CPU %5.0f%%   errors %i   lost %i/%i   replaced %i   dropped %i   skipped steps %i" %
+                  (client_count, level["resultsPerSecond"], level["resultsPerSecond"] / levels[0]["resultsPerSecond"] if levels[0]["resultsPerSecond"] > 0.0 else 0.0,
+                   level["cpuUsage"] * 100.0, level["errors"], level["lost"], level["sent"], level["replaced"], level["dropped"], level["skippedSteps"]))
+
+            for connection in level["connections"]:
+                print("    client %3i %-6s %8.1f results/s   latency p50 %7.1f ms p99 %7.1f ms   response p50 %7.1f ms p99 %7.1f ms   errors %s   lost %i/%i" %
+                      (connection["client"], connection["profile"], connection["resultsPerSecond"],
+                       connection["resultLatency"]["p50"] * 1000.0, connection["resultLatency"]["p99"] * 1000.0,
+                       connection["responseTime"]["p50"] * 1000.0, connection["responseTime"]["p99"] * 1000.0,
+                       connection["errorResults"] if len(connection["errorResults"]) > 0 else "-", connection["lost"], connection["sent"]))
+
+        return levels
+
+    finally:
+        await control_client.close()
+
+
+# Parse arguments
+parser = argparse.ArgumentParser(description='Connects an increasing number of websocket clients to an in-process server replaying synthetic camera frames, replays realistic action mixes and reports per-connection latency, error codes and message loss, and how throughput scales with the number of clients.')
+parser.add_argument('-c', '--clients', default='1,2,4,8', help='Comma separated numbers of clients. Defaults to 1,2,4,8')
+parser.add_argument('-m', '--mix', default='game=1,admin=1,debug=1', help='Client profiles and weights, fx. game=2,admin=1. Profiles: %s. Defaults to game=1,admin=1,debug=1' % ", ".join(sorted(PROFILES.keys())))
+parser.add_argument('-d', '--duration', type=float, default=10.0, help='Seconds to measure per client count. Defaults to 10')
+parser.add_argument('-w', '--warmup', type=float, default=2.0, help='Seconds to warm up per client count. Defaults to 2')
+parser.add_argument('--drain', type=float, default=2.0, help='Seconds to wait for outstanding responses before counting them as lost. Defaults to 2')
+parser.add_argument('-f', '--fps', type=float, default=30.0, help='Camera frames per second, or 0 for as fast as possible. Defaults to 30')
+parser.add_argument('-p', '--port', type=int, default=9102, help='Websocket port. Defaults to 9102')
+parser.add_argument('-e', '--encoding', default='json', choices=['json', 'msgpack'], help='Message encoding. Defaults to json')
+parser.add_argument('-o', '--output', help='Write results as JSON to file')
+args = parser.parse_args()
+args.clients = [int(client_count) for client_count in args.clients.split(',')]
+
+# Start server with synthetic camera
+server = Server(port=args.port, camera_source=SyntheticFrameSource(), camera_fps=args.fps)
+server.start()
+
+try:
+    levels = asyncio.get_event_loop().run_until_complete(run(args))
+finally:
+    server.stop()
+
+# Write results
+results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+           "platform": platform.platform(),
+           "python": platform.python_version(),
+           "fps": args.fps,
+           "encoding": args.encoding,
+           "mix": args.mix,
+           "levels": levels}
+
+if args.output is not None:
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('\nResults written to %s' % args.output)
@@ -1,8 +1,37 @@
+import os
+
 from server.server import Server
 
 
 def main():
-    Server().start()
+
+    # Serve Prometheus metrics if port given
+    metrics_port = int(os.environ["METRICS_PORT"]) if "METRICS_PORT" in os.environ else None
+
+    # Profile scheduler and requests from startup if profiling directory given
+    profiling_directory = os.environ["PROFILING_DIRECTORY"] if "PROFILING_DIRECTORY" in os.environ else None
+
+    # Replay recorded session, directory of images or video file instead of using the camera, if given. Frames are
+    # replayed at CAMERA_FPS frames per second, or as fast as possible if CAMERA_FPS is 0
+    camera_source = os.environ["CAMERA_SOURCE"] if "CAMERA_SOURCE" in os.environ else None
+    camera_fps = float(os.environ["CAMERA_FPS"]) if "CAMERA_FPS" in os.environ else None
+    camera_loop = os.environ["CAMERA_LOOP"] != "0" if "CAMERA_LOOP" in os.environ else True
+
+    # Run CPU heavy detectors in a pool of DETECTOR_PROCESSES worker processes, if given
+    detector_processes = int(os.environ["DETECTOR_PROCESSES"]) if "DETECTOR_PROCESSES" in os.environ else None
+
+    # Limit memory usage of board snapshot history to SNAPSHOT_HISTORY_MAX_BYTES, if given
+    max_snapshot_history_bytes = int(os.environ["SNAPSHOT_HISTORY_MAX_BYTES"]) if "SNAPSHOT_HISTORY_MAX_BYTES" in os.environ else None
+
+    Server(metrics_port=metrics_port,
+           profiling_directory=profiling_directory,
+           camera_source=camera_source,
+           camera_fps=camera_fps,
+           camera_loop=camera_loop,
+           detector_processes=detector_processes,
+           max_snapshot_history_bytes=max_snapshot_history_bytes).start()
 
 
-main()
+# Worker processes are spawned, and import this module without running the server
+if __name__ == "__main__":
+    main()
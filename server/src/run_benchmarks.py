@@ -0,0 +1,124 @@
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import traceback
+
+import cv2
+import numpy as np
+
+from benchmark.board_detection_benchmark import BoardDetectionBenchmark
+from benchmark.colored_brick_detection_benchmark import ColoredBrickDetectionBenchmark
+from benchmark.hand_detection_benchmark import HandDetectionBenchmark
+from benchmark.image_detection_benchmark import ImageDetectionBenchmark
+from benchmark.nonobstructed_area_detection_benchmark import NonobstructedAreaDetectionBenchmark
+from benchmark.tiled_brick_detection_benchmark import TiledBrickDetectionBenchmark
+
+
+# Benchmarks to run
+benchmarks = [
+    {'benchmark': BoardDetectionBenchmark(), 'filter': ['BOARD_DETECTION', 'ALL', 'BASIC']},
+    {'benchmark': TiledBrickDetectionBenchmark(), 'filter': ['BRICK_DETECTION', 'ALL', 'BASIC']},
+    {'benchmark': ColoredBrickDetectionBenchmark(), 'filter': ['COLORED_BRICK_DETECTION', 'ALL']},
+    {'benchmark': HandDetectionBenchmark(), 'filter': ['HAND_DETECTION', 'ALL', 'BASIC']},
+    {'benchmark': ImageDetectionBenchmark(), 'filter': ['IMAGE_DETECTION', 'ALL', 'BASIC']},
+    {'benchmark': NonobstructedAreaDetectionBenchmark(), 'filter': ['NONOBSTRUCTED_AREA_DETECTION', 'ALL', 'BASIC']},
+]
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compares benchmark results with a baseline. Median latency and peak memory of every benchmark must not exceed
+    the baseline by more than the tolerance.
+
+    :param results: Benchmark results
+    :param baseline: Baseline benchmark results
+    :param tolerance: Allowed increase as fraction of baseline, fx. 0.2
+    :return: List of regression descriptions
+    """
+    regressions = []
+
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+
+        baseline_result = baseline["benchmarks"][name]
+        if "error" in result or "error" in baseline_result:
+            continue
+
+        for description, value, baseline_value, unit, scale in [
+                ("median latency", result["latency"]["p50"], baseline_result["latency"]["p50"], "ms", 1000.0),
+                ("peak memory", result["peakMemoryBytes"], baseline_result["peakMemoryBytes"], "MB", 1.0 / (1024.0 * 1024.0))]:
+            if value > baseline_value * (1.0 + tolerance):
+                regressions.append('%s: %s %.2f %s exceeds baseline %.2f %s by %.0f%%' % (name, description, value * scale, unit, baseline_value * scale, unit, (value / baseline_value - 1.0) * 100.0))
+
+    return regressions
+
+
+# Parse arguments
+parser = argparse.ArgumentParser(description='Benchmarks detectors on the images in test/resources.')
+parser.add_argument('filters', nargs='*', default=['ALL'], help='Benchmarks to run, fx. HAND_DETECTION. Defaults to ALL')
+parser.add_argument('-n', '--iterations', type=int, default=30, help='Timed iterations per benchmark')
+parser.add_argument('-w', '--warmup', type=int, default=3, help='Warmup iterations per benchmark')
+parser.add_argument('-o', '--output', help='Write results as JSON to file')
+parser.add_argument('-b', '--baseline', help='Compare results with baseline JSON file, and fail on regressions')
+parser.add_argument('-t', '--tolerance', type=float, default=0.2, help='Allowed regression as fraction of baseline. Defaults to 0.2')
+args = parser.parse_args()
+
+# Run benchmarks
+results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+           "platform": platform.platform(),
+           "python": platform.python_version(),
+           "opencv": cv2.__version__,
+           "numpy": np.__version__,
+           "iterations": args.iterations,
+           "benchmarks": {}}
+
+error_count = 0
+
+for benchmark_dict in benchmarks:
+
+    # Filter check
+    if not any([f in benchmark_dict['filter'] for f in args.filters]):
+        continue
+
+    # Run benchmark
+    benchmark = benchmark_dict['benchmark']
+    try:
+        results["benchmarks"].update(benchmark.run(iterations=args.iterations, warmup_iterations=args.warmup))
+    except Exception as e:
+        print('%s FAILED: %s' % (type(benchmark).__name__, str(e)))
+        traceback.print_exc(file=sys.stdout)
+        results["benchmarks"][type(benchmark).__name__] = {"error": str(e)}
+        error_count += 1
+
+# Peak resident memory of whole process. Reported in kilobytes on Linux and in bytes on macOS
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+results["maxRssBytes"] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+# Write results
+if args.output is not None:
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('\nResults written to %s' % args.output)
+
+# Compare with baseline
+regressions = []
+if args.baseline is not None:
+    with open(args.baseline) as f:
+        regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+
+print()
+print('Result: %i benchmark%s completed' % (len(results["benchmarks"]) - error_count, '' if len(results["benchmarks"]) - error_count == 1 else 's'))
+if error_count > 0:
+    print('        %i benchmark class%s FAILED!' % (error_count, 'es' if error_count > 1 else ''))
+if len(regressions) > 0:
+    print('        %i REGRESSION%s against baseline %s:' % (len(regressions), 'S' if len(regressions) > 1 else '', args.baseline))
+    for regression in regressions:
+        print('        %s' % regression)
+print()
+
+if error_count > 0 or len(regressions) > 0:
+    sys.exit(1)
@@ -0,0 +1,211 @@
+import json
+import multiprocessing
+import sys
+import time
+import traceback
+
+import cv2
+
+from server import camera_file
+from server.session_recorder import json_value
+from tracking.board.board_snapshot import get_snapshot_width
+from tracking.board.board_transform import BoardTransform
+from tracking.calibrators.board_calibrator import BoardCalibrator
+from tracking.detectors import registry
+
+
+class BatchProcessor(object):
+    """
+    Runs a detector over all frames of a recorded session, a directory of images or a video file, fanning the frames
+    out to a process pool.
+
+    Images never pass between processes: the pool is only sent ranges of frame indices, and every worker opens the
+    frame source itself and reads the frames of its ranges (memory-mapping raw sessions). Only the small detector
+    results are sent back, and are written as JSON lines in frame order.
+
+    Frames are warped to the board before detection if board corners are known, either given or recorded with the
+    frames of a session. Otherwise the detector sees the whole frame.
+    """
+
+    def __init__(self, source_path, detector_name, detector_options={}, corners=None, processes=None, chunk_size=16):
+        """
+        :param source_path: Recorded session directory, directory of images, or video file
+        :param detector_name: Registered detector name (see tracking.detectors.registry)
+        :param detector_options: Detector options
+        :param corners: (Optional) Board corners to use for all frames, instead of the corners recorded in a session
+        :param processes: (Optional) Number of worker processes. Defaults to the number of CPUs
+        :param chunk_size: Number of consecutive frames per task
+        """
+        self.source_path = source_path
+        self.detector_name = detector_name
+        self.detector_options = detector_options
+        self.corners = corners
+        self.processes = processes if processes is not None else multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+
+    def run(self, output_file, start=0, end=None):
+        """
+        Processes frames and writes results to the output file as they complete, one JSON line per frame
+        {index, ..frame info, seconds, result} or {index, ..frame info, error}.
+
+        :param output_file: File to write JSON lines to
+        :param start: First frame
+        :param end: (Optional) Frame to stop before. Defaults to all frames
+        :return: {frames, errors, duration, framesPerSecond, processes}
+        """
+        # Open source and create detector once before starting the pool, so that errors are raised here rather than in
+        # every worker
+        registry.create_detector(self.detector_name, self.detector_options)
+
+        source = camera_file.open_frame_source(self.source_path)
+        try:
+            frame_count = source.frame_count()
+        finally:
+            source.close()
+
+        if frame_count <= 0:
+            raise Exception("No frames in %s" % self.source_path)
+
+        end = min(end, frame_count) if end is not None else frame_count
+        chunks = [(chunk_start, min(chunk_start + self.chunk_size, end)) for chunk_start in range(start, end, self.chunk_size)]
+
+        processed_count = 0
+        error_count = 0
+        start_time = time.perf_counter()
+
+        with multiprocessing.Pool(self.processes, initializer=initialize_worker,
+                                  initargs=(self.source_path, self.detector_name, self.detector_options, self.corners)) as pool:
+            for results in pool.imap(process_chunk, chunks):
+                for result in results:
+                    output_file.write(json.dumps(result, default=json_value) + "\n")
+
+                    processed_count += 1
+                    if "error" in result:
+                        error_count += 1
+
+                output_file.flush()
+
+        duration = time.perf_counter() - start_time
+
+        return {"frames": processed_count,
+                "errors": error_count,
+                "duration": duration,
+                "framesPerSecond": processed_count / duration if duration > 0.0 else 0.0,
+                "processes": self.processes}
+
+
+class BatchWorker(object):
+    """
+    Detector and frame source of a worker process.
+    """
+
+    def __init__(self, source_path, detector_name, detector_options, corners):
+        self.source = camera_file.open_frame_source(source_path)
+        self.detector = registry.create_detector(detector_name, detector_options)
+        self.corners = corners
+
+        self.image_width = get_snapshot_width(self.detector.preferred_input_image_resolution())
+        self.board_transform = None
+
+    def process_chunk(self, chunk):
+        """
+        Runs the detector on a range of frames.
+
+        :param chunk: (start, end) frame indices
+        :return: List of results
+        """
+        start, end = chunk
+        self.source.seek(start)
+
+        results = []
+        for index in range(start, end):
+            frame_info = self.source.frame_info(index)
+            result = dict({"index": index}, **frame_info)
+
+            try:
+                image = self.source.read()
+                if image is None:
+                    raise Exception("Could not read frame")
+
+                start_time = time.perf_counter()
+
+                detector_result = self.detector.detect(image=self.detector_image(image, frame_info))
+
+                result["seconds"] = time.perf_counter() - start_time
+                result["result"] = detector_result
+
+            except Exception as e:
+                result["error"] = str(e)
+                traceback.print_exc(file=sys.stderr)
+
+            results.append(result)
+
+        return results
+
+    def detector_image(self, image, frame_info):
+        """
+        Returns the image to run the detector on: the board warped from the frame if board corners are known, or
+        else the whole frame. Images are scaled down to the input resolution of the detector.
+        """
+        corners = self.corners if self.corners is not None else frame_info.get("corners")
+
+        if corners is not None:
+            if self.board_transform is None or not self.board_transform.has_corners(corners):
+                self.board_transform = BoardTransform(corners)
+            return self.board_transform.warp_image(image, max_width=self.image_width)
+
+        image_height, image_width = image.shape[:2]
+        if self.image_width is None or image_width <= self.image_width:
+            return image
+
+        return cv2.resize(image, (int(self.image_width), int(image_height * self.image_width / image_width)), interpolation=cv2.INTER_AREA)
+
+
+def calibrate_board(source_path, board_image_filename="resources/calibration/board_calibration.png", max_frames=30):
+    """
+    Detects the board corners in the first frames of a frame source.
+
+    :param source_path: Recorded session directory, directory of images, or video file
+    :param board_image_filename: Board calibration image
+    :param max_frames: Maximum number of frames to try
+    :return: Board corners, or None if the board was not found
+    """
+    board_calibrator = BoardCalibrator(board_image_filename=board_image_filename)
+
+    source = camera_file.open_frame_source(source_path)
+    try:
+        for _ in range(0, max_frames):
+            image = source.read()
+            if image is None:
+                return None
+
+            corners = board_calibrator.detect(image)
+            if corners is not None:
+                return corners
+
+        return None
+    finally:
+        source.close()
+
+
+# Worker process state
+_worker = None
+_worker_error = None
+
+
+def initialize_worker(source_path, detector_name, detector_options, corners):
+    global _worker, _worker_error
+
+    # Exceptions raised by pool initializers make the pool respawn the worker forever, so they are raised by the
+    # first task instead
+    try:
+        _worker = BatchWorker(source_path, detector_name, detector_options, corners)
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        _worker_error = "Could not initialize worker: %s" % str(e)
+
+
+def process_chunk(chunk):
+    if _worker is None:
+        raise Exception(_worker_error)
+    return _worker.process_chunk(chunk)
@@ -0,0 +1,87 @@
+import sys
+import traceback
+from threading import Lock
+
+import cv2
+
+from util import metrics, tracing
+
+
+class BaseCamera(object):
+    """
+    Base class of camera inputs, publishing images to a frame ring buffer and passing them on to the delegate.
+
+    Subclasses start and stop the input, and grab images in a thread of their own, calling call_delegate and
+    publish_image for every image. The ring buffer (self.frames) is created when started.
+    """
+
+    delegate = None
+    stopped = False
+    frames = None
+    lock = Lock()
+    debug_image = None
+
+    def read(self):
+        """
+        Returns the most recent image read from the camera input.
+        """
+        frame = self.frames.latest()
+        return frame.image if frame is not None else None
+
+    def read_frame(self):
+        """
+        Returns the most recent frame read from the camera input.
+        """
+        return self.frames.latest()
+
+    def read_next(self, after_seq=0, timeout=None):
+        """
+        Waits for a frame newer than the given sequence number.
+
+        :param after_seq: Sequence number of last frame seen by caller
+        :param timeout: (Optional) Maximum time in seconds to wait
+        :return: Most recent frame, or None if timed out
+        """
+        return self.frames.read_next(after_seq, timeout)
+
+    def set_low_brightness(self):
+        pass
+
+    def set_normal_brightness(self):
+        pass
+
+    def set_high_brightness(self):
+        pass
+
+    def publish_image(self, image, timestamp=None):
+        """
+        Publishes the given image as the most recent frame.
+
+        :param image: Image
+        :param timestamp: (Optional) Capture timestamp
+        """
+        self.frames.write(image, timestamp, tracing.current_trace())
+        metrics.get_metrics().rate("camera_frames").mark()
+
+    def call_delegate(self, current_image):
+        if self.delegate is not None:
+            try:
+                with metrics.get_metrics().timer("snapshot_update_seconds"):
+                    self.delegate.camera_image_updated(current_image)
+            except Exception as e:
+                print("Exception in handleMessage: %s" % str(e))
+                traceback.print_exc(file=sys.stdout)
+
+    def set_debug_image(self, image):
+        """
+        Overrides the camera input with the given image. Set to None to revert to camera input.
+
+        :param image: Debug image
+        """
+        with self.lock:
+            if len(image.shape) == 3 and image.shape[2] == 4:
+                image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # Remove alpha channel
+            self.debug_image = image
+        with tracing.trace_context(tracing.next_trace()):
+            self.call_delegate(image)
+            self.publish_image(image)
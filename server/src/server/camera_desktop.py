@@ -1,22 +1,17 @@
 from __future__ import with_statement
 
-import traceback
-
 import cv2
 import time
 from threading import Thread
-from threading import Lock
 
-import sys
+from server.camera_base import BaseCamera
+from server.frame_ring_buffer import FrameRingBuffer
+from util import metrics, tracing
 
 
-class Camera(object):
-    delegate = None
-    stopped = False
-    image = None
+class Camera(BaseCamera):
     camera = None
-    lock = Lock()
-    debug_image = None
+    camera_image = None
 
     def start(self, delegate, resolution=(640, 480), framerate=16):
         """
@@ -28,13 +23,14 @@ class Camera(object):
         """
         self.delegate = delegate
         self.stopped = False
+        self.frames = FrameRingBuffer()
 
         # Initialize camera
         self.camera = cv2.VideoCapture(0)
         self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
         self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
         self.set_normal_brightness()
-        self.grab_image()
+        self.publish_image(*self.grab_image())
 
         # Start thread
         thread = Thread(target=self.update, args=())
@@ -48,21 +44,17 @@ class Camera(object):
         self.stopped = True
         self.camera.release()
 
-    def read(self):
-        """
-        Returns the most recent image read from the camera input.
-        """
-        with self.lock:
-            return self.image
-
     def update(self):
         """
         Grabs next image from camera.
         """
         while not self.stopped:
-            time.sleep(0.01)
-            current_image = self.grab_image()
-            self.call_delegate(current_image)
+            with tracing.trace_context(tracing.next_trace()) as trace:
+                image, timestamp = self.grab_image()
+                trace.capture_timestamp = timestamp
+
+                self.call_delegate(image)
+                self.publish_image(image, timestamp)
 
     def set_low_brightness(self):
         with self.lock:
@@ -78,34 +70,20 @@ class Camera(object):
 
     def grab_image(self):
         """
-        Grabs an image from the camera input.
-        """
-        _, camera_image = self.camera.read()
-
-        camera_image = cv2.rotate(camera_image, cv2.ROTATE_180)
+        Grabs an image from the camera input into the next frame buffer.
 
-        with self.lock:
-            if self.debug_image is None:
-                self.image = camera_image
-            return self.image
-
-    def call_delegate(self, current_image):
-        if self.delegate is not None:
-            try:
-                self.delegate.camera_image_updated(current_image)
-            except Exception as e:
-                print("Exception in handleMessage: %s" % str(e))
-                traceback.print_exc(file=sys.stdout)
-
-    def set_debug_image(self, image):
+        :return: (image, capture timestamp)
         """
-        Overrides the camera input with the given image. Set to None to revert to camera input.
+        with metrics.get_metrics().timer("camera_grab_seconds"):
+            _, self.camera_image = self.camera.read(self.camera_image)
+        timestamp = time.time()
 
-        :param image: Debug image
-        """
         with self.lock:
-            if len(image.shape) == 3 and image.shape[2] == 4:
-                image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # Remove alpha channel
-            self.debug_image = image
-            self.image = image
-            self.call_delegate(self.image)
+            if self.debug_image is not None:
+                return self.debug_image, timestamp
+
+        with metrics.get_metrics().timer("camera_rotate_seconds"):
+            image = self.frames.next_buffer(self.camera_image.shape, self.camera_image.dtype)
+            cv2.rotate(self.camera_image, cv2.ROTATE_180, dst=image)
+
+        return image, timestamp
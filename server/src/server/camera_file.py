@@ -0,0 +1,299 @@
+import os
+import time
+from threading import Thread
+
+import cv2
+import numpy as np
+
+from server import session_recorder
+from server.camera_base import BaseCamera
+from server.frame_ring_buffer import FrameRingBuffer
+from util import metrics, tracing
+
+
+class ImageDirectorySource(object):
+    """
+    Frame source reading the images of a directory in filename order.
+
+    Like all file frame sources, frames can also be read in any order by seeking, and frame_info returns what is
+    known about a frame besides the image.
+    """
+
+    image_extensions = [".png", ".jpg", ".jpeg", ".bmp"]
+
+    def __init__(self, directory):
+        self.filenames = sorted([os.path.join(directory, filename) for filename in os.listdir(directory)
+                                 if os.path.splitext(filename)[1].lower() in self.image_extensions])
+        self.index = 0
+        self.fps = None
+
+        if len(self.filenames) == 0:
+            raise Exception("No images found in %s" % directory)
+
+    def read(self):
+        """
+        Reads the next frame.
+
+        :return: Image, or None if no more frames
+        """
+        if self.index >= len(self.filenames):
+            return None
+
+        image = cv2.imread(self.filenames[self.index])
+        self.index += 1
+
+        return image
+
+    def rewind(self):
+        self.index = 0
+
+    def seek(self, index):
+        self.index = index
+
+    def frame_count(self):
+        return len(self.filenames)
+
+    def frame_info(self, index):
+        return {"file": self.filenames[index]}
+
+    def close(self):
+        pass
+
+
+class VideoSource(object):
+    """
+    Frame source reading the frames of a video file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.video = cv2.VideoCapture(filename)
+
+        if not self.video.isOpened():
+            raise Exception("Could not open video %s" % filename)
+
+        fps = self.video.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps > 0 else None
+
+    def read(self):
+        """
+        Reads the next frame.
+
+        :return: Image, or None if no more frames
+        """
+        success, image = self.video.read()
+        return image if success else None
+
+    def rewind(self):
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def seek(self, index):
+        if int(self.video.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+            return
+
+        # Some backends and containers only seek to the nearest keyframe, which would silently shift all frame indices
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, index)
+        position = int(self.video.get(cv2.CAP_PROP_POS_FRAMES))
+        if position != index:
+            raise Exception("Could not seek to frame %i of video %s, got frame %i" % (index, self.filename, position))
+
+    def frame_count(self):
+        """
+        Returns the number of frames given by the video container, which may be approximate. Frames past the end read
+        as None.
+        """
+        frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count <= 0:
+            raise Exception("Unknown number of frames in video %s" % self.filename)
+
+        return frame_count
+
+    def frame_info(self, index):
+        return {}
+
+    def close(self):
+        self.video.release()
+
+
+class SessionSource(object):
+    """
+    Frame source reading the frames of a session recorded by the session recorder. Raw frames are memory-mapped
+    rather than read.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        session, self.frames = session_recorder.load_frames_index(directory)
+        self.index = 0
+
+        if len(self.frames) == 0:
+            raise Exception("No frames recorded in %s" % directory)
+
+        # Replay at recorded frame rate
+        duration = self.frames[-1]["timestamp"] - self.frames[0]["timestamp"]
+        self.fps = (len(self.frames) - 1) / duration if duration > 0.0 else None
+
+        raw_frames_filename = os.path.join(directory, session_recorder.RAW_FRAMES_FILENAME)
+        self.raw_frames = np.memmap(raw_frames_filename, dtype=np.uint8, mode="r") if session["frameFormat"] == "raw" else None
+
+    def read(self):
+        """
+        Reads the next frame.
+
+        :return: Image, or None if no more frames
+        """
+        if self.index >= len(self.frames):
+            return None
+
+        frame = self.frames[self.index]
+        self.index += 1
+
+        if self.raw_frames is not None:
+            dtype = np.dtype(frame["dtype"])
+            size = int(np.prod(frame["shape"])) * dtype.itemsize
+            return self.raw_frames[frame["offset"]:frame["offset"] + size].view(dtype).reshape(frame["shape"])
+
+        return cv2.imread(os.path.join(self.directory, frame["file"]))
+
+    def rewind(self):
+        self.index = 0
+
+    def seek(self, index):
+        self.index = index
+
+    def frame_count(self):
+        return len(self.frames)
+
+    def frame_info(self, index):
+        frame = self.frames[index]
+        return {"seq": frame["seq"], "timestamp": frame["timestamp"], "traceId": frame["traceId"], "corners": frame["corners"]}
+
+    def close(self):
+        pass
+
+
+def open_frame_source(source):
+    """
+    Opens the frame source at the given path.
+
+    :param source: Recorded session directory, directory of images, or video file. Any other object is taken to be
+                   a frame source already
+    :return: Frame source
+    """
+    if not isinstance(source, str):
+        return source
+    if session_recorder.is_session_directory(source):
+        return SessionSource(source)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source)
+    return VideoSource(source)
+
+
+class Camera(BaseCamera):
+    """
+    Camera replaying frames from a recorded session, a directory of images or a video file instead of camera
+    hardware, fx. for deterministic tests and benchmarks of the whole server.
+
+    Frames are replayed at a fixed rate (real-time), or as fast as the pipeline can take them. Frames are passed on
+    exactly like the live cameras do, except that they are not rotated.
+    """
+
+    source = None
+
+    def __init__(self, source_path, fps=None, loop=True):
+        """
+        :param source_path: Recorded session directory, directory of images, video file, or frame source
+        :param fps: (Optional) Frames per second to replay at, or 0 to replay as fast as possible. Defaults to the
+                    frame rate of the session or video, or the frame rate given when started
+        :param loop: If True, starts over when all frames have been replayed, or else stops
+        """
+        self.source_path = source_path
+        self.fps = fps
+        self.loop = loop
+
+        self.frame_interval = 0.0
+
+    def start(self, delegate, resolution=(640, 480), framerate=16):
+        """
+        Starts camera input in a new thread.
+
+        :param delegate: Delegate that receives new images
+        :param resolution Resolution. Ignored, frames are replayed in original resolution
+        :param framerate Framerate, if not given by the camera or the video
+        """
+        self.delegate = delegate
+        self.stopped = False
+        self.frames = FrameRingBuffer()
+
+        # Open source
+        self.source = open_frame_source(self.source_path)
+
+        fps = self.fps if self.fps is not None else (self.source.fps if self.source.fps is not None else framerate)
+        self.frame_interval = 1.0 / float(fps) if fps > 0 else 0.0
+
+        # Detectors expect a frame once started
+        image, timestamp = self.grab_image()
+        if image is None:
+            self.source.close()
+            raise Exception("Could not read first frame of %s" % self.source_path)
+
+        self.publish_image(image, timestamp)
+
+        # Start thread
+        thread = Thread(target=self.update, args=())
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """
+        Stops camera input.
+        """
+        self.stopped = True
+
+    def update(self):
+        """
+        Replays next frame.
+        """
+        next_frame_time = time.perf_counter()
+
+        while not self.stopped:
+            with tracing.trace_context(tracing.next_trace()) as trace:
+                image, timestamp = self.grab_image()
+                if image is None:
+                    break
+
+                trace.capture_timestamp = timestamp
+
+                self.call_delegate(image)
+                self.publish_image(image, timestamp)
+
+            # Wait for next frame. Frames are not skipped when falling behind, unlike a live camera
+            if self.frame_interval > 0.0:
+                next_frame_time += self.frame_interval
+                delay = next_frame_time - time.perf_counter()
+                if delay > 0.0:
+                    time.sleep(delay)
+                else:
+                    next_frame_time = time.perf_counter()
+
+        self.stopped = True
+        self.source.close()
+
+    def grab_image(self):
+        """
+        Reads the next frame from the source.
+
+        :return: (image, capture timestamp), or (None, timestamp) if no more frames
+        """
+        with metrics.get_metrics().timer("camera_grab_seconds"):
+            image = self.source.read()
+            if image is None and self.loop:
+                self.source.rewind()
+                image = self.source.read()
+        timestamp = time.time()
+
+        with self.lock:
+            if self.debug_image is not None:
+                return self.debug_image, timestamp
+
+        return image, timestamp
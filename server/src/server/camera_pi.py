@@ -1,28 +1,30 @@
 import cv2
 import time
 from threading import Thread
-from threading import Lock
 from picamera.array import PiRGBArray
 from picamera import PiCamera
 
+from server.camera_base import BaseCamera
+from server.frame_ring_buffer import FrameRingBuffer
+from util import metrics, tracing
 
-class Camera(object):
-    stopped = False
-    image = None
+
+class Camera(BaseCamera):
     camera = None
     raw_capture = None
     stream = None
-    lock = Lock()
-    debug_image = None
 
-    def start(self, resolution=(640, 480), framerate=16):
+    def start(self, delegate, resolution=(640, 480), framerate=16):
         """
         Starts camera input in a new thread.
 
+        :param delegate: Delegate that receives new images
         :param resolution Resolution
         :param framerate Framerate
         """
+        self.delegate = delegate
         self.stopped = False
+        self.frames = FrameRingBuffer()
 
         # Initialize camera
         self.camera = PiCamera()
@@ -45,38 +47,37 @@ class Camera(object):
         """
         self.stopped = True
 
-    def read(self):
-        """
-        Returns the most recent image read from the camera input.
-        """
-        with self.lock:
-            return self.image
-
     def update(self):
         """
         Grabs next image from camera.
         """
-        for f in self.stream:
-
-            # Sleep a while
-            time.sleep(0.01)
+        grab_start_time = time.perf_counter()
 
-            # Grab image
-            rotated_image = f.array
-            self.raw_capture.truncate(0)
+        for f in self.stream:
+            with tracing.trace_context(tracing.next_trace()) as trace:
+                timestamp = trace.capture_timestamp
+                grab_duration = time.perf_counter() - grab_start_time
+                metrics.get_metrics().histogram("camera_grab_seconds").record(grab_duration)
+                tracing.get_tracer().record("camera_grab", grab_start_time, grab_duration)
+
+                # Grab image
+                with self.lock:
+                    debug_image = self.debug_image
+
+                if debug_image is None:
+
+                    # Rotate image 180 degrees into next frame buffer
+                    with metrics.get_metrics().timer("camera_rotate_seconds"):
+                        image = self.frames.next_buffer(f.array.shape, f.array.dtype)
+                        cv2.rotate(f.array, cv2.ROTATE_180, dst=image)
+                else:
+                    image = debug_image
 
-            # Rotate image 180 degrees
-            (height, width) = rotated_image.shape[:2]
-            center = (width / 2, height / 2)
-            matrix = cv2.getRotationMatrix2D(center, 180, 1.0)
-            rotated_image = cv2.warpAffine(rotated_image, matrix, (width, height))
+                self.raw_capture.truncate(0)
 
-            # Grab image
-            with self.lock:
-                if self.debug_image is None:
-                    self.image = rotated_image
-                else:
-                    self.image = self.debug_image
+                # Publish image
+                self.call_delegate(image)
+                self.publish_image(image, timestamp)
 
             # Stop
             if self.stopped:
@@ -85,14 +86,4 @@ class Camera(object):
                 self.camera.close()
                 return
 
-    def set_debug_image(self, image):
-        """
-        Overrides the camera input with the given image. Set to None to revert to camera input.
-
-        :param image: Debug image
-        """
-        with self.lock:
-            if len(image.shape) == 3 and image.shape[2] == 4:
-                image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # Remove alpha channel
-            self.debug_image = image
-            self.image = image
+            grab_start_time = time.perf_counter()
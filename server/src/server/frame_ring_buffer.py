@@ -0,0 +1,129 @@
+import time
+from threading import Condition
+
+import numpy as np
+
+from tracking.util.buffer_pool import lease_buffer
+
+
+class Frame(object):
+    """
+    Class representing a single camera frame published in a frame ring buffer.
+
+    Field variables (READ-ONLY!):
+    image -- Camera image
+    seq -- Monotonic frame sequence number. The first frame has sequence number 1
+    timestamp -- Capture timestamp (as returned by time.time())
+    trace -- Trace of frame (see util.tracing), or None
+    """
+
+    def __init__(self, image, seq, timestamp, trace=None):
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp
+        self.trace = trace
+
+    def age(self):
+        """
+        Returns the time in seconds since the frame was captured.
+
+        :return: Frame age in seconds
+        """
+        return time.time() - self.timestamp
+
+
+class FrameRingBuffer(object):
+    """
+    Fixed-size ring of camera frames with monotonic sequence numbers.
+
+    Image buffers are preallocated per slot and reused when the slot comes around again. If a consumer still
+    holds on to the frame or image previously handed out from a slot (or any view of it), a new buffer is allocated
+    for that slot instead, so published images are never overwritten while in use (see BufferLease).
+    """
+
+    def __init__(self, size=8):
+        """
+        :param size: Number of slots in ring
+        """
+        self.size = size
+        self.condition = Condition()
+
+        self.frames = [None] * size
+        self.buffers = [None] * size
+        self.leases = [None] * size
+
+        self.seq = 0
+
+    def next_buffer(self, shape, dtype=np.uint8):
+        """
+        Returns the image buffer for the next frame to be written. Only to be called from the writing thread.
+
+        :param shape: Image shape
+        :param dtype: Image data type
+        :return: Image buffer of given shape and type
+        """
+        with self.condition:
+            index = (self.seq + 1) % self.size
+
+            # Forget oldest frame, which is replaced by the next frame, unless it is also the most recent one
+            if index != self.seq % self.size:
+                self.frames[index] = None
+
+            if not self._is_buffer_reusable(index, shape, dtype):
+                self.buffers[index] = np.empty(shape, dtype)
+
+            image, self.leases[index] = lease_buffer(self.buffers[index])
+            return image
+
+    def write(self, image, timestamp=None, trace=None):
+        """
+        Publishes a new frame and wakes up all readers waiting for it. The image is stored as is, and is
+        expected to be the buffer returned by next_buffer, if buffer reuse is wanted.
+
+        :param image: Image
+        :param timestamp: (Optional) Capture timestamp. Defaults to now
+        :param trace: (Optional) Trace of frame
+        :return: Published frame
+        """
+        with self.condition:
+            self.seq += 1
+
+            frame = Frame(image, self.seq, timestamp if timestamp is not None else time.time(), trace)
+            self.frames[self.seq % self.size] = frame
+
+            self.condition.notify_all()
+
+            return frame
+
+    def latest(self):
+        """
+        Returns the most recently published frame.
+
+        :return: Most recent frame, or None if no frames has been published
+        """
+        with self.condition:
+            return self.frames[self.seq % self.size] if self.seq > 0 else None
+
+    def read_next(self, after_seq=0, timeout=None):
+        """
+        Returns the most recent frame if it is newer than the given sequence number, or else blocks until a new
+        frame is published. Readers falling behind skip directly to the most recent frame.
+
+        :param after_seq: Sequence number of last frame seen by reader
+        :param timeout: (Optional) Maximum time in seconds to wait. Defaults to waiting forever
+        :return: Most recent frame, or None if timed out
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+
+            return self.frames[self.seq % self.size]
+
+    def _is_buffer_reusable(self, index, shape, dtype):
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            return False
+
+        # Buffer is in use while the image last handed out from it, or any view of it, is referenced
+        lease = self.leases[index]
+        return lease is None or lease() is None
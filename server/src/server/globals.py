@@ -8,6 +8,9 @@ class GlobalState:
 
     debug = False
 
+    # Maximum total memory usage of the snapshots kept in board descriptor history. Kept across resets
+    max_snapshot_history_bytes = 64 * 1024 * 1024
+
     def __init__(self):
 
         # Perform reset
@@ -53,7 +56,7 @@ class GlobalState:
     board_descriptor_lock = RLock()
 
     def reset_board_descriptor(self):
-        board_descriptor = BoardDescriptor()
+        board_descriptor = BoardDescriptor(max_history_bytes=self.max_snapshot_history_bytes)
         board_descriptor.board_size = [1280, 800]
         board_descriptor.border_percentage_size = [0.0, 0.0]
         self.set_board_descriptor(board_descriptor)
@@ -127,6 +130,20 @@ def reset():
         _global_state_instance = GlobalState()
 
 
+def set_max_snapshot_history_bytes(max_snapshot_history_bytes):
+    """
+    Sets the maximum total memory usage of the snapshots kept in board descriptor history, for the current and all
+    future board descriptors.
+
+    :param max_snapshot_history_bytes: Maximum memory usage in bytes, or None for no limit
+    """
+    GlobalState.max_snapshot_history_bytes = max_snapshot_history_bytes
+
+    board_descriptor = get_state().get_board_descriptor()
+    board_descriptor.max_history_bytes = max_snapshot_history_bytes
+    board_descriptor.evict_snapshot_history()
+
+
 def get_state():
     global _global_state_instance, _global_state_instance_lock
     with _global_state_instance_lock:
@@ -0,0 +1,168 @@
+import json
+import struct
+
+import numpy as np
+
+from util import misc_util
+
+if misc_util.module_exists("msgpack"):
+    import msgpack
+else:
+    msgpack = None
+
+
+# MessagePack extension type for packed arrays of little-endian float32 values
+FLOAT32_ARRAY_EXT_TYPE = 1
+
+
+class JsonEncoding(object):
+    """
+    Default message encoding. Messages are sent as JSON text.
+    """
+
+    name = "json"
+
+    def encode(self, message):
+        return json.dumps(message, ensure_ascii=False)
+
+    def encode_batch(self, encoded_messages):
+        return "[" + ",".join(encoded_messages) + "]"
+
+    def describe(self, data):
+        return data[:128]
+
+
+class MessagePackEncoding(object):
+    """
+    Binary message encoding. Messages are sent as MessagePack, with numeric lists packed as float32 arrays.
+
+    A numeric list, or a list of equally long numeric lists (fx. a contour of [x, y] points), of at least
+    min_array_length values is sent as extension type FLOAT32_ARRAY_EXT_TYPE, with the payload:
+    uint8 row length (0 if flat list), followed by the values as little-endian float32.
+    """
+
+    name = "msgpack"
+
+    def __init__(self, min_array_length=4):
+        """
+        :param min_array_length: Minimum number of values in list for it to be packed as float32 array
+        """
+        self.min_array_length = min_array_length
+
+    def encode(self, message):
+        return msgpack.packb(self.pack_numeric_lists(message), use_bin_type=True)
+
+    def encode_batch(self, encoded_messages):
+        return msgpack.Packer().pack_array_header(len(encoded_messages)) + b"".join(encoded_messages)
+
+    def describe(self, data):
+        return "<%i bytes msgpack>" % len(data)
+
+    def pack_numeric_lists(self, value):
+        if isinstance(value, dict):
+            return {key: self.pack_numeric_lists(item) for key, item in value.items()}
+
+        if isinstance(value, (list, tuple, np.ndarray)):
+            array = self.numeric_array(value)
+            if array is not None:
+                row_length = array.shape[1] if array.ndim == 2 else 0
+                return msgpack.ExtType(FLOAT32_ARRAY_EXT_TYPE, struct.pack("<B", row_length) + array.astype("<f4").tobytes())
+            return [self.pack_numeric_lists(item) for item in value]
+
+        if isinstance(value, np.generic):
+            return value.item()
+
+        return value
+
+    def numeric_array(self, value):
+        """
+        Returns the value as a numeric array, if it can be packed without noticeable loss of precision.
+
+        :param value: List
+        :return: Array of 1 or 2 dimensions, or None if not a numeric list
+        """
+        if len(value) == 0 or (not isinstance(value, np.ndarray) and isinstance(value[0], (str, bytes, dict))):
+            return None
+
+        try:
+            array = np.asarray(value)
+        except ValueError:
+            return None
+
+        if array.size < self.min_array_length or array.ndim not in [1, 2] or (array.ndim == 2 and array.shape[1] > 255):
+            return None
+
+        # Floats are packed as is, integers only if exactly representable as float32
+        if array.dtype.kind == 'f':
+            return array
+        if array.dtype.kind in 'iu' and np.max(np.abs(array)) < 2 ** 24:
+            return array
+
+        return None
+
+
+def available_encodings():
+    """
+    Returns the available message encodings.
+
+    :return: Dict of encoding classes by name
+    """
+    encodings = {JsonEncoding.name: JsonEncoding}
+    if msgpack is not None:
+        encodings[MessagePackEncoding.name] = MessagePackEncoding
+    return encodings
+
+
+def subprotocols():
+    """
+    Returns the websocket subprotocols to offer, most preferred first. Each subprotocol is named after its encoding.
+
+    :return: List of subprotocols
+    """
+    return ([MessagePackEncoding.name] if msgpack is not None else []) + [JsonEncoding.name]
+
+
+def decode_binary_request(data):
+    """
+    Decodes a binary request frame. Binary frames are used for requests carrying large binary data, fx. images, and
+    consist of:
+    uint32 big-endian header length, UTF-8 JSON header {action, payload}, binary data
+
+    The binary data is not copied, but added to the payload as a memoryview in field "binaryData". Raises ValueError if
+    the frame is malformed.
+
+    :param data: Binary frame
+    :return: Request dict {action, payload}
+    """
+    if len(data) < 4:
+        raise ValueError("Binary request of %i bytes has no header length" % len(data))
+
+    header_length = struct.unpack_from(">I", data, 0)[0]
+    if 4 + header_length > len(data):
+        raise ValueError("Binary request header length %i exceeds request length %i" % (header_length, len(data)))
+
+    request = json.loads(bytes(memoryview(data)[4:4 + header_length]).decode("utf-8"))
+
+    if not isinstance(request, dict) or "action" not in request:
+        raise ValueError("Binary request header is not a JSON object with an action")
+
+    if "payload" not in request:
+        request["payload"] = {}
+    if not isinstance(request["payload"], dict):
+        raise ValueError("Binary request payload is not a JSON object")
+    request["payload"]["binaryData"] = memoryview(data)[4 + header_length:]
+
+    return request
+
+
+def encoding_for_subprotocol(subprotocol):
+    """
+    Returns the message encoding for the websocket subprotocol negotiated with the client.
+
+    :param subprotocol: Negotiated subprotocol, or None
+    :return: Message encoding
+    """
+    encodings = available_encodings()
+    if subprotocol in encodings:
+        return encodings[subprotocol]()
+    return JsonEncoding()
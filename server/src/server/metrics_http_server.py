@@ -0,0 +1,56 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Thread
+
+from util import metrics
+
+
+class MetricsHttpServer(object):
+    """
+    Local HTTP server exposing the server metrics in Prometheus text format at /metrics.
+    """
+
+    def __init__(self, port, host="localhost"):
+        """
+        :param port: Port to listen on
+        :param host: Host to listen on. Defaults to localhost only
+        """
+        self.port = port
+        self.host = host
+        self.http_server = None
+
+    def start(self):
+        self.http_server = _ThreadingHTTPServer((self.host, self.port), _MetricsRequestHandler)
+
+        thread = Thread(target=self.http_server.serve_forever, args=())
+        thread.daemon = True
+        thread.start()
+
+        print("Serving metrics at http://%s:%i/metrics" % (self.host, self.port))
+
+    def stop(self):
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server = None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = metrics.get_metrics().prometheus_text().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import sys
+import traceback
+from collections import OrderedDict
+
+from server.message_encoding import JsonEncoding
+from util import metrics
+
+
+class OutboundQueue(object):
+    """
+    Queue of messages waiting to be sent to a single websocket connection. Must only be used from the event loop
+    owning the connection.
+
+    Messages pending when the connection is ready to send are batched into a single websocket message (an array).
+    A slow client applies backpressure, since only one send is awaited at a time: while waiting, newer streaming
+    results replace pending results for the same request, and streaming results exceeding the queue limit are
+    dropped. Other messages, fx. final results, are never dropped.
+
+    Messages are encoded one by one, so a message which cannot be encoded is dropped without affecting the rest of the
+    batch. If sending fails, the connection is considered closed, and further messages are ignored.
+    """
+
+    def __init__(self, websocket, encoding=None, max_pending=64, max_batch_size=16, connection_id=None):
+        """
+        :param websocket: Websocket connection
+        :param encoding: (Optional) Message encoding negotiated with client. Defaults to JSON
+        :param max_pending: Maximum number of pending streaming results
+        :param max_batch_size: Maximum number of messages sent in one websocket message
+        :param connection_id: (Optional) Connection ID
+        """
+        self.websocket = websocket
+        self.connection_id = connection_id
+        self.encoding = encoding if encoding is not None else JsonEncoding()
+        self.max_pending = max_pending
+        self.max_batch_size = max_batch_size
+
+        self.pending = OrderedDict()
+        self.message_counter = itertools.count()
+        self.message_available = asyncio.Event()
+
+        self.sent_count = 0
+        self.batch_count = 0
+        self.replaced_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+
+        self.closed = False
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def put(self, message, replaceable=False):
+        """
+        Queues a message for sending.
+
+        :param message: Message dict
+        :param replaceable: If True, message is a streaming result which may be replaced by a newer result for the same
+                            request, or dropped if the queue is full
+        """
+        if self.closed:
+            return
+
+        if replaceable:
+            key = ("REQUEST", message["requestId"])
+
+            # Replace pending result for same request
+            if key in self.pending:
+                self.pending[key] = message
+                self.replaced_count += 1
+                metrics.get_metrics().counter("outbound_replaced_messages").increment()
+                return
+
+            # Drop result if client is too slow
+            if len(self.pending) >= self.max_pending:
+                self.dropped_count += 1
+                metrics.get_metrics().counter("outbound_dropped_messages").increment()
+                return
+        else:
+            key = ("MESSAGE", next(self.message_counter))
+
+        self.pending[key] = message
+        self.message_available.set()
+
+    def pending_count(self):
+        return len(self.pending)
+
+    def stats(self):
+        """
+        Returns queue statistics.
+
+        :return: {connectionId, pending, sent, batches, replaced, dropped, failed, closed}
+        """
+        return {"connectionId": self.connection_id,
+                "pending": len(self.pending),
+                "sent": self.sent_count,
+                "batches": self.batch_count,
+                "replaced": self.replaced_count,
+                "dropped": self.dropped_count,
+                "failed": self.failed_count,
+                "closed": self.closed}
+
+    async def _run(self):
+        while True:
+            await self.message_available.wait()
+            self.message_available.clear()
+
+            while len(self.pending) > 0:
+
+                # Take batch of pending messages
+                batch = []
+                while len(self.pending) > 0 and len(batch) < self.max_batch_size:
+                    batch.append(self.pending.popitem(last=False)[1])
+
+                # Encode batch
+                with metrics.get_metrics().timer("message_encode_seconds", encoding=self.encoding.name):
+                    data = self.encode_batch(batch)
+                if data is None:
+                    continue
+
+                # Send batch. Awaiting the send applies backpressure when client is reading slowly
+                try:
+                    with metrics.get_metrics().timer("websocket_send_seconds"):
+                        await self.websocket.send(data)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print("Exception in outbound queue: %s" % str(e))
+                    traceback.print_exc(file=sys.stdout)
+
+                    # Connection is gone, so stop accepting messages
+                    self.closed = True
+                    self.pending.clear()
+                    return
+
+                self.sent_count += len(batch)
+                self.batch_count += 1
+                metrics.get_metrics().histogram("outbound_batch_size").record(len(batch))
+
+                print("Sent message: %s" % self.encoding.describe(data))
+
+    def encode_batch(self, batch):
+        """
+        Encodes a batch of messages, dropping messages which cannot be encoded. Messages left in the batch are sent.
+
+        :param batch: List of messages. Messages which cannot be encoded are removed
+        :return: Encoded batch, or None if no messages could be encoded
+        """
+        encoded_messages = []
+        encoded_batch = []
+        for message in batch:
+            try:
+                encoded_messages.append(self.encoding.encode(message))
+                encoded_batch.append(message)
+            except Exception as e:
+                print("Could not encode message: %s" % str(e))
+                traceback.print_exc(file=sys.stdout)
+
+                self.failed_count += 1
+                metrics.get_metrics().counter("outbound_failed_messages").increment()
+
+        batch[:] = encoded_batch
+
+        if len(encoded_messages) == 0:
+            return None
+
+        return encoded_messages[0] if len(encoded_messages) == 1 else self.encoding.encode_batch(encoded_messages)
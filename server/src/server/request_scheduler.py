@@ -0,0 +1,152 @@
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, RLock
+
+from server import globals
+from util import metrics, profiling, tracing
+
+
+class RequestScheduler(object):
+    """
+    Central scheduler running all active requests on a bounded pool of worker threads.
+
+    A single scheduler thread waits for new camera frames and steps every active request once per frame. A request
+    still busy with a previous frame is skipped rather than queued, so slow requests never pile up work.
+    """
+
+    def __init__(self, max_workers=4, frame_wait_timeout=0.1, fixed_update_delay=0.01):
+        """
+        :param max_workers: Maximum number of requests stepped concurrently
+        :param frame_wait_timeout: Maximum time to wait for a new frame before stepping requests anyway, so that
+                                   time-based requests (fx. timeouts) make progress without new frames
+        :param fixed_update_delay: Update delay when no camera is running
+        """
+        self.max_workers = max_workers
+        self.frame_wait_timeout = frame_wait_timeout
+        self.fixed_update_delay = fixed_update_delay
+
+        self.lock = RLock()
+        self.requests = []
+        self.running_requests = set()
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="RequestWorker")
+
+        self.last_frame_seq = 0
+        self.last_request_count = 0
+
+        self.frame_count = 0
+        self.skipped_steps = 0
+
+        self.stopped = False
+
+    def start(self):
+        thread = Thread(target=self._run, args=(), name="RequestScheduler")
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.executor.shutdown(wait=False)
+
+    def schedule(self, request):
+        """
+        Adds the request to the active requests and runs its first step right away.
+
+        :param request: Request (of type ServerThread)
+        """
+        with self.lock:
+            self.requests.append(request)
+            self._dispatch(request, None)
+
+    def request_count(self):
+        """
+        Returns the number of requests being multiplexed.
+
+        :return: Number of active requests
+        """
+        with self.lock:
+            return len(self.requests)
+
+    def stats(self):
+        """
+        Returns scheduler statistics.
+
+        :return: {requests, running, workers, frames, skippedSteps}
+        """
+        with self.lock:
+            return {"requests": len(self.requests),
+                    "running": len(self.running_requests),
+                    "workers": self.max_workers,
+                    "frames": self.frame_count,
+                    "skippedSteps": self.skipped_steps}
+
+    def _run(self):
+        while not self.stopped:
+
+            # Wait for next camera frame
+            frame = self._wait_for_next_frame()
+
+            with self.lock, profiling.get_profiler().profile():
+                if frame is not None:
+                    self.frame_count += 1
+
+                # Drop cancelled requests
+                self.requests = [request for request in self.requests if not request.stopped]
+
+                self._report_request_count()
+
+                # Step all requests not busy with previous frame
+                for request in self.requests:
+                    if request in self.running_requests:
+                        self.skipped_steps += 1
+                        metrics.get_metrics().counter("scheduler_skipped_steps").increment()
+                        continue
+                    self._dispatch(request, frame)
+
+    def _wait_for_next_frame(self):
+        camera = globals.get_state().get_camera()
+        if camera is None:
+            time.sleep(self.fixed_update_delay)
+            return None
+
+        frame = camera.read_next(self.last_frame_seq, timeout=self.frame_wait_timeout)
+        if frame is not None:
+
+            # Count frames published while requests were still busy with previous frame
+            if self.last_frame_seq > 0 and frame.seq > self.last_frame_seq + 1:
+                metrics.get_metrics().counter("scheduler_dropped_frames").increment(frame.seq - self.last_frame_seq - 1)
+
+            metrics.get_metrics().rate("scheduler_frames").mark()
+            self.last_frame_seq = frame.seq
+
+        return frame
+
+    def _dispatch(self, request, frame):
+        self.running_requests.add(request)
+        try:
+            self.executor.submit(self._step, request, frame)
+        except RuntimeError:
+            self.running_requests.discard(request)
+
+    def _step(self, request, frame):
+        finished = True
+        try:
+            if not request.stopped:
+                with tracing.trace_context(frame.trace if frame is not None else None), profiling.get_profiler().profile():
+                    with metrics.get_metrics().timer("request_step_seconds", request=type(request).__name__):
+                        finished = request.step(frame)
+        except Exception as e:
+            print("Exception in request %s: %s" % (str(request.request_id), str(e)))
+            traceback.print_exc(file=sys.stdout)
+        finally:
+            with self.lock:
+                self.running_requests.discard(request)
+                if finished or request.stopped:
+                    self.requests = [other_request for other_request in self.requests if other_request is not request]
+
+    def _report_request_count(self):
+        if len(self.requests) != self.last_request_count:
+            self.last_request_count = len(self.requests)
+            print("Scheduler multiplexing %i request%s" % (self.last_request_count, "" if self.last_request_count == 1 else "s"))
@@ -0,0 +1,107 @@
+import time
+
+
+class ResultFilter(object):
+    """
+    Decides which streaming results of a keepRunning request to send to the client.
+
+    Results can be limited to a maximum rate, and to results that differ from the last sent result. Numbers named
+    like positions and sizes are compared with the position tolerance, angles with the angle tolerance, and all other
+    values must be equal.
+    """
+
+    position_keys = ["x", "y", "x1", "y1", "x2", "y2", "width", "height", "center", "position"]
+    angle_keys = ["angle"]
+
+    def __init__(self, send_only_changes=False, position_tolerance=0.0, angle_tolerance=0.0, max_fps=None):
+        """
+        :param send_only_changes: If True, only results differing from the last sent result are sent
+        :param position_tolerance: Maximum difference of positions and sizes considered unchanged
+        :param angle_tolerance: Maximum difference of angles (in degrees) considered unchanged
+        :param max_fps: (Optional) Maximum number of results sent per second
+        """
+        self.send_only_changes = send_only_changes
+        self.position_tolerance = position_tolerance
+        self.angle_tolerance = angle_tolerance
+        self.min_interval = 1.0 / float(max_fps) if max_fps else 0.0
+
+        self.has_sent_result = False
+        self.last_sent_result = None
+        self.last_sent_time = None
+
+        self.suppressed_count = 0
+
+    @staticmethod
+    def from_payload(payload):
+        """
+        Creates a result filter from request payload.
+
+        sendOnlyChanges: (Optional) Only send results differing from the last sent result. Defaults to False
+        positionTolerance: (Optional) Maximum difference of positions and sizes considered unchanged. Defaults to 0.0
+        angleTolerance: (Optional) Maximum difference of angles (in degrees) considered unchanged. Defaults to 0.0
+        maxFps: (Optional) Maximum number of results sent per second. Defaults to unlimited
+
+        :param payload: Request payload
+        :return: Result filter
+        """
+        return ResultFilter(send_only_changes=payload["sendOnlyChanges"] if "sendOnlyChanges" in payload else False,
+                            position_tolerance=payload["positionTolerance"] if "positionTolerance" in payload else 0.0,
+                            angle_tolerance=payload["angleTolerance"] if "angleTolerance" in payload else 0.0,
+                            max_fps=payload["maxFps"] if "maxFps" in payload else None)
+
+    def should_send(self, result):
+        """
+        Checks if the result should be sent, and if so, registers it as sent.
+
+        :param result: Result payload
+        :return: True if result should be sent
+        """
+        now = time.time()
+
+        # Check rate
+        if self.last_sent_time is not None and now < self.last_sent_time + self.min_interval:
+            self.suppressed_count += 1
+            return False
+
+        # Check changed
+        if self.send_only_changes and self.has_sent_result and self.is_equal(result, self.last_sent_result):
+            self.suppressed_count += 1
+            return False
+
+        self.has_sent_result = True
+        self.last_sent_result = result
+        self.last_sent_time = now
+
+        return True
+
+    def is_equal(self, a, b, key=None):
+        """
+        Compares two results within tolerances.
+
+        :param a: Result
+        :param b: Result
+        :param key: Key of values in parent dict, used to select tolerance
+        :return: True if results are considered equal
+        """
+        if isinstance(a, dict) and isinstance(b, dict):
+            if a.keys() != b.keys():
+                return False
+            return all([self.is_equal(a[k], b[k], k) for k in a.keys()])
+
+        if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+            if len(a) != len(b):
+                return False
+            return all([self.is_equal(a[i], b[i], key) for i in range(0, len(a))])
+
+        if isinstance(a, bool) or isinstance(b, bool):
+            return a == b
+
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if key in self.angle_keys:
+                difference = abs(a - b) % 360.0
+                return min(difference, 360.0 - difference) <= self.angle_tolerance
+            if key in self.position_keys:
+                return abs(a - b) <= self.position_tolerance
+            return a == b
+
+        return a == b
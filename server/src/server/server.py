@@ -1,12 +1,15 @@
 from __future__ import with_statement
 
+import atexit
 import base64
+import itertools
 import json
 import sys
 import time
 import traceback
 from random import randint
 
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread, RLock
 
 import cv2
@@ -15,7 +18,14 @@ import numpy as np
 import asyncio
 import websockets
 
+from server import camera_file
 from server import globals
+from server import message_encoding
+from server.outbound_queue import OutboundQueue
+from server.metrics_http_server import MetricsHttpServer
+from server.request_scheduler import RequestScheduler
+from server.result_filter import ResultFilter
+from server.session_recorder import SessionRecorder, FRAME_FORMATS
 from server.threads.board_calibration_thread import BoardCalibrationThread
 from server.threads.gesture_detector_thread import GestureDetectorThread
 from server.threads.hand_detector_calibration_thread import HandDetectorCalibrationThread
@@ -28,7 +38,13 @@ from tracking.board.tiled_board_area import TiledBoardArea
 from tracking.detectors.hand_detector import handDetectorId
 from tracking.detectors.image_detector import ImageDetector
 from tracking.detectors.tensorflow_detector import TensorflowDetector
+from tracking.util import buffer_pool
+from tracking.util import detector_process_pool
+from tracking.util import result_cache
+from util import metrics
 from util import misc_util
+from util import profiling
+from util import tracing
 
 if misc_util.module_exists("picamera"):
     print("Using Raspberry Pi camera")
@@ -42,12 +58,33 @@ class Server(object):
     """
     Server which communicates with the client library.
     """
-    def __init__(self):
+    def __init__(self, port=9001, metrics_port=None, profiling_directory=None, camera_source=None, camera_fps=None, camera_loop=True,
+                 detector_processes=None, max_snapshot_history_bytes=None):
+        """
+        :param port: Websocket port
+        :param metrics_port: (Optional) Port of local HTTP endpoint serving metrics in Prometheus format
+        :param profiling_directory: (Optional) If given, profiling is started right away, and profiles are written to
+                                    the directory when stopped by the client or when the server exits
+        :param camera_source: (Optional) Recorded session directory, directory of images, video file or frame source
+                              (see camera_file) to replay instead of using the camera
+        :param camera_fps: (Optional) Frames per second to replay camera source at, or 0 for as fast as possible
+        :param camera_loop: If True, camera source is replayed from the beginning when done
+        :param detector_processes: (Optional) If given, detectors supporting it (fx. hand and colored brick detectors)
+                                   run in a pool of this many worker processes instead of in the request workers
+        :param max_snapshot_history_bytes: (Optional) Maximum total memory usage of board snapshot history. Defaults
+                                           to GlobalState.max_snapshot_history_bytes
+        """
         self.action_to_function_dict = {'cancelRequest': self.cancel_request,
                                         'cancelRequests': self.cancel_requests,
                                         'reset': self.reset,
                                         'clearState': self.clear_state,
                                         'enableDebug': self.enable_debug,
+                                        'getStats': self.get_stats,
+                                        'dumpTrace': self.dump_trace,
+                                        'startProfiling': self.start_profiling,
+                                        'stopProfiling': self.stop_profiling,
+                                        'startRecording': self.start_recording,
+                                        'stopRecording': self.stop_recording,
                                         'takeScreenshot': self.take_screenshot,
                                         'setDebugCameraImage': self.set_debug_camera_image,
                                         'writeTextToFile': self.write_text_to_file,
@@ -63,13 +100,70 @@ class Server(object):
                                         'detectNonobstructedArea': self.detect_nonobstructed_area,
                                         'detectGestures': self.detect_gestures}
 
+        # Actions cheap enough to run directly on the event loop. All other actions may block (fx. loading models,
+        # decoding images or writing files), and are run in the action executor to not stall other connections
+        self.actions_allowed_on_loop = ['cancelRequest',
+                                        'cancelRequests',
+                                        'clearState',
+                                        'enableDebug',
+                                        'calibrateBoard',
+                                        'calibrateHandDetection',
+                                        'initializeTiledBoardArea',
+                                        'detectTiledBrick',
+                                        'detectTiledBricks',
+                                        'detectTiledBrickMovement',
+                                        'detectImages',
+                                        'detectNonobstructedArea',
+                                        'detectGestures']
+
+        self.action_executor = ThreadPoolExecutor(max_workers=2)
+
         self.detectors = {}
         self.detectors_lock = RLock()
 
         self.threads = {}
         self.threads_lock = RLock()
 
+        self.scheduler = RequestScheduler()
+
+        self.event_loop = None
+        self.outbound_queues = {}
+        self.outbound_queues_lock = RLock()
+
+        self.metrics_http_server = MetricsHttpServer(metrics_port) if metrics_port is not None else None
+        self.register_metrics()
+
+        self.port = port
+
+        self.profiling_directory = profiling_directory
+
+        self.camera_source = camera_source
+        self.camera_fps = camera_fps
+        self.camera_loop = camera_loop
+
+        self.detector_processes = detector_processes
+
+        if max_snapshot_history_bytes is not None:
+            globals.set_max_snapshot_history_bytes(max_snapshot_history_bytes)
+
+        self.connection_ids = itertools.count(1)
+        self.session_recorder = None
+        self.session_recorder_lock = RLock()
+
     def start(self):
+        if self.profiling_directory is not None:
+            profiling.get_profiler().start(self.profiling_directory)
+            atexit.register(profiling.get_profiler().stop)
+
+        if self.detector_processes is not None and self.detector_processes > 0:
+            detector_process_pool.get_pool().start(self.detector_processes)
+            atexit.register(detector_process_pool.get_pool().stop)
+
+        self.scheduler.start()
+
+        if self.metrics_http_server is not None:
+            self.metrics_http_server.start()
+
         thread = Thread(target=self.run, args=())
         thread.start()
 
@@ -79,26 +173,72 @@ class Server(object):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
+        self.event_loop = loop
+
         asyncio.get_event_loop().run_until_complete(
-            websockets.serve(self.handleMessage, "localhost", 9001)
+            websockets.serve(self.handleMessage, "localhost", self.port, subprotocols=message_encoding.subprotocols())
         )
         asyncio.get_event_loop().run_forever()
 
+    def stop(self):
+        """
+        Stops the server: cancels all requests and stops the camera, the scheduler, the detector process pool and the
+        event loop.
+        """
+        self.cancel_threads()
+
+        with globals.get_state().camera_lock:
+            camera = globals.get_state().get_camera()
+            if camera is not None:
+                camera.stop()
+                globals.get_state().set_camera(None)
+
+        self.scheduler.stop()
+
+        detector_process_pool.get_pool().stop()
+
+        if self.metrics_http_server is not None:
+            self.metrics_http_server.stop()
+
+        if self.event_loop is not None:
+            self.event_loop.call_soon_threadsafe(self.event_loop.stop)
+
     async def handleMessage(self, websocket, path):
         """
         Handles incoming messages.
         """
+        outbound_queue = OutboundQueue(websocket, message_encoding.encoding_for_subprotocol(websocket.subprotocol), connection_id=next(self.connection_ids))
+        with self.outbound_queues_lock:
+            self.outbound_queues[websocket] = outbound_queue
+        outbound_queue.start()
+
         try:
             async for data in websocket:
-                message = ("%s" % data)[:128]
+
+                # Binary frames carry a JSON header followed by binary data, fx. an image
+                if isinstance(data, bytes):
+                    try:
+                        json_dict = message_encoding.decode_binary_request(data)
+                    except ValueError as e:
+                        print("Malformed binary request: %s" % str(e))
+                        await self.send_message(websocket, result="MALFORMED_REQUEST", action=None, payload={"error": str(e)})
+                        continue
+
+                    message = "%s <%i bytes binary data>" % (json_dict["action"], len(json_dict["payload"]["binaryData"]))
+                else:
+                    json_dict = json.loads(data)
+                    message = ("%s" % data)[:128]
+
                 print("Got message: %s" % message)
 
-                json_dict = json.loads(data)
+                session_recorder = self.session_recorder
+                if session_recorder is not None:
+                    session_recorder.record_message("in", outbound_queue.connection_id, json_dict)
 
                 if "action" in json_dict:
                     action = json_dict["action"]
 
-                    result = self.handle_action(action, json_dict["payload"], websocket)
+                    result = await self.handle_action(action, json_dict["payload"], websocket)
 
                     if result is not None:
                         await self.send_message(websocket, result=result[0], action=action, payload=result[1], request_id=result[2])
@@ -107,18 +247,44 @@ class Server(object):
             print("Exception in handleMessage: %s" % str(e))
             traceback.print_exc(file=sys.stdout)
 
-    def handle_action(self, action, payload, websocket):
-        if action in self.action_to_function_dict:
-            return self.action_to_function_dict[action](websocket, payload)
-        else:
+        finally:
+            outbound_queue.stop()
+            with self.outbound_queues_lock:
+                self.outbound_queues.pop(websocket, None)
+
+    async def handle_action(self, action, payload, websocket):
+        """
+        Handles an action. Actions not allowed on the event loop are run in the action executor. Messages from the
+        same connection are still handled in order, since the result is awaited before handling the next message.
+
+        :param action: Action
+        :param payload: Payload
+        :param websocket: Websocket instance
+        :return: (result, payload, request_id), or None if result is sent later
+        """
+        if action not in self.action_to_function_dict:
             return "UNDEFINED_ACTION", {}, self.request_id_from_payload(payload)
 
+        action_function = self.action_to_function_dict[action]
+
+        if action in self.actions_allowed_on_loop:
+            return action_function(websocket, payload)
+
+        return await asyncio.get_event_loop().run_in_executor(self.action_executor, action_function, websocket, payload)
+
     def initialize_video(self, resolution):
         with globals.get_state().camera_lock:
             if globals.get_state().get_camera() is not None:
                 return
-            globals.get_state().set_camera(Camera())
-            globals.get_state().get_camera().start(delegate=self, resolution=resolution)
+            if self.camera_source is not None:
+                print("Replaying camera source %s" % self.camera_source)
+                camera = camera_file.Camera(self.camera_source, fps=self.camera_fps, loop=self.camera_loop)
+            else:
+                camera = Camera()
+
+            # Camera is only set when started, so that starting is tried again if it fails
+            camera.start(delegate=self, resolution=resolution)
+            globals.get_state().set_camera(camera)
 
     def cancel_request(self, websocket, payload):
         """
@@ -174,6 +340,113 @@ class Server(object):
 
         return "OK", {}, self.request_id_from_payload(payload)
 
+    def get_stats(self, websocket, payload):
+        """
+        Returns server statistics: latency histograms (p50/p95/p99) and counts per pipeline stage, frame rates, queue
+        depths and dropped frames and messages.
+
+        requestId: (Optional) Request ID
+        """
+        stats = {"metrics": metrics.get_metrics().stats(),
+                 "scheduler": self.scheduler.stats(),
+                 "bufferPool": buffer_pool.get_pool().stats(),
+                 "resultCache": result_cache.get_cache().stats(),
+                 "detectorPool": detector_process_pool.get_pool().stats(),
+                 "connections": [outbound_queue.stats() for outbound_queue in self.outbound_queue_list()]}
+
+        session_recorder = self.session_recorder
+        if session_recorder is not None:
+            stats["recorder"] = session_recorder.stats()
+
+        return "OK", stats, self.request_id_from_payload(payload)
+
+    def dump_trace(self, websocket, payload):
+        """
+        Writes the most recent pipeline spans (camera capture, snapshot update, detection, sending results, etc.) to a
+        trace-event JSON file, which can be opened in chrome://tracing or Perfetto.
+
+        filename: (Optional) Trace filename
+        clear: (Optional) If True, recorded spans are cleared after writing. Defaults to False
+        requestId: (Optional) Request ID
+        """
+        filename = payload["filename"] if "filename" in payload else "resources/traces/trace_{0}.json".format(time.strftime("%Y-%m-%d-%H%M%S"))
+        clear = payload["clear"] if "clear" in payload else False
+
+        span_count = tracing.get_tracer().dump(filename)
+        if clear:
+            tracing.get_tracer().clear()
+
+        return "OK", {"filename": filename, "spanCount": span_count}, self.request_id_from_payload(payload)
+
+    def start_profiling(self, websocket, payload):
+        """
+        Starts profiling the request scheduler and the requests it runs. Profiles are written when profiling is
+        stopped.
+
+        outputDirectory: (Optional) Directory to write profiles to
+        requestId: (Optional) Request ID
+        """
+        output_directory = payload["outputDirectory"] if "outputDirectory" in payload else "resources/profiles/profile_{0}".format(time.strftime("%Y-%m-%d-%H%M%S"))
+
+        if not profiling.get_profiler().start(output_directory):
+            return "PROFILING_ALREADY_RUNNING", {}, self.request_id_from_payload(payload)
+
+        return "OK", {"outputDirectory": output_directory}, self.request_id_from_payload(payload)
+
+    def stop_profiling(self, websocket, payload):
+        """
+        Stops profiling and writes the profiles: merged cProfile statistics (pstats) and sampled stacks in collapsed
+        format for flamegraphs.
+
+        requestId: (Optional) Request ID
+        """
+        result = profiling.get_profiler().stop()
+        if result is None:
+            return "PROFILING_NOT_RUNNING", {}, self.request_id_from_payload(payload)
+
+        return "OK", result, self.request_id_from_payload(payload)
+
+    def start_recording(self, websocket, payload):
+        """
+        Starts recording camera frames, board corners and all websocket messages to a session directory, which can be
+        replayed by starting the server with the session directory as camera source.
+
+        directory: (Optional) Session directory
+        frameFormat: (Optional) Frame format: "jpeg" (default), "png" or "raw" (memory-mappable)
+        requestId: (Optional) Request ID
+        """
+        directory = payload["directory"] if "directory" in payload else "resources/sessions/session_{0}".format(time.strftime("%Y-%m-%d-%H%M%S"))
+        frame_format = payload["frameFormat"] if "frameFormat" in payload else "jpeg"
+
+        if frame_format not in FRAME_FORMATS:
+            return "UNKNOWN_FRAME_FORMAT", {}, self.request_id_from_payload(payload)
+
+        with self.session_recorder_lock:
+            if self.session_recorder is not None:
+                return "RECORDING_ALREADY_RUNNING", {}, self.request_id_from_payload(payload)
+
+            session_recorder = SessionRecorder(directory, frame_format=frame_format)
+            session_recorder.start()
+            self.session_recorder = session_recorder
+
+        return "OK", {"directory": directory}, self.request_id_from_payload(payload)
+
+    def stop_recording(self, websocket, payload):
+        """
+        Stops recording, after writing all frames and messages recorded so far.
+
+        requestId: (Optional) Request ID
+        """
+        # Lock is held until all is written, so that a new recording is not started while the previous one is stopping
+        with self.session_recorder_lock:
+            session_recorder = self.session_recorder
+            if session_recorder is None:
+                return "RECORDING_NOT_RUNNING", {}, self.request_id_from_payload(payload)
+
+            self.session_recorder = None
+
+            return "OK", session_recorder.stop(), self.request_id_from_payload(payload)
+
     def take_screenshot(self, websocket, payload):
         """
         Takes a screenshot and saves it to disk.
@@ -207,13 +480,13 @@ class Server(object):
 
     def set_debug_camera_image(self, websocket, payload):
         """
-        Overriden the camera input with the given image.
+        Overriden the camera input with the given image. The image is either uploaded as binary data in a binary
+        frame, or base 64 encoded.
 
-        imageBase64: Image as base 64 encoded PNG
+        imageBase64: (Optional) Image as base 64 encoded PNG
+        imageShape: (Optional) Shape of image [height, width, channels] if binary data is raw BGR pixels
         """
-        raw_image = base64.b64decode(payload["imageBase64"])
-        raw_bytes = np.asarray(bytearray(raw_image), dtype=np.uint8)
-        image = cv2.imdecode(raw_bytes, cv2.IMREAD_UNCHANGED)
+        image = self.image_from_payload(payload)
 
         camera = globals.get_state().get_camera()
         if camera is None:
@@ -255,7 +528,7 @@ class Server(object):
                                                                                          result="CALIBRATION TIMEOUT",
                                                                                          action="calibrateBoard",
                                                                                          payload={}))
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -271,23 +544,23 @@ class Server(object):
                                                                                                  result="OK",
                                                                                                  action="calibrateHandDetection",
                                                                                                  payload={}))
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
     def setup_image_detector(self, websocket, payload):
         """
-        Sets up an image detector. Either imageBase64 or imagesBase64 must be used.
+        Sets up an image detector. The source image is either uploaded as binary data in a binary frame, or base
+        64 encoded.
 
         detectorId: Detector ID to use as a reference
         imageBase64: (Optional) Source image to detect
+        imageShape: (Optional) Shape of image [height, width, channels] if binary data is raw BGR pixels
         imageResolution: Image resolution to use when detecting (of type tracking.board.board_snapshot.SnapshotSize)
         minMatches: (Optional) Minimum number of matches for detection to be considered successful
         requestId: (Optional) Request ID
         """
-        raw_image = base64.b64decode(payload["imageBase64"])
-        raw_bytes = np.asarray(bytearray(raw_image), dtype=np.uint8)
-        image = cv2.imdecode(raw_bytes, cv2.IMREAD_UNCHANGED)
+        image = self.image_from_payload(payload)
 
         detector = ImageDetector(detector_id=payload["detectorId"], source_image=image)
         if "imageResolution" in payload:
@@ -393,6 +666,10 @@ class Server(object):
         areaId: ID of area to detect images in
         detectorId: ID of detector to use
         keepRunning: (Optional) Keep returning results. Defaults to False
+        sendOnlyChanges: (Optional) Only send results differing from the last sent result. Defaults to False
+        positionTolerance: (Optional) Maximum position difference considered unchanged. Defaults to 0.0
+        angleTolerance: (Optional) Maximum angle difference (in degrees) considered unchanged. Defaults to 0.0
+        maxFps: (Optional) Maximum number of results sent per second. Defaults to unlimited
         requestId: (Optional) Request ID
         """
         board_area = globals.get_state().get_board_area(payload["areaId"])
@@ -414,7 +691,7 @@ class Server(object):
                                                                                                payload=result,
                                                                                                keep_alive=thread.keep_running))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -429,6 +706,10 @@ class Server(object):
         stableTime: (Optional) Time to wait for result to stabilize. Defaults to 0.5.
         padding: (Optional) Area padding.
         keepRunning: (Optional) Keep returning results. Defaults to False
+        sendOnlyChanges: (Optional) Only send results differing from the last sent result. Defaults to False
+        positionTolerance: (Optional) Maximum position difference considered unchanged. Defaults to 0.0
+        angleTolerance: (Optional) Maximum angle difference (in degrees) considered unchanged. Defaults to 0.0
+        maxFps: (Optional) Maximum number of results sent per second. Defaults to unlimited
         requestId: (Optional) Request ID
         """
         board_area = globals.get_state().get_board_area(payload["areaId"])
@@ -450,7 +731,7 @@ class Server(object):
                                                                                                           payload=result,
                                                                                                           keep_alive=thread.keep_running))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -461,6 +742,10 @@ class Server(object):
         areaId: ID of area to detect images in
         gesture: (Optional) Gesture to detect
         keepRunning: (Optional) Keep returning results. Defaults to False
+        sendOnlyChanges: (Optional) Only send results differing from the last sent result. Defaults to False
+        positionTolerance: (Optional) Maximum position difference considered unchanged. Defaults to 0.0
+        angleTolerance: (Optional) Maximum angle difference (in degrees) considered unchanged. Defaults to 0.0
+        maxFps: (Optional) Maximum number of results sent per second. Defaults to unlimited
         requestId: (Optional) Request ID
         """
         board_area = globals.get_state().get_board_area(payload["areaId"])
@@ -482,7 +767,7 @@ class Server(object):
                                                                                                 payload=result,
                                                                                                 keep_alive=thread.keep_running))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -513,7 +798,7 @@ class Server(object):
                                                                    action="detectTiledBrick",
                                                                    payload={"tile": tile} if tile else {}))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -541,7 +826,7 @@ class Server(object):
                                                                     action="detectTiledBricks",
                                                                     payload={"tiles": tiles}))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
@@ -573,29 +858,87 @@ class Server(object):
                                                                                          payload={"position": to_position,
                                                                                                   "initialPosition": from_position}))
 
-        self.start_thread(self.request_id_from_payload(payload), thread)
+        self.start_thread(self.request_id_from_payload(payload), thread, payload)
 
         return None
 
-    async def send_message(self, websocket, result, action, payload={}, request_id=None):
+    async def send_message(self, websocket, result, action, payload={}, request_id=None, replaceable=False, trace=None):
         """
-        Sends a new message to the client.
+        Queues a new message to be sent to the client. Must be called from the server event loop.
+
+        Messages carrying results from camera frames include the trace ID, the capture timestamp of the frame and the
+        time the result was queued (traceId, captureTimestamp and resultTimestamp), so clients can measure latency.
 
         :param websocket Websocket instance
         :param result Result code
         :param action Client action from which the message originates
         :param payload Payload
         :param request_id: Request ID
+        :param replaceable: If True, message may be replaced by a newer message for the same request, or dropped if
+                            the client is reading too slowly
+        :param trace: (Optional) Trace of the camera frame the result is from
         """
+        with self.outbound_queues_lock:
+            outbound_queue = self.outbound_queues.get(websocket)
+        if outbound_queue is None:
+            print("Connection closed. Dropping message for request %s" % str(request_id))
+            return
+
         message = {"result": result,
                    "action": action,
                    "payload": payload if payload is not None else {},
                    "requestId": request_id}
 
-        messageJsonStr = json.dumps(message, ensure_ascii=False)
-        await websocket.send(messageJsonStr)
+        if trace is not None:
+            message["traceId"] = trace.trace_id
+            message["captureTimestamp"] = trace.capture_timestamp
+            message["resultTimestamp"] = time.time()
+
+        session_recorder = self.session_recorder
+        if session_recorder is not None:
+            session_recorder.record_message("out", outbound_queue.connection_id, message)
+
+        outbound_queue.put(message, replaceable)
+
+    def image_from_payload(self, payload):
+        """
+        Returns the image given in the payload, either as binary data in a binary frame, or base 64 encoded.
+        Binary data is encoded image data (fx. PNG or JPEG), or raw BGR pixels if imageShape is given, in which case
+        the pixels are copied once from the received data into a writable image, since images are kept and may be
+        written to in place (fx. as debug camera image).
+
+        :param payload: Payload
+        :return: Image
+        """
+        if "binaryData" in payload:
+            if "imageShape" in payload:
+                return np.frombuffer(bytearray(payload["binaryData"]), dtype=np.uint8).reshape(payload["imageShape"])
+            raw_bytes = np.frombuffer(payload["binaryData"], dtype=np.uint8)
+        else:
+            raw_bytes = np.frombuffer(base64.b64decode(payload["imageBase64"]), dtype=np.uint8)
 
-        print("Sent message: %s" % messageJsonStr[:128])
+        return cv2.imdecode(raw_bytes, cv2.IMREAD_UNCHANGED)
+
+    def register_metrics(self):
+        """
+        Registers gauges reading the current state of the server when metrics are collected.
+        """
+        registry = metrics.get_metrics()
+        registry.gauge("scheduler_requests", lambda: self.scheduler.stats()["requests"])
+        registry.gauge("scheduler_running_requests", lambda: self.scheduler.stats()["running"])
+        registry.gauge("connections", lambda: len(self.outbound_queue_list()))
+        registry.gauge("outbound_pending_messages", lambda: sum([outbound_queue.pending_count() for outbound_queue in self.outbound_queue_list()]))
+        registry.gauge("buffer_pool_bytes", lambda: buffer_pool.get_pool().stats()["bytes"])
+        registry.gauge("snapshot_history_bytes", lambda: globals.get_state().get_board_descriptor().snapshot_history_memory_usage())
+
+    def outbound_queue_list(self):
+        """
+        Returns the outbound queues of all connections. Safe to call from any thread, fx. when metrics are collected.
+
+        :return: List of outbound queues
+        """
+        with self.outbound_queues_lock:
+            return list(self.outbound_queues.values())
 
     def handleConnected(self):
         print(self.address, "connected")
@@ -620,20 +963,46 @@ class Server(object):
         if board_descriptor is not None:
             board_descriptor.update(image)
 
-    def start_thread(self, request_id, thread):
+        session_recorder = self.session_recorder
+        if session_recorder is not None:
+            trace = tracing.current_trace()
+            session_recorder.record_frame(image,
+                                          timestamp=trace.capture_timestamp if trace is not None else None,
+                                          trace_id=trace.trace_id if trace is not None else None,
+                                          corners=board_descriptor.get_board_calibrator().get_corners() if board_descriptor is not None else None)
+
+    def start_thread(self, request_id, thread, payload={}):
         with self.threads_lock:
             self.threads[request_id] = thread
 
+        thread.event_loop = self.event_loop
+        thread.result_filter = ResultFilter.from_payload(payload)
+
         try:
-            thread.start()
+            thread.start(self.scheduler)
         except Exception as e:
             print("Exception in start_thread: %s" % str(e))
             traceback.print_exc(file=sys.stdout)
 
     async def send_thread_result(self, websocket, thread, result, action, payload, keep_alive=False):
+        """
+        Sends a result from a request. Streaming results (keep_alive) are filtered by the request's result filter,
+        which may drop unchanged results or limit the rate. Final results are always sent. The result is tagged with
+        the trace of the frame it was detected in, if any.
+
+        :param websocket Websocket instance
+        :param thread: Request
+        :param result Result code
+        :param action Client action from which the message originates
+        :param payload Payload
+        :param keep_alive: If True, request keeps running after this result
+        """
         if not keep_alive:
             self.cancel_thread(thread.request_id)
-        await self.send_message(websocket, result, action, payload, thread.request_id)
+        elif thread.result_filter is not None and not thread.result_filter.should_send(payload):
+            return
+        with tracing.get_tracer().span("send_result", action=action):
+            await self.send_message(websocket, result, action, payload, thread.request_id, replaceable=keep_alive, trace=tracing.current_trace())
 
     def cancel_thread(self, request_id):
         with self.threads_lock:
@@ -0,0 +1,270 @@
+import json
+import os
+import queue
+import sys
+import time
+import traceback
+from threading import Thread, Lock
+
+import cv2
+import numpy as np
+
+from util import metrics
+
+
+# Session file names
+SESSION_FILENAME = "session.json"
+FRAMES_INDEX_FILENAME = "frames.jsonl"
+RAW_FRAMES_FILENAME = "frames.raw"
+MESSAGES_FILENAME = "messages.jsonl"
+
+# Frame formats
+FRAME_FORMATS = ["jpeg", "png", "raw"]
+
+
+class SessionRecorder(object):
+    """
+    Records camera frames, board corners and websocket messages of a session to a directory, for reproducing
+    problems offline. The session can be replayed with the file camera (see camera_file).
+
+    Frames and messages are written by a background thread. Recording never blocks the caller: if the writer falls
+    behind, frames and messages exceeding the queue limits are dropped and counted.
+
+    Session directory layout:
+    session.json -- {version, startTime, frameFormat}
+    frames.jsonl -- One line per frame {seq, timestamp, traceId, corners, file} for jpeg and png frames, or
+                    {seq, timestamp, traceId, corners, offset, shape, dtype} for raw frames
+    frames.raw -- Raw frames appended back to back, to be memory-mapped (raw format only)
+    frames/ -- One image file per frame (jpeg and png formats only)
+    messages.jsonl -- One line per message {timestamp, direction ("in" or "out"), connectionId, message}
+    """
+
+    def __init__(self, directory, frame_format="jpeg", max_queued_frames=16, max_queued_messages=1024, jpeg_quality=90):
+        """
+        :param directory: Session directory
+        :param frame_format: Frame format: "jpeg", "png" (lossless) or "raw" (lossless and memory-mappable, but large)
+        :param max_queued_frames: Maximum number of frames waiting to be written
+        :param max_queued_messages: Maximum number of messages waiting to be written
+        :param jpeg_quality: JPEG quality (0-100)
+        """
+        if frame_format not in FRAME_FORMATS:
+            raise Exception("Unknown frame format: %s" % frame_format)
+
+        self.directory = directory
+        self.frame_format = frame_format
+        self.jpeg_quality = jpeg_quality
+
+        self.max_queued_frames = max_queued_frames
+        self.max_queued_messages = max_queued_messages
+
+        self.queue = queue.Queue()
+        self.lock = Lock()
+
+        self.queued_frames = 0
+        self.queued_messages = 0
+
+        self.frame_seq = 0
+        self.frame_count = 0
+        self.dropped_frame_count = 0
+        self.message_count = 0
+        self.dropped_message_count = 0
+        self.written_bytes = 0
+
+        self.start_time = None
+        self.thread = None
+
+        self.frames_index_file = None
+        self.raw_frames_file = None
+        self.messages_file = None
+
+    def start(self):
+        """
+        Creates the session directory and starts the writer thread.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if self.frame_format != "raw":
+            os.makedirs(os.path.join(self.directory, "frames"), exist_ok=True)
+
+        self.start_time = time.time()
+
+        with open(os.path.join(self.directory, SESSION_FILENAME), "w") as session_file:
+            json.dump({"version": 1, "startTime": self.start_time, "frameFormat": self.frame_format}, session_file)
+
+        self.frames_index_file = open(os.path.join(self.directory, FRAMES_INDEX_FILENAME), "w")
+        self.messages_file = open(os.path.join(self.directory, MESSAGES_FILENAME), "w")
+        if self.frame_format == "raw":
+            self.raw_frames_file = open(os.path.join(self.directory, RAW_FRAMES_FILENAME), "wb")
+
+        self.thread = Thread(target=self._run, args=(), name="SessionRecorder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops recording, after writing all queued frames and messages.
+
+        :return: Recording statistics
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        return self.stats()
+
+    def record_frame(self, image, timestamp=None, trace_id=None, corners=None):
+        """
+        Queues a camera frame for writing. The image must not be modified afterwards.
+
+        :param image: Camera image
+        :param timestamp: (Optional) Capture timestamp. Defaults to now
+        :param trace_id: (Optional) Trace ID of frame
+        :param corners: (Optional) Board corners detected by board calibrator
+        """
+        with self.lock:
+            self.frame_seq += 1
+
+            if self.queued_frames >= self.max_queued_frames:
+                self.dropped_frame_count += 1
+                metrics.get_metrics().counter("recorder_dropped_frames").increment()
+                return
+
+            self.queued_frames += 1
+            self.queue.put(("FRAME", self.frame_seq, image, timestamp if timestamp is not None else time.time(), trace_id, corners))
+
+    def record_message(self, direction, connection_id, message):
+        """
+        Queues a websocket message for writing. Binary data in messages is recorded by size only.
+
+        :param direction: "in" for messages from clients, "out" for messages to clients
+        :param connection_id: Connection ID
+        :param message: Message dict
+        """
+        with self.lock:
+            if self.queued_messages >= self.max_queued_messages:
+                self.dropped_message_count += 1
+                metrics.get_metrics().counter("recorder_dropped_messages").increment()
+                return
+
+            self.queued_messages += 1
+            self.queue.put(("MESSAGE", time.time(), direction, connection_id, message))
+
+    def stats(self):
+        """
+        Returns recording statistics.
+
+        :return: {directory, frames, droppedFrames, messages, droppedMessages, writtenBytes, queuedFrames,
+                  queuedMessages}
+        """
+        with self.lock:
+            return {"directory": self.directory,
+                    "frames": self.frame_count,
+                    "droppedFrames": self.dropped_frame_count,
+                    "messages": self.message_count,
+                    "droppedMessages": self.dropped_message_count,
+                    "writtenBytes": self.written_bytes,
+                    "queuedFrames": self.queued_frames,
+                    "queuedMessages": self.queued_messages}
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                try:
+                    with metrics.get_metrics().timer("recorder_write_seconds", type=item[0].lower()):
+                        if item[0] == "FRAME":
+                            self._write_frame(*item[1:])
+                        else:
+                            self._write_message(*item[1:])
+                except Exception as e:
+                    print("Exception in session recorder: %s" % str(e))
+                    traceback.print_exc(file=sys.stdout)
+                finally:
+                    with self.lock:
+                        if item[0] == "FRAME":
+                            self.queued_frames -= 1
+                        else:
+                            self.queued_messages -= 1
+        finally:
+            self.frames_index_file.close()
+            self.messages_file.close()
+            if self.raw_frames_file is not None:
+                self.raw_frames_file.close()
+
+    def _write_frame(self, seq, image, timestamp, trace_id, corners):
+        entry = {"seq": seq,
+                 "timestamp": timestamp,
+                 "traceId": trace_id,
+                 "corners": np.asarray(corners).tolist() if corners is not None else None}
+
+        if self.frame_format == "raw":
+            image = np.ascontiguousarray(image)
+
+            entry["offset"] = self.raw_frames_file.tell()
+            entry["shape"] = list(image.shape)
+            entry["dtype"] = str(image.dtype)
+
+            self.raw_frames_file.write(image.data)
+            size = image.nbytes
+        else:
+            filename = "frames/%06i.%s" % (seq, "jpg" if self.frame_format == "jpeg" else "png")
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if self.frame_format == "jpeg" else []
+
+            _, data = cv2.imencode(".jpg" if self.frame_format == "jpeg" else ".png", image, params)
+            with open(os.path.join(self.directory, filename), "wb") as frame_file:
+                frame_file.write(data.tobytes())
+
+            entry["file"] = filename
+            size = len(data)
+
+        self.frames_index_file.write(json.dumps(entry) + "\n")
+
+        with self.lock:
+            self.frame_count += 1
+            self.written_bytes += size
+
+    def _write_message(self, timestamp, direction, connection_id, message):
+        line = json.dumps({"timestamp": timestamp,
+                           "direction": direction,
+                           "connectionId": connection_id,
+                           "message": message}, default=json_value) + "\n"
+
+        self.messages_file.write(line)
+
+        with self.lock:
+            self.message_count += 1
+            self.written_bytes += len(line)
+
+
+def json_value(value):
+    """
+    Converts values not serializable by json, fx. numpy arrays and binary data.
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "<%i bytes>" % len(value)
+    return str(value)
+
+
+def load_frames_index(directory):
+    """
+    Loads the frame index of a recorded session.
+
+    :param directory: Session directory
+    :return: (session dict, list of frame dicts)
+    """
+    with open(os.path.join(directory, SESSION_FILENAME)) as session_file:
+        session = json.load(session_file)
+
+    with open(os.path.join(directory, FRAMES_INDEX_FILENAME)) as frames_index_file:
+        frames = [json.loads(line) for line in frames_index_file if len(line.strip()) > 0]
+
+    return session, frames
+
+
+def is_session_directory(directory):
+    return os.path.isfile(os.path.join(directory, SESSION_FILENAME))
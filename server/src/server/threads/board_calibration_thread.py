@@ -12,46 +12,38 @@ class BoardCalibrationThread(ServerThread):
         self.timeout_function = timeout_function
         self.timeout = timeout
 
-    def _run(self):
+        self.start_time = None
 
-        # Decrease camera brightness
-        globals.get_state().get_camera().set_low_brightness()
-
-        # Update board calibration
-        start_time = time.time()
-
-        while time.time() < start_time + self.timeout:
+    def step(self, frame):
 
-            # Sleep a while
-            time.sleep(self.fixed_update_delay)
+        # Decrease camera brightness
+        if self.start_time is None:
+            globals.get_state().get_camera().set_low_brightness()
+            self.start_time = time.time()
 
-            # Check if stopped
-            if self.stopped:
-                return
+        # Timeout
+        if time.time() >= self.start_time + self.timeout:
+            print('Board calibration timed out!')
+            if self.timeout_function is not None:
+                self._callback(lambda: self.timeout_function())
+            return True
 
-            # Get board detector
-            board_calibrator = globals.get_state().get_board_descriptor().get_board_calibrator()
+        # Get board detector
+        board_calibrator = globals.get_state().get_board_descriptor().get_board_calibrator()
 
-            # Update board calibrator with camera image
-            with globals.get_state().camera_lock:
-                camera = globals.get_state().get_camera()
-                if camera is not None:
-                    image = camera.read()
-                    if image is not None:
-                        board_calibrator.update(image)
+        # Update board calibrator with camera image
+        if frame is not None:
+            board_calibrator.update(frame.image)
 
-            # Check calibrated
-            if board_calibrator.get_state() == State.DETECTED:
-                print('Board calibrated')
+        # Check calibrated
+        if board_calibrator.get_state() == State.DETECTED:
+            print('Board calibrated')
 
-                # Decrease camera brightness
-                globals.get_state().get_camera().set_normal_brightness()
+            # Decrease camera brightness
+            globals.get_state().get_camera().set_normal_brightness()
 
-                # Call callback function
-                self._callback(lambda: self.callback_function())
-                return
+            # Call callback function
+            self._callback(lambda: self.callback_function())
+            return True
 
-        # Timeout
-        print('Board calibration timed out!')
-        if self.timeout_function is not None:
-            self._callback(lambda: self.timeout_function())
+        return False
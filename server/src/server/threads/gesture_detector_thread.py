@@ -1,4 +1,3 @@
-import time
 from server.threads.server_thread import ServerThread
 
 
@@ -10,21 +9,10 @@ class GestureDetectorThread(ServerThread):
         self.keep_running = keep_running
         self.callback_function = callback_function
 
-    def _run(self):
+    def step(self, frame):
 
-        first_run = True
-
-        while True:
-
-            # Sleep a while
-            if not first_run:
-                time.sleep(self.fixed_update_delay)
-
-            first_run = True
-
-            # Check if stopped
-            if self.stopped:
-                return
+        # Use same snapshot for entire detection pass
+        with self.board_area.board_descriptor.pinned_snapshot():
 
             # Check if we have a board area image
             if self.board_area.area_image() is not None:
@@ -34,8 +22,7 @@ class GestureDetectorThread(ServerThread):
                 self._callback(lambda: self.callback_function(result))
 
                 # Stop running
-                if not self.keep_running:
-                    return
+                return not self.keep_running
 
             # No board area image
             else:
@@ -43,7 +30,7 @@ class GestureDetectorThread(ServerThread):
                 # Give up waiting if not keep running
                 if not self.keep_running:
                     self._callback(lambda: self.callback_function([]))
-                    return
+                    return True
 
                 # Wait for board image
-                continue
+                return False
@@ -1,5 +1,3 @@
-import time
-
 from server import globals
 from server.threads.server_thread import ServerThread
 from tracking.board.board_area import BoardAreaId_FULL_BOARD
@@ -14,42 +12,40 @@ class HandDetectorCalibrationThread(ServerThread):
         super().__init__(request_id)
         self.callback_function = callback_function
 
-    def _run(self):
-
         # Create hand calibrator
-        hand_calibrator = HandCalibrator()
+        self.hand_calibrator = HandCalibrator()
 
-        # Update hand calibration
-        while True:
+    def step(self, frame):
 
-            # Sleep a while
-            time.sleep(self.fixed_update_delay)
+        # Wait for next camera frame
+        if frame is None:
+            return False
 
-            # Check if stopped
-            if self.stopped:
-                return
+        # Get whole board area
+        board_area = globals.get_state().get_board_area(BoardAreaId_FULL_BOARD)
+        if board_area is None:
+            return False
 
-            # Get whole board area
-            board_area = globals.get_state().get_board_area(BoardAreaId_FULL_BOARD)
-            if board_area is None:
-                continue
+        # Use same snapshot for entire detection pass
+        with board_area.board_descriptor.pinned_snapshot():
 
-            # Get image
-            image = board_area.area_image(SnapshotSize.EXTRA_SMALL)
-            if image is None:
-                continue
+            # Check if we have a board area image
+            if board_area.area_image(SnapshotSize.EXTRA_SMALL) is None:
+                return False
 
             # Detect hand
-            hand_calibrator.update(image)
+            self.hand_calibrator.update_with_board_area(board_area)
+
+        # Check calibrated
+        if self.hand_calibrator.get_state() == State.DETECTED:
 
-            # Check calibrated
-            if hand_calibrator.get_state() == State.DETECTED:
+            # Create new hand detector
+            hand_detector = HandDetector(detector_id=handDetectorId, thresholds=self.hand_calibrator.get_medians())
+            globals.get_state().set_detector(hand_detector)
 
-                # Create new hand detector
-                hand_detector = HandDetector(detector_id=handDetectorId, thresholds=hand_calibrator.get_medians())
-                globals.get_state().set_detector(hand_detector)
+            # Callback
+            print('Hand calibrated')
+            self._callback(lambda: self.callback_function())
+            return True
 
-                # Callback
-                print('Hand calibrated')
-                self._callback(lambda: self.callback_function())
-                return
+        return False
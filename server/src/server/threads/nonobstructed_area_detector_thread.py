@@ -13,25 +13,14 @@ class NonobstructedAreaDetectorThread(ServerThread):
 
         self.nonobstructedRectangleDetector = NonobstructedAreaDetector(target_size, target_position, current_position, padding)
 
-    def _run(self):
+        self.detection_history = []
+        self.start_time = time.time()
+        self.last_sent_center = None
 
-        detection_history = []
-        start_time = time.time()
-        last_sent_center = None
+    def step(self, frame):
 
-        first_run = True
-
-        while True:
-
-            # Sleep a while
-            if not first_run:
-                time.sleep(self.fixed_update_delay)
-
-            first_run = True
-
-            # Check if stopped
-            if self.stopped:
-                return
+        # Use same snapshot for entire detection pass
+        with self.board_area.board_descriptor.pinned_snapshot():
 
             # Check if we have a board area image
             if self.board_area.area_image() is not None:
@@ -41,29 +30,28 @@ class NonobstructedAreaDetectorThread(ServerThread):
 
                 # Update history
                 if result is not None:
-                    detection_history.append({"timestamp": time.time(), "result": result})
+                    self.detection_history.append({"timestamp": time.time(), "result": result})
 
-                while len(detection_history) > 0 and detection_history[0]["timestamp"] < time.time() - self.stable_time:
-                    detection_history.pop(0)
+                while len(self.detection_history) > 0 and self.detection_history[0]["timestamp"] < time.time() - self.stable_time:
+                    self.detection_history.pop(0)
 
                 # Check stable detection
-                if time.time() < start_time + self.stable_time:
-                    continue
+                if time.time() < self.start_time + self.stable_time:
+                    return False
 
-                centers = [result_dict["result"]["matches"][0]["center"] for result_dict in detection_history]
+                centers = [result_dict["result"]["matches"][0]["center"] for result_dict in self.detection_history]
                 if len(centers) > 0 and centers.count(centers[0]) != len(centers):
-                    continue
+                    return False
 
                 if len(centers) == 0:
                     self._callback(lambda: self.callback_function(result))
 
-                elif last_sent_center is None or last_sent_center == centers[0]:
-                    last_sent_center = centers[0]
+                elif self.last_sent_center is None or self.last_sent_center == centers[0]:
+                    self.last_sent_center = centers[0]
                     self._callback(lambda: self.callback_function(result))
 
                 # Stop running
-                if not self.keep_running:
-                    return
+                return not self.keep_running
 
             # No board area image
             else:
@@ -71,7 +59,7 @@ class NonobstructedAreaDetectorThread(ServerThread):
                 # Give up waiting if not keep running
                 if not self.keep_running:
                     self._callback(lambda: self.callback_function(None))
-                    return
+                    return True
 
                 # Wait for board image
-                continue
+                return False
@@ -1,24 +1,49 @@
-import uuid
 import asyncio
-from threading import Thread
+
+from util import tracing
 
 
 class ServerThread(object):
+    """
+    Base class for long running server requests.
+
+    Requests no longer run in threads of their own. Instead they are scheduled by the request scheduler, which calls
+    step once per new camera frame from a bounded pool of worker threads. Cancellation is cooperative: a stopped
+    request is not stepped again, and does not deliver results from a step already running.
+    """
     def __init__(self, request_id):
         self.request_id = request_id
         self.stopped = False
-        self.fixed_update_delay = 0.01
+        self.event_loop = None
+        self.result_filter = None
+
+    def start(self, scheduler):
+        """
+        Schedules the request.
 
-    def start(self):
-        thread = Thread(target=self._run, args=())
-        thread.start()
+        :param scheduler: Request scheduler
+        """
+        scheduler.schedule(self)
 
     def stop(self):
         self.stopped = True
 
-    def _run(self):
-        pass
+    def step(self, frame):
+        """
+        Runs a single update of the request. The first step runs right away, without waiting for a new frame.
+
+        :param frame: Most recent camera frame, or None if no new frame since last step
+        :return: True if request has finished
+        """
+        raise Exception("Function 'step' must be overridden!")
 
     def _callback(self, callback):
-        event_loop = asyncio.new_event_loop()
-        event_loop.run_until_complete(callback())
+        """
+        Hands the result coroutine over to the server event loop owning the connection. Does not wait for the
+        result to be sent. The coroutine runs with the trace of the frame currently being processed.
+
+        :param callback: Function returning coroutine to run
+        """
+        if self.stopped:
+            return
+        asyncio.run_coroutine_threadsafe(tracing.run_in_trace_context(callback(), tracing.current_trace()), self.event_loop)
@@ -1,5 +1,3 @@
-import time
-
 from server.threads.server_thread import ServerThread
 
 
@@ -11,28 +9,16 @@ class TiledBrickDetectorThreadBase(ServerThread):
         self.wait_for_position = wait_for_position
         self.callback_function = callback_function
 
-    def _run(self):
-
-        first_run = True
-
-        while True:
-
-            # Sleep a while
-            if not first_run:
-                time.sleep(self.fixed_update_delay)
-
-            first_run = True
+    def step(self, frame):
 
-            # Check if stopped
-            if self.stopped:
-                return
+        # Use same snapshot for entire detection pass
+        with self.board_area.board_descriptor.pinned_snapshot():
 
             # Check if we have a board area image
             if self.board_area.area_image() is not None:
 
                 # Update
-                if self.update():
-                    return
+                return self.update()
 
             # No board area image
             else:
@@ -40,10 +26,10 @@ class TiledBrickDetectorThreadBase(ServerThread):
                 # Give up if not waiting for position to return
                 if not self.wait_for_position:
                     self._callback(lambda: self.callback_function([]))
-                    return
+                    return True
 
                 # Wait for board image
-                continue
+                return False
 
     def update(self):
         raise Exception("Function 'update' must be overridden!")
@@ -1,5 +1,11 @@
 import sys
 from test.board_detection_test import BoardDetectionTest
+from test.buffer_pool_test import BufferPoolTest
+from test.frame_ring_buffer_test import FrameRingBufferTest
+from test.outbound_queue_test import OutboundQueueTest
+from test.profiler_test import ProfilerTest
+from test.result_cache_test import ResultCacheTest
+from test.shared_frame_ring_test import SharedFrameRingTest
 from test.image_detection_test import ImageDetectionTest
 from test.nonobstructed_area_detection_test import NonobstructedAreaDetectionTest
 from test.tiled_brick_detection_test import TiledBrickDetectionTest
@@ -15,49 +21,63 @@ tests = [
     {'test': HandDetectionTest(), 'filter': ['HAND_DETECTION', 'ALL', 'BASIC']},
     {'test': ImageDetectionTest(), 'filter': ['IMAGE_DETECTION', 'ALL', 'BASIC']},
     {'test': NonobstructedAreaDetectionTest(), 'filter': ['NONOBSTRUCTED_AREA_DETECTION', 'ALL', 'BASIC']},
+    {'test': BufferPoolTest(), 'filter': ['BUFFER_POOL', 'ALL', 'INFRASTRUCTURE']},
+    {'test': FrameRingBufferTest(), 'filter': ['FRAME_RING_BUFFER', 'ALL', 'INFRASTRUCTURE']},
+    {'test': ResultCacheTest(), 'filter': ['RESULT_CACHE', 'ALL', 'INFRASTRUCTURE']},
+    {'test': OutboundQueueTest(), 'filter': ['OUTBOUND_QUEUE', 'ALL', 'INFRASTRUCTURE']},
+    {'test': ProfilerTest(), 'filter': ['PROFILER', 'ALL', 'INFRASTRUCTURE']},
+    {'test': SharedFrameRingTest(), 'filter': ['SHARED_FRAME_RING', 'ALL', 'INFRASTRUCTURE']},
 ]
 
-# Parse arguments
-args = sys.argv[1:]
 
-filters = []
+def main():
 
-debug = False
-for arg in args:
-    if arg == '-d' or arg == '--debug':
-        debug = True
-    else:
-        filters.append(arg)
+    # Parse arguments
+    args = sys.argv[1:]
 
-if len(filters) == 0:
-    filters = ['ALL']
+    filters = []
 
-# Run tests
-total_success_count = 0
-total_failed_count = 0
+    debug = False
+    for arg in args:
+        if arg == '-d' or arg == '--debug':
+            debug = True
+        else:
+            filters.append(arg)
 
-for test_dict in tests:
+    if len(filters) == 0:
+        filters = ['ALL']
 
-    # Filter check
-    test_filter = test_dict['filter']
+    # Run tests
+    total_success_count = 0
+    total_failed_count = 0
 
-    should_run = False
-    for f in filters:
-        if f in test_filter:
-            should_run = True
+    for test_dict in tests:
 
-    if not should_run:
-        continue
+        # Filter check
+        test_filter = test_dict['filter']
 
-    # Run test
-    test = test_dict['test']
-    success_count, failed_count = test.run(debug=debug)
+        should_run = False
+        for f in filters:
+            if f in test_filter:
+                should_run = True
 
-    total_success_count += 1 if failed_count == 0 else 0
-    total_failed_count += 1 if failed_count > 0 else 0
+        if not should_run:
+            continue
 
-print()
-print('Result: %i/%i test%s completed successfully' % (total_success_count, total_success_count + total_failed_count, 's' if total_success_count > 1 else ''))
-if total_failed_count > 0:
-    print('        %i/%i test%s FAILED!' % (total_failed_count, total_success_count + total_failed_count, 's' if total_failed_count> 1 else ''))
-print()
+        # Run test
+        test = test_dict['test']
+        success_count, failed_count = test.run(debug=debug)
+
+        total_success_count += 1 if failed_count == 0 else 0
+        total_failed_count += 1 if failed_count > 0 else 0
+
+    print()
+    print('Result: %i/%i test%s completed successfully' % (total_success_count, total_success_count + total_failed_count, 's' if total_success_count > 1 else ''))
+    if total_failed_count > 0:
+        print('        %i/%i test%s FAILED!' % (total_failed_count, total_success_count + total_failed_count, 's' if total_failed_count> 1 else ''))
+    print()
+
+
+# Worker processes are spawned, and import this module without running the tests
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,33 @@ class BaseTest(object):
     def get_tests(self):
         return []
 
+    def run_checks(self, checks):
+        """
+        Runs checks, each a function returning an error message, or None if successful.
+
+        :param checks: List of check functions
+        :return: (success count, failed count)
+        """
+        success_count = 0
+        failed_count = 0
+
+        for i, check in enumerate(checks):
+            self.print_number(current=i + 1, total=len(checks))
+
+            try:
+                message = check()
+            except Exception as e:
+                message = "raised %s: %s" % (type(e).__name__, e)
+
+            if message is not None:
+                failed_count += 1
+                self.error(i, '%s FAILED. %s' % (check.__name__, message))
+                continue
+
+            success_count += 1
+
+        return success_count, failed_count
+
     def error(self, test_number, message):
         if test_number == 0:
             print('')
@@ -79,16 +106,4 @@ class BaseTest(object):
             self.default_board_descriptor.get_board_calibrator().state = State.DETECTED
 
     def resize_image_to_detector_default_size(self, image, detector):
-        image_height, image_width = image.shape[:2]
-
-        # Calculate output aspect ratio
-        aspect_ratio = float(image_height) / float(image_width)
-
-        # Find output width
-        dest_width = board_snapshot.get_snapshot_width(detector.preferred_input_image_resolution(), default=image_width)
-
-        # Resize image
-        if dest_width < image_width:
-            return cv2.resize(image, (int(dest_width), int(dest_width * aspect_ratio)))
-        else:
-            return image
+        return board_snapshot.resize_to_snapshot_size(image, detector.preferred_input_image_resolution())
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+from test.base_test import BaseTest
+from tracking.util.buffer_pool import BufferPool, memory_owner
+
+
+class BufferPoolTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.reuse_test
+        ]
+
+    def reuse_test(self, debug=False):
+        return self.run_checks([
+            self.discarded_buffer_is_reused,
+            self.referenced_buffer_is_not_reused,
+            self.viewed_buffer_is_not_reused,
+            self.opencv_output_buffer_is_reused,
+            self.buffers_beyond_maximum_are_not_pooled,
+            self.buffers_of_forgotten_shapes_are_dropped,
+            self.views_share_memory_owner
+        ])
+
+    def discarded_buffer_is_reused(self):
+        pool = BufferPool()
+
+        image = pool.acquire((4, 4, 3))
+        address = image.ctypes.data
+        del image
+
+        image = pool.acquire((4, 4, 3))
+        if image.ctypes.data != address or pool.stats()["hits"] != 1:
+            return "Discarded buffer was not reused"
+
+    def referenced_buffer_is_not_reused(self):
+        pool = BufferPool()
+
+        image = pool.acquire((4, 4, 3))
+        other_image = pool.acquire((4, 4, 3))
+        if np.shares_memory(image, other_image):
+            return "Referenced buffer was handed out again"
+
+    def viewed_buffer_is_not_reused(self):
+        pool = BufferPool()
+
+        image = pool.acquire((4, 4, 3))
+        views = [image[1:3], image[:, :, 0].reshape(-1), image.T]
+        del image
+
+        other_image = pool.acquire((4, 4, 3))
+        if any([np.shares_memory(view, other_image) for view in views]):
+            return "Buffer was handed out again while a view of it was referenced"
+
+    def opencv_output_buffer_is_reused(self):
+        pool = BufferPool()
+
+        image = pool.acquire((4, 4), np.float32)
+        cv2.GaussianBlur(np.ones((4, 4), np.float32), (3, 3), 0, dst=image)
+        if not np.allclose(image, 1.0):
+            return "OpenCV did not write to buffer"
+
+        address = image.ctypes.data
+        del image
+
+        if pool.acquire((4, 4), np.float32).ctypes.data != address:
+            return "Buffer written by OpenCV was not reused"
+
+    def buffers_beyond_maximum_are_not_pooled(self):
+        pool = BufferPool(max_buffers_per_key=2)
+
+        images = [pool.acquire((4, 4)) for _ in range(0, 3)]
+        if pool.stats()["buffers"] != 2:
+            return "Expected 2 pooled buffers, but found %i" % pool.stats()["buffers"]
+
+        del images
+        if pool.stats()["buffers"] != 2:
+            return "Unpooled buffer was returned to pool"
+
+    def buffers_of_forgotten_shapes_are_dropped(self):
+        pool = BufferPool(max_keys=1)
+
+        image = pool.acquire((4, 4))
+        pool.acquire((8, 8))
+        del image
+
+        pool.acquire((4, 4))
+        if pool.stats()["hits"] != 0:
+            return "Buffer of forgotten shape was returned to pool"
+
+    def views_share_memory_owner(self):
+        pool = BufferPool()
+
+        image = pool.acquire((4, 4, 3))
+        owner = memory_owner(image)
+
+        if owner.nbytes != image.nbytes or memory_owner(image[1:3, :, 0]) is not owner:
+            return "Image and view of it do not share memory owner"
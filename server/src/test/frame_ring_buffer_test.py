@@ -0,0 +1,88 @@
+import numpy as np
+
+from test.base_test import BaseTest
+from server.frame_ring_buffer import FrameRingBuffer
+
+
+class FrameRingBufferTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.ring_test
+        ]
+
+    def ring_test(self, debug=False):
+        return self.run_checks([
+            self.unreferenced_buffer_is_reused,
+            self.referenced_frame_is_not_overwritten,
+            self.referenced_image_is_not_overwritten,
+            self.referenced_view_is_not_overwritten,
+            self.readers_skip_to_most_recent_frame,
+            self.single_slot_ring_keeps_most_recent_frame
+        ])
+
+    def publish(self, frame_ring_buffer, value):
+        image = frame_ring_buffer.next_buffer((4, 4, 3))
+        image[:] = value
+        return frame_ring_buffer.write(image)
+
+    def unreferenced_buffer_is_reused(self):
+        frame_ring_buffer = FrameRingBuffer(size=2)
+
+        address = self.publish(frame_ring_buffer, 1).image.ctypes.data
+        self.publish(frame_ring_buffer, 2)
+        self.publish(frame_ring_buffer, 3)
+
+        if frame_ring_buffer.latest().image.ctypes.data != address:
+            return "Buffer of unreferenced frame was not reused"
+
+    def referenced_frame_is_not_overwritten(self):
+        frame_ring_buffer = FrameRingBuffer(size=2)
+
+        frame = self.publish(frame_ring_buffer, 1)
+        for value in range(2, 6):
+            self.publish(frame_ring_buffer, value)
+
+        if not np.all(frame.image == 1):
+            return "Referenced frame was overwritten"
+
+    def referenced_image_is_not_overwritten(self):
+        frame_ring_buffer = FrameRingBuffer(size=2)
+
+        image = self.publish(frame_ring_buffer, 1).image
+        for value in range(2, 6):
+            self.publish(frame_ring_buffer, value)
+
+        if not np.all(image == 1):
+            return "Referenced image was overwritten"
+
+    def referenced_view_is_not_overwritten(self):
+        frame_ring_buffer = FrameRingBuffer(size=2)
+
+        view = self.publish(frame_ring_buffer, 1).image[1:3, :, 0]
+        for value in range(2, 6):
+            self.publish(frame_ring_buffer, value)
+
+        if not np.all(view == 1):
+            return "Referenced view of image was overwritten"
+
+    def readers_skip_to_most_recent_frame(self):
+        frame_ring_buffer = FrameRingBuffer(size=2)
+
+        for value in range(1, 5):
+            self.publish(frame_ring_buffer, value)
+
+        frame = frame_ring_buffer.read_next(after_seq=1, timeout=0.0)
+        if frame is None or frame.seq != 4 or not np.all(frame.image == 4):
+            return "Expected most recent frame 4, but got %s" % (frame.seq if frame is not None else None)
+
+        if frame_ring_buffer.read_next(after_seq=4, timeout=0.0) is not None:
+            return "Reader got frame without new frame being published"
+
+    def single_slot_ring_keeps_most_recent_frame(self):
+        frame_ring_buffer = FrameRingBuffer(size=1)
+
+        frame = self.publish(frame_ring_buffer, 1)
+        frame_ring_buffer.next_buffer((4, 4, 3))
+
+        if frame_ring_buffer.latest() is not frame or not np.all(frame.image == 1):
+            return "Most recent frame was dropped or overwritten while writing next frame"
@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+import numpy as np
+
+from test.base_test import BaseTest
+from server.message_encoding import MessagePackEncoding
+from server.outbound_queue import OutboundQueue
+from util import misc_util
+
+
+class FakeWebsocket(object):
+    """
+    Websocket recording sent data. Sends block while paused, and raise if failing.
+    """
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+
+    async def send(self, data):
+        await self.resumed.wait()
+        if self.fail:
+            raise ConnectionError("Connection closed")
+        self.sent.append(data)
+
+
+class OutboundQueueTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.queue_test
+        ]
+
+    def queue_test(self, debug=False):
+        return self.run_checks([
+            self.pending_messages_are_batched,
+            self.streaming_results_are_replaced,
+            self.streaming_results_are_dropped_when_full,
+            self.unencodable_message_is_dropped,
+            self.failed_send_closes_queue,
+            self.msgpack_batches_are_arrays
+        ])
+
+    def run_queue(self, function, websocket=None, **kwargs):
+        websocket = websocket if websocket is not None else FakeWebsocket()
+
+        async def run():
+            queue = OutboundQueue(websocket, **kwargs)
+            queue.start()
+            try:
+                await function(queue, websocket)
+                await asyncio.sleep(0.01)
+            finally:
+                queue.stop()
+            return queue
+
+        return asyncio.run(run()), websocket
+
+    def sent_messages(self, websocket):
+        messages = []
+        for data in websocket.sent:
+            message = json.loads(data)
+            messages += message if isinstance(message, list) else [message]
+        return messages
+
+    def pending_messages_are_batched(self):
+        async def put(queue, websocket):
+            for i in range(0, 3):
+                queue.put({"requestId": i})
+
+        queue, websocket = self.run_queue(put)
+
+        if len(websocket.sent) != 1 or self.sent_messages(websocket) != [{"requestId": 0}, {"requestId": 1}, {"requestId": 2}]:
+            return "Expected one batch of 3 messages, but sent %s" % websocket.sent
+
+    def streaming_results_are_replaced(self):
+        async def put(queue, websocket):
+            websocket.resumed.clear()
+            queue.put({"requestId": 0, "value": 0})
+            await asyncio.sleep(0.01)
+
+            # First send is blocked, so the following results replace each other
+            for value in range(1, 4):
+                queue.put({"requestId": 1, "value": value}, replaceable=True)
+            websocket.resumed.set()
+
+        queue, websocket = self.run_queue(put)
+
+        if self.sent_messages(websocket) != [{"requestId": 0, "value": 0}, {"requestId": 1, "value": 3}] or queue.replaced_count != 2:
+            return "Results not replaced. Sent %s" % websocket.sent
+
+    def streaming_results_are_dropped_when_full(self):
+        async def put(queue, websocket):
+            websocket.resumed.clear()
+            queue.put({"requestId": 0})
+            await asyncio.sleep(0.01)
+
+            for request_id in range(1, 4):
+                queue.put({"requestId": request_id}, replaceable=True)
+            queue.put({"requestId": 4})
+            websocket.resumed.set()
+
+        queue, websocket = self.run_queue(put, max_pending=2)
+
+        if [message["requestId"] for message in self.sent_messages(websocket)] != [0, 1, 2, 4] or queue.dropped_count != 1:
+            return "Expected request 3 to be dropped, but sent %s" % websocket.sent
+
+    def unencodable_message_is_dropped(self):
+        async def put(queue, websocket):
+            queue.put({"requestId": 0, "value": np.int64(1)})
+            queue.put({"requestId": 1})
+            await asyncio.sleep(0.01)
+            queue.put({"requestId": 2})
+
+        queue, websocket = self.run_queue(put)
+
+        if [message["requestId"] for message in self.sent_messages(websocket)] != [1, 2] or queue.failed_count != 1:
+            return "Expected requests 1 and 2 to be sent, but sent %s" % websocket.sent
+
+    def failed_send_closes_queue(self):
+        async def put(queue, websocket):
+            queue.put({"requestId": 0})
+            await asyncio.sleep(0.01)
+            queue.put({"requestId": 1})
+
+        queue, websocket = self.run_queue(put, websocket=FakeWebsocket(fail=True))
+
+        if not queue.closed or queue.pending_count() != 0:
+            return "Queue not closed after failed send, %i messages pending" % queue.pending_count()
+
+    def msgpack_batches_are_arrays(self):
+        if not misc_util.module_exists("msgpack"):
+            return None
+
+        import msgpack
+
+        async def put(queue, websocket):
+            queue.put({"requestId": 0})
+            queue.put({"requestId": 1})
+
+        queue, websocket = self.run_queue(put, encoding=MessagePackEncoding())
+
+        if len(websocket.sent) != 1 or msgpack.unpackb(websocket.sent[0], raw=False) != [{"requestId": 0}, {"requestId": 1}]:
+            return "Expected one MessagePack array of 2 messages, but sent %s" % websocket.sent
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import time
+from threading import Barrier, Thread
+
+from test.base_test import BaseTest
+from util import profiling
+from util.profiling import Profiler
+
+
+class ProfilerTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.profiling_test
+        ]
+
+    def profiling_test(self, debug=False):
+        return self.run_checks([
+            self.concurrent_threads_are_profiled,
+            self.stop_inside_profile_does_not_wait,
+            self.profile_is_noop_when_stopped
+        ])
+
+    def busy_loop(self, seconds):
+        end_time = time.perf_counter() + seconds
+        count = 0
+        while time.perf_counter() < end_time:
+            count += 1
+        return count
+
+    def concurrent_threads_are_profiled(self):
+        profiler = Profiler(sample_interval=0.001)
+        output_directory = tempfile.mkdtemp()
+        errors = []
+
+        barrier = Barrier(4)
+
+        def run():
+            try:
+                barrier.wait()
+                with profiler.profile():
+                    self.busy_loop(0.2)
+            except Exception as e:
+                errors.append(e)
+
+        try:
+            profiler.start(output_directory)
+
+            threads = [Thread(target=run, name="Worker-%i" % i) for i in range(0, 3)]
+            for thread in threads:
+                thread.start()
+
+            # Stop while threads are still inside profile()
+            barrier.wait()
+            time.sleep(0.05)
+            result = profiler.stop()
+
+            for thread in threads:
+                thread.join()
+
+            if len(errors) > 0:
+                return "Profiled threads raised %s" % errors
+            if result["threadCount"] != 3 or result["sampleCount"] == 0:
+                return "Expected 3 sampled threads, but got %s" % result
+            if profiling.THREAD_PROFILES_SUPPORTED != (result["pstatsFilename"] is not None):
+                return "Unexpected pstats file: %s" % result["pstatsFilename"]
+            if os.path.getsize(result["collapsedFilename"]) == 0:
+                return "No stacks sampled"
+        finally:
+            shutil.rmtree(output_directory)
+
+    def stop_inside_profile_does_not_wait(self):
+        profiler = Profiler(stop_timeout=10.0)
+        output_directory = tempfile.mkdtemp()
+
+        try:
+            profiler.start(output_directory)
+
+            start_time = time.perf_counter()
+            with profiler.profile():
+                self.busy_loop(0.01)
+                profiler.stop()
+
+            if time.perf_counter() - start_time > 5.0:
+                return "Stopping from inside profile() waited for the calling thread"
+        finally:
+            shutil.rmtree(output_directory)
+
+    def profile_is_noop_when_stopped(self):
+        profiler = Profiler()
+
+        with profiler.profile():
+            self.busy_loop(0.01)
+
+        if len(profiler.profiled_thread_names) != 0 or profiler.stop() is not None:
+            return "Thread profiled while profiler stopped"
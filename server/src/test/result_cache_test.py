@@ -0,0 +1,124 @@
+import time
+from threading import Barrier, RLock, Thread
+
+from test.base_test import BaseTest
+from tracking.util.result_cache import ResultCache
+
+
+class ResultCacheTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.cache_test
+        ]
+
+    def cache_test(self, debug=False):
+        return self.run_checks([
+            self.concurrent_requests_calculate_once,
+            self.request_while_storing_result_calculates_once,
+            self.least_recently_used_result_is_evicted,
+            self.failed_calculation_is_not_cached,
+            self.callers_get_own_copy
+        ])
+
+    def concurrent_requests_calculate_once(self):
+        cache = ResultCache()
+        calculations = []
+
+        def calculate():
+            calculations.append(1)
+            time.sleep(0.05)
+            return {"value": 1}
+
+        barrier = Barrier(8)
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(cache.result("key", calculate))
+
+        threads = [Thread(target=request) for _ in range(0, 8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if len(calculations) != 1:
+            return "Expected 1 calculation, but got %i" % len(calculations)
+        if results != [{"value": 1}] * 8:
+            return "Unexpected results: %s" % results
+        if cache.stats()["hits"] != 7 or len(cache.result_locks) != 0:
+            return "Unexpected stats %s or result locks %s" % (cache.stats(), cache.result_locks)
+
+    def request_while_storing_result_calculates_once(self):
+        cache = ResultCache()
+        calculations = []
+        results = []
+
+        def calculate():
+            calculations.append(1)
+            return {"value": 1}
+
+        def request():
+            results.append(cache.result("key", calculate))
+
+        # Make a second request as soon as the first request has calculated the result and forgotten its result lock
+        class CacheLock(object):
+            def __init__(self):
+                self.lock = RLock()
+                self.second_request_made = False
+
+            def __enter__(self):
+                self.lock.acquire()
+
+            def __exit__(self, *args):
+                self.lock.release()
+                if len(calculations) == 1 and not self.second_request_made and "key" not in cache.result_locks:
+                    self.second_request_made = True
+                    request()
+
+        cache.lock = CacheLock()
+
+        request()
+
+        if len(calculations) != 1:
+            return "Expected 1 calculation, but got %i" % len(calculations)
+        if results != [{"value": 1}] * 2:
+            return "Unexpected results: %s" % results
+
+    def least_recently_used_result_is_evicted(self):
+        cache = ResultCache(max_entries=2)
+
+        cache.result(1, lambda: 1)
+        cache.result(2, lambda: 2)
+        cache.result(1, lambda: 1)
+        cache.result(3, lambda: 3)
+
+        if sorted(cache.results.keys()) != [1, 3]:
+            return "Expected results 1 and 3 to be kept, but got %s" % list(cache.results.keys())
+
+    def failed_calculation_is_not_cached(self):
+        cache = ResultCache()
+
+        def fail():
+            raise ValueError("Failed")
+
+        try:
+            cache.result("key", fail)
+            return "Exception not raised"
+        except ValueError:
+            pass
+
+        if len(cache.result_locks) != 0:
+            return "Result lock of failed calculation kept"
+
+        if cache.result("key", lambda: 1) != 1:
+            return "Result not calculated again after failure"
+
+    def callers_get_own_copy(self):
+        cache = ResultCache()
+
+        result = cache.result("key", lambda: {"hands": [{"x": 1}]})
+        result["hands"][0]["x"] = 2
+
+        if cache.result("key", lambda: None) != {"hands": [{"x": 1}]}:
+            return "Modifying a result changed the cached result"
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+
+from test.base_test import BaseTest
+from tracking.util import shared_frame_ring
+from tracking.util.detector_process_pool import DetectorProcessPool
+from tracking.util.shared_frame_ring import SharedFrameRing
+
+
+class SharedFrameRingTest(BaseTest):
+    def get_tests(self):
+        return [
+            self.frame_ring_test,
+            self.process_pool_test
+        ]
+
+    def frame_ring_test(self, debug=False):
+        return self.run_checks([
+            self.same_key_is_published_once,
+            self.slot_is_reused_when_all_handles_are_released,
+            self.full_ring_returns_no_handle,
+            self.slot_grows_to_fit_frame,
+            self.close_waits_for_handles_in_use
+        ])
+
+    def process_pool_test(self, debug=False):
+        return self.run_checks([
+            self.worker_reads_published_frame,
+            self.broken_pool_falls_back
+        ])
+
+    def same_key_is_published_once(self):
+        ring = SharedFrameRing(slot_count=2)
+        try:
+            handle = ring.publish("key", np.full((4, 4), 1, dtype=np.uint8))
+            same_handle = ring.publish("key", np.full((4, 4), 2, dtype=np.uint8))
+
+            if same_handle is not handle:
+                return "Expected the same handle for the same key"
+            if ring.slot_references[handle.slot] != 2:
+                return "Expected 2 references, but got %i" % ring.slot_references[handle.slot]
+            if ring.stats()["published"] != 1 or ring.stats()["reused"] != 1:
+                return "Unexpected stats %s" % ring.stats()
+            if not np.all(shared_frame_ring.attach(handle) == 1):
+                return "Frame published again for the same key"
+
+            ring.release(handle)
+            ring.release(same_handle)
+        finally:
+            ring.close()
+
+    def slot_is_reused_when_all_handles_are_released(self):
+        ring = SharedFrameRing(slot_count=1)
+        try:
+            handle = ring.publish(1, np.zeros((4, 4), dtype=np.uint8))
+            ring.publish(1, np.zeros((4, 4), dtype=np.uint8))
+
+            ring.release(handle)
+            if ring.publish(2, np.zeros((4, 4), dtype=np.uint8)) is not None:
+                return "Slot reused while a handle is still in use"
+
+            ring.release(handle)
+            other_handle = ring.publish(2, np.full((4, 4), 2, dtype=np.uint8))
+            if other_handle is None or other_handle.slot != handle.slot:
+                return "Slot not reused after all handles were released"
+            if not np.all(shared_frame_ring.attach(other_handle) == 2):
+                return "Reused slot does not hold the new frame"
+
+            # Releasing a handle of the previous frame again must not release the new one
+            ring.release(handle)
+            if ring.slot_references[other_handle.slot] != 1:
+                return "Stale handle released the new frame"
+
+            ring.release(other_handle)
+        finally:
+            ring.close()
+
+    def full_ring_returns_no_handle(self):
+        ring = SharedFrameRing(slot_count=2)
+        try:
+            handles = [ring.publish(1, np.zeros((4, 4), dtype=np.uint8)),
+                       ring.publish(2, np.zeros((4, 4), dtype=np.uint8))]
+
+            if ring.publish(3, np.zeros((4, 4), dtype=np.uint8)) is not None:
+                return "Expected no handle when all slots are in use"
+            if ring.stats()["full"] != 1:
+                return "Expected 1 full, but got %i" % ring.stats()["full"]
+
+            for handle in handles:
+                ring.release(handle)
+        finally:
+            ring.close()
+
+    def slot_grows_to_fit_frame(self):
+        ring = SharedFrameRing(slot_count=1)
+        try:
+            small_handle = ring.publish(1, np.zeros((4, 4), dtype=np.uint8))
+            ring.release(small_handle)
+
+            large_image = np.arange(64 * 48 * 3, dtype=np.uint32).reshape((64, 48, 3))
+            large_handle = ring.publish(2, large_image)
+
+            if large_handle.name == small_handle.name:
+                return "Slot did not grow"
+            if ring.stats()["bytes"] < large_image.nbytes:
+                return "Expected at least %i bytes, but got %i" % (large_image.nbytes, ring.stats()["bytes"])
+            if not np.array_equal(shared_frame_ring.attach(large_handle), large_image):
+                return "Grown slot does not hold the frame"
+
+            ring.release(large_handle)
+        finally:
+            ring.close()
+
+    def close_waits_for_handles_in_use(self):
+        ring = SharedFrameRing(slot_count=2)
+
+        handle = ring.publish(1, np.full((4, 4), 1, dtype=np.uint8))
+        ring.release(ring.publish(2, np.zeros((4, 4), dtype=np.uint8)))
+
+        ring.close()
+        if ring.publish(3, np.zeros((4, 4), dtype=np.uint8)) is not None:
+            return "Frame published to closed ring"
+        if ring.stats()["bytes"] != 4 * 4:
+            return "Expected only the slot in use to be kept, but got %i bytes" % ring.stats()["bytes"]
+
+        try:
+            shared_frame_ring.attach_segment(handle.name).close()
+        except FileNotFoundError:
+            return "Slot in use freed when closed"
+
+        ring.release(handle)
+        if ring.stats()["bytes"] != 0:
+            return "Slot not freed when its last handle was released"
+
+    def worker_reads_published_frame(self):
+        pool = DetectorProcessPool()
+        pool.start(processes=1, slot_count=2)
+        try:
+            image = np.arange(32 * 32 * 3, dtype=np.uint8).reshape((32, 32, 3))
+
+            handled, result = pool.detect(SumDetector(), "key", image)
+            if not handled:
+                return "Frame not handled by the pool"
+            if result != int(image.sum()):
+                return "Expected %i, but got %s" % (int(image.sum()), result)
+            if pool.frame_ring.slot_references != [0, 0]:
+                return "Handles not released: %s" % pool.frame_ring.slot_references
+            if pool.stats()["tasks"] != 1:
+                return "Unexpected stats %s" % pool.stats()
+        finally:
+            pool.stop()
+
+    def broken_pool_falls_back(self):
+        pool = DetectorProcessPool()
+        pool.start(processes=1, slot_count=2)
+        try:
+            handled, result = pool.detect(ExitingDetector(), "key", np.zeros((4, 4), dtype=np.uint8))
+            if handled:
+                return "Expected fallback when a worker dies"
+            if pool.is_running():
+                return "Broken pool still running"
+
+            handled, result = pool.detect(SumDetector(), "key", np.zeros((4, 4), dtype=np.uint8))
+            if handled:
+                return "Expected fallback while the pool is stopped"
+            if pool.stats()["failures"] != 1 or pool.stats()["fallbacks"] != 1:
+                return "Unexpected stats %s" % pool.stats()
+        finally:
+            pool.stop()
+
+
+class SumDetector(object):
+    def detect_in_image(self, image):
+        return int(image.sum())
+
+
+class ExitingDetector(object):
+    def detect_in_image(self, image):
+        os._exit(1)
@@ -1,9 +1,9 @@
 from threading import RLock
 
-import cv2
 from random import randint
 
 from tracking.board.board_snapshot import SnapshotSize
+from tracking.util.derived_image_cache import ImageColorspace
 
 
 BoardAreaId_FULL_IMAGE = -2
@@ -14,8 +14,6 @@ class BoardArea(object):
     """
     Represents a description of a board area.
     """
-    cached_area_images = {}
-    cached_grayscaled_area_images = {}
 
     board_descriptor = None
 
@@ -30,51 +28,57 @@ class BoardArea(object):
         self.area_id = area_id if area_id is not None else randint(0, 100000)
         self.board_descriptor = board_descriptor
         self.rect = rect
-        self.current_board_snapshot_id = None
 
         self.lock = RLock()
 
     def area_image(self, size=SnapshotSize.SMALL):
         """
-        Extracts area image from board snapshot.
+        Extracts area image from board snapshot. Area images are cached on the snapshot, so all calls during a
+        detection pass with a pinned snapshot (see BoardDescriptor.pinned_snapshot) see the same frame.
 
         :param size: Size to return
         :return Extracted area image
         """
 
         with self.lock:
+            board_snapshot = self.board_descriptor.get_board_snapshot()
 
             # Check if board is recognized
-            if not self.board_descriptor.board_snapshot.is_recognized():
+            if not board_snapshot.is_recognized():
                 return None
 
-            # Check if snapshot has changed
-            if self.current_board_snapshot_id != self.board_descriptor.board_snapshot.id:
+            return board_snapshot.area_image(self.rect, size)
 
-                # Remove cached images
-                self.cached_area_images = {}
-                self.cached_grayscaled_area_images = {}
+    def derived_images(self, size=SnapshotSize.SMALL):
+        """
+        Returns the cache of images derived from the area image in the given size.
 
-                # Save snapshot ID
-                self.current_board_snapshot_id = self.board_descriptor.board_snapshot.id
+        :param size: Size to return
+        :return Derived image cache, or None if no area image
+        """
+
+        with self.lock:
+            board_snapshot = self.board_descriptor.get_board_snapshot()
 
-            # Return cached area image
-            if size in self.cached_area_images:
-                return self.cached_area_images[size]
+            # Check if board is recognized
+            if not board_snapshot.is_recognized():
+                return None
 
-            # Get board image
-            board_image = self.board_descriptor.board_snapshot.board_image(size)
-            image_height, image_width = board_image.shape[:2]
+            return board_snapshot.area_derived_images(self.rect, size)
 
-            # Extract area image
-            x1 = int(float(image_width) * self.rect[0])
-            y1 = int(float(image_height) * self.rect[1])
-            x2 = int(float(image_width) * self.rect[2])
-            y2 = int(float(image_height) * self.rect[3])
+    def derived_area_image(self, size=SnapshotSize.SMALL, colorspace=ImageColorspace.BGR, preprocessing=None):
+        """
+        Extracts area image from board snapshot, preprocessed and converted to the given colorspace. Each derived
+        image is only calculated once per snapshot, and is shared between all detectors using the area.
 
-            self.cached_area_images[size] = board_image[y1:y2, x1:x2]
+        :param size: Size to return
+        :param colorspace: Colorspace (of type ImageColorspace enum)
+        :param preprocessing: (Optional) Preprocessing operation (see tracking.util.derived_image_cache)
+        :return Extracted derived area image
+        """
+        derived_images = self.derived_images(size)
 
-            return self.cached_area_images[size]
+        return derived_images.image(colorspace, preprocessing) if derived_images is not None else None
 
     def grayscaled_area_image(self, size=SnapshotSize.SMALL):
         """
@@ -83,25 +87,7 @@ class BoardArea(object):
         :param size: Size to return
         :return Extracted grayscaled area image
         """
-
-        with self.lock:
-
-            # Check if board is recognized
-            if not self.board_descriptor.board_snapshot.is_recognized():
-                return None
-
-            # Check if already extracted image
-            if self.current_board_snapshot_id == self.board_descriptor.board_snapshot.id:
-                if size in self.cached_grayscaled_area_images:
-                    return self.cached_grayscaled_area_images[size]
-
-            # Extract image
-            image = self.area_image(size)
-
-            # Grayscale image
-            self.cached_grayscaled_area_images[size] = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-            return self.cached_grayscaled_area_images[size]
+        return self.derived_area_image(size, ImageColorspace.GRAY)
 
     def transform_camera_point(self, x, y):
         """
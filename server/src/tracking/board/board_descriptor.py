@@ -1,28 +1,77 @@
-from threading import RLock
+import collections
+import contextlib
+from threading import RLock, local
 
 from tracking.board.board_snapshot import BoardSnapshot, SnapshotStatus
+from tracking.board.board_transform import BoardTransform
 from tracking.calibrators.board_calibrator import BoardCalibrator
+from util import tracing
 
 
 class BoardDescriptor(object):
     """
     Class representing a description of a board.
+
+    The most recent snapshots are kept in a bounded history, limited both by number of snapshots and by total memory
+    usage. A thread can pin the current snapshot for the duration of a detection pass, so that all areas it reads from
+    see the same frame, also if new frames arrive meanwhile.
     """
-    def __init__(self):
+    def __init__(self, history_length=4, max_history_bytes=None):
+        """
+        :param history_length: Maximum number of snapshots to keep in history
+        :param max_history_bytes: (Optional) Maximum total memory usage of snapshots in history
+        """
         self.lock = RLock()
 
         self.board_calibrator = BoardCalibrator(board_image_filename='resources/calibration/board_calibration.png')
 
+        self.board_transform = None
+
+        self.max_history_bytes = max_history_bytes
+        self.snapshot_history = collections.deque(maxlen=history_length)
+
+        self.pinned_snapshots = local()
+
         self.board_snapshot = BoardSnapshot()
         self.board_snapshot.status = SnapshotStatus.NOT_RECOGNIZED
 
     def update(self, image):
+        """
+        Creates a new snapshot from the given camera image. The snapshot is tagged with the trace of the frame
+        currently being processed, if any.
+
+        :param image: Camera image
+        """
+        with self.lock:
+            board_corners = self.board_calibrator.get_corners()
+            if board_corners is None:
+                self.set_board_snapshot(BoardSnapshot(camera_image=image,
+                                                      status=SnapshotStatus.NOT_RECOGNIZED,
+                                                      trace=tracing.current_trace()))
+                return
+
+            self.set_board_snapshot(BoardSnapshot(camera_image=image,
+                                                  board_corners=board_corners,
+                                                  board_transform=self.get_board_transform(board_corners),
+                                                  trace=tracing.current_trace()))
+
+    def get_board_transform(self, board_corners):
+        """
+        Returns the board transform for the given corners. The transform is only recalculated when the corners change,
+        i.e. when the board is recalibrated.
+
+        :param board_corners: Board corners
+        :return: Board transform
+        """
         with self.lock:
-            self.board_snapshot = BoardSnapshot(camera_image=image, board_corners=self.board_calibrator.get_corners())
+            if self.board_transform is None or not self.board_transform.has_corners(board_corners):
+                self.board_transform = BoardTransform(board_corners)
+            return self.board_transform
 
     def set_board_calibrator(self, board_calibrator):
         with self.lock:
             self.board_calibrator = board_calibrator
+            self.board_transform = None
 
     def get_board_calibrator(self):
         with self.lock:
@@ -31,11 +80,85 @@ class BoardDescriptor(object):
     def set_board_snapshot(self, snapshot):
         with self.lock:
             self.board_snapshot = snapshot
+            self.snapshot_history.append(snapshot)
+            self.evict_snapshot_history()
 
     def get_board_snapshot(self):
+        """
+        Returns the snapshot pinned by the calling thread, if any, or else the current snapshot.
+
+        :return: Board snapshot
+        """
+        pinned_snapshot = getattr(self.pinned_snapshots, 'snapshot', None)
+        if pinned_snapshot is not None:
+            return pinned_snapshot
+
         with self.lock:
             return self.board_snapshot
 
+    @contextlib.contextmanager
+    def pinned_snapshot(self):
+        """
+        Pins the current snapshot for the calling thread while in the with-block. Nested pins keep the outermost
+        snapshot. The trace of the snapshot is set as current trace meanwhile.
+
+        Usage:
+            with board_descriptor.pinned_snapshot() as snapshot:
+                ...
+
+        :return: Pinned snapshot
+        """
+        previous_snapshot = getattr(self.pinned_snapshots, 'snapshot', None)
+
+        self.pinned_snapshots.snapshot = self.get_board_snapshot()
+        try:
+            with tracing.trace_context(self.pinned_snapshots.snapshot.trace):
+                yield self.pinned_snapshots.snapshot
+        finally:
+            self.pinned_snapshots.snapshot = previous_snapshot
+
+    def get_snapshot(self, snapshot_id):
+        """
+        Returns the snapshot with the given ID, if still in history.
+
+        :param snapshot_id: Snapshot ID
+        :return: Snapshot, or None if not in history
+        """
+        with self.lock:
+            for snapshot in self.snapshot_history:
+                if snapshot.id == snapshot_id:
+                    return snapshot
+            return None
+
+    def get_snapshot_history(self):
+        """
+        Returns the snapshots in history, oldest first.
+
+        :return: List of snapshots
+        """
+        with self.lock:
+            return list(self.snapshot_history)
+
+    def snapshot_history_memory_usage(self):
+        """
+        Returns the total memory usage of the snapshots in history.
+
+        :return: Memory usage in bytes
+        """
+        with self.lock:
+            return sum([snapshot.memory_usage() for snapshot in self.snapshot_history])
+
+    def evict_snapshot_history(self):
+        """
+        Removes the oldest snapshots from history until within the memory limit. The current snapshot is never removed.
+        """
+        if self.max_history_bytes is None:
+            return
+
+        with self.lock:
+            while len(self.snapshot_history) > 1 and self.snapshot_history_memory_usage() > self.max_history_bytes:
+                self.snapshot_history.popleft()
+
     def is_recognized(self):
         with self.lock:
             return self.board_snapshot is not None
@@ -1,8 +1,13 @@
-import cv2
-from random import randint
+import itertools
+import time
 from threading import RLock
+
+import cv2
+
 from util import enum
-from tracking.util import transform
+from tracking.board.board_transform import BoardTransform
+from tracking.util.buffer_pool import memory_owner
+from tracking.util.derived_image_cache import DerivedImageCache, ImageColorspace
 
 
 SnapshotStatus = enum.Enum('NOT_RECOGNIZED', 'RECOGNIZED')
@@ -22,6 +27,40 @@ def get_snapshot_width(snapshot_size, default=None):
         return default
 
 
+def resize_to_snapshot_size(image, snapshot_size):
+    """
+    Scales an image down to the width of the given snapshot size, keeping the aspect ratio.
+
+    :param image: Image
+    :param snapshot_size: Snapshot size
+    :return: Scaled image, or the image itself if not wider than the snapshot size
+    """
+    image_height, image_width = image.shape[:2]
+
+    # Find output width
+    dest_width = get_snapshot_width(snapshot_size, default=image_width)
+
+    # Resize image
+    if dest_width < image_width:
+        return cv2.resize(image, (int(dest_width), int(dest_width * float(image_height) / float(image_width))))
+    else:
+        return image
+
+
+def next_snapshot_id():
+    """
+    Returns the next snapshot ID. Snapshot IDs are monotonically increasing, starting from 1.
+
+    :return: Snapshot ID
+    """
+    with _snapshot_id_lock:
+        return next(_snapshot_ids)
+
+
+_snapshot_ids = itertools.count(1)
+_snapshot_id_lock = RLock()
+
+
 class BoardSnapshot:
     """
     Class representing a snapshot (including current camera feed image) of a board.
@@ -29,26 +68,38 @@ class BoardSnapshot:
     Field variables (READ-ONLY!):
     status -- Recognition status (of type SnapshotStatus enum) of snapshot
     camera_image -- Original camera image
-    board_images -- The recognized and transformed images in all sizes (dict of type SnapshotSize enum)
-    grayscaled_board_images -- A grayscaled version of the board images in all sizes (dict of type SnapshotSize enum)
+    board_images -- The recognized and transformed images in all sizes (dict of type SnapshotSize enum). Images are
+                    warped from the camera image on first access in the requested size
+    derived_board_images -- Caches of images derived from the board images in all sizes (dict of type SnapshotSize enum)
+    area_images -- Area images warped from the camera image (dict of type (rect, SnapshotSize enum))
+    derived_area_images -- Caches of images derived from the area images (dict of type (rect, SnapshotSize enum))
     board_corners -- The four points in the source image representing the corners of the recognized board
-    id -- Random ID for the actual snapshot. Is set automatically when created
+    board_transform -- The perspective transform from camera image to board, shared between snapshots
+    id -- Monotonically increasing ID for the actual snapshot. Is set automatically when created
+    timestamp -- Time of creation of the snapshot
+    trace -- Trace of the camera frame the snapshot was created from (see util.tracing), or None
     """
 
-    def __init__(self, camera_image=None, board_corners=None, status=SnapshotStatus.RECOGNIZED):
+    def __init__(self, camera_image=None, board_corners=None, status=SnapshotStatus.RECOGNIZED, board_transform=None, trace=None):
         self.camera_image = camera_image
         self.board_corners = board_corners
         self.status = status
 
-        self.id = randint(0, 1000000)
+        if board_transform is None and board_corners is not None:
+            board_transform = BoardTransform(board_corners)
+
+        self.board_transform = board_transform
+
+        self.id = next_snapshot_id()
+        self.timestamp = time.time()
+        self.trace = trace
 
         self.lock = RLock()
 
         self.board_images = {}
-        self.grayscaled_board_images = {}
-
-        if camera_image is not None and board_corners is not None:
-            self.board_images[SnapshotSize.ORIGINAL] = transform.transform_image(camera_image, board_corners)
+        self.derived_board_images = {}
+        self.area_images = {}
+        self.derived_area_images = {}
 
     def is_recognized(self):
         """
@@ -58,6 +109,24 @@ class BoardSnapshot:
         """
         return self.status is SnapshotStatus.RECOGNIZED
 
+    def has_board_image(self):
+        """
+        Returns True if board images can be extracted from this snapshot or else False.
+
+        :return: True if snapshot has both a camera image and a board transform or else False
+        """
+        return self.camera_image is not None and self.board_transform is not None
+
+    def has_cached_board_image(self, image_size):
+        """
+        Returns True if the board image in the given size has already been warped.
+
+        :param image_size: Image size
+        :return: True if board image exists in given size or else False
+        """
+        with self.lock:
+            return image_size in self.board_images
+
     def board_image(self, image_size=SnapshotSize.SMALL):
         """
         Returns the board image in the given size.
@@ -72,28 +141,62 @@ class BoardSnapshot:
             if image_size in self.board_images:
                 return self.board_images[image_size]
 
-            # Get original board image
-            if SnapshotSize.ORIGINAL not in self.board_images:
+            # Check if board image can be extracted
+            if not self.has_board_image():
                 return None
 
-            original_image = self.board_images[SnapshotSize.ORIGINAL]
-
-            original_height, original_width = original_image.shape[:2]
-
-            # Calculate output aspect ratio
-            aspect_ratio = float(original_height) / float(original_width)
-
             # Find output width
-            dest_width = get_snapshot_width(image_size, default=original_width)
+            dest_width = get_snapshot_width(image_size, default=self.board_transform.width)
 
-            # Resize image
-            if dest_width < original_width:
-                self.board_images[image_size] = cv2.resize(original_image, (int(dest_width), int(dest_width * aspect_ratio)))
+            # Warp image directly from camera image in requested size
+            if dest_width < self.board_transform.width:
+                self.board_images[image_size] = self.board_transform.warp_image(self.camera_image, dest_width)
+
+            # Share full size board image between sizes not smaller than original
             else:
-                self.board_images[image_size] = original_image
+                if SnapshotSize.ORIGINAL not in self.board_images:
+                    self.board_images[SnapshotSize.ORIGINAL] = self.board_transform.warp_image(self.camera_image)
+                self.board_images[image_size] = self.board_images[SnapshotSize.ORIGINAL]
 
             return self.board_images[image_size]
 
+    def derived_images(self, image_size=SnapshotSize.SMALL):
+        """
+        Returns the cache of images derived from the board image in the given size.
+
+        :param image_size: Image size
+        :return: Derived image cache, or None if no board image
+        """
+
+        with self.lock:
+
+            # Check if cache already exists
+            if image_size in self.derived_board_images:
+                return self.derived_board_images[image_size]
+
+            # Get board image
+            board_image = self.board_image(image_size)
+            if board_image is None:
+                return None
+
+            self.derived_board_images[image_size] = DerivedImageCache(board_image)
+
+            return self.derived_board_images[image_size]
+
+    def derived_board_image(self, image_size=SnapshotSize.SMALL, colorspace=ImageColorspace.BGR, preprocessing=None):
+        """
+        Returns the board image in the given size, preprocessed and converted to the given colorspace. Each derived
+        image is only calculated once per snapshot.
+
+        :param image_size: Image size
+        :param colorspace: Colorspace (of type ImageColorspace enum)
+        :param preprocessing: (Optional) Preprocessing operation (see tracking.util.derived_image_cache)
+        :return: Derived board image in given size
+        """
+        derived_images = self.derived_images(image_size)
+
+        return derived_images.image(colorspace, preprocessing) if derived_images is not None else None
+
     def grayscaled_board_image(self, image_size=SnapshotSize.SMALL):
         """
         Returns the grayscaled board image in the given size.
@@ -101,18 +204,94 @@ class BoardSnapshot:
         :param image_size: Image size
         :return: Grayscaled board image in given size
         """
+        return self.derived_board_image(image_size, ImageColorspace.GRAY)
+
+    def area_image(self, rect, image_size=SnapshotSize.SMALL):
+        """
+        Returns the image of the given board area in the given size. Only the area is warped from the camera image,
+        unless the board image is already available in the given size.
+
+        :param rect: Area rect in percentage of board [x1, y1, x2, y2]
+        :param image_size: Image size
+        :return: Area image in given size
+        """
+        key = (tuple(rect), image_size)
 
         with self.lock:
 
             # Check if image already exists
-            if image_size in self.grayscaled_board_images:
-                return self.grayscaled_board_images[image_size]
+            if key in self.area_images:
+                return self.area_images[key]
+
+            # Check if board image can be extracted
+            if not self.has_board_image():
+                return None
+
+            # Extract area image from board image if already warped in this size, or if area is whole board
+            if image_size in self.board_images or key[0] == (0.0, 0.0, 1.0, 1.0):
+                board_image = self.board_image(image_size)
+                image_height, image_width = board_image.shape[:2]
+
+                x1 = int(float(image_width) * rect[0])
+                y1 = int(float(image_height) * rect[1])
+                x2 = int(float(image_width) * rect[2])
+                y2 = int(float(image_height) * rect[3])
 
-            # Check for original board image
-            if SnapshotSize.ORIGINAL not in self.board_images:
+                self.area_images[key] = board_image[y1:y2, x1:x2]
+
+            # Warp only area from camera image
+            else:
+                dest_width = get_snapshot_width(image_size, default=self.board_transform.width)
+
+                self.area_images[key] = self.board_transform.warp_image(self.camera_image, dest_width, rect)
+
+            return self.area_images[key]
+
+    def area_derived_images(self, rect, image_size=SnapshotSize.SMALL):
+        """
+        Returns the cache of images derived from the given area image in the given size.
+
+        :param rect: Area rect in percentage of board [x1, y1, x2, y2]
+        :param image_size: Image size
+        :return: Derived image cache, or None if no area image
+        """
+        key = (tuple(rect), image_size)
+
+        with self.lock:
+
+            # Check if cache already exists
+            if key in self.derived_area_images:
+                return self.derived_area_images[key]
+
+            # Get area image
+            area_image = self.area_image(rect, image_size)
+            if area_image is None:
                 return None
 
-            # Grayscale imagae
-            self.grayscaled_board_images[image_size] = cv2.cvtColor(self.board_image(image_size), cv2.COLOR_BGR2GRAY)
+            self.derived_area_images[key] = DerivedImageCache(area_image)
+
+            return self.derived_area_images[key]
+
+    def memory_usage(self):
+        """
+        Returns the number of bytes used by the camera image and all images extracted from it. Images shared between
+        sizes and views into other images are only counted once.
+
+        :return: Memory usage in bytes
+        """
+        with self.lock:
+            images = [self.camera_image]
+            images += list(self.board_images.values())
+            images += list(self.area_images.values())
+
+            for derived_images in list(self.derived_board_images.values()) + list(self.derived_area_images.values()):
+                images += derived_images.derived_images()
+
+            unique_images = {}
+            for image in images:
+                if image is None:
+                    continue
+                base_image = memory_owner(image)
+                unique_images[id(base_image)] = base_image
 
-            return self.grayscaled_board_images[image_size]
+            return sum([image.nbytes for image in unique_images.values()])
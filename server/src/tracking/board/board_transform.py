@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+from threading import RLock
+
+from tracking.util import buffer_pool
+from tracking.util import transform
+from util import metrics
+
+
+class BoardTransform(object):
+    """
+    Class representing the perspective transform from the camera image to the board, as given by the board corners.
+
+    The transform only changes when the board is recalibrated, so it is calculated once and shared by all snapshots
+    with the same board corners. Remap maps are calculated once per output width and area and reused for all frames.
+
+    Field variables (READ-ONLY!):
+    board_corners -- The four points in the source image representing the corners of the board
+    perspective_transform -- Perspective transform from camera image to board image
+    width -- Width of full size board image
+    height -- Height of full size board image
+    """
+
+    def __init__(self, board_corners):
+        """
+        :param board_corners: The four points in the source image representing the corners of the board
+        """
+        self.board_corners = board_corners
+        self.perspective_transform, (self.width, self.height) = transform.perspective_transform_from_corners(board_corners)
+
+        self.lock = RLock()
+        self.cached_remap_maps = {}
+
+    def has_corners(self, board_corners):
+        """
+        Returns True if this transform was created from the given board corners.
+
+        :param board_corners: Board corners
+        :return: True if corners are equal to the corners of this transform
+        """
+        return [list(corner) for corner in self.board_corners] == [list(corner) for corner in board_corners]
+
+    def image_size(self, max_width=None):
+        """
+        Returns the size of the board image at the given width. Board images are never upscaled.
+
+        :param max_width: (Optional) Maximum width of board image. Defaults to full size
+        :return: (width, height)
+        """
+        if max_width is None or max_width >= self.width:
+            return self.width, self.height
+
+        aspect_ratio = float(self.height) / float(self.width)
+
+        return int(max_width), int(max_width * aspect_ratio)
+
+    def area_bounds(self, rect, max_width=None):
+        """
+        Returns the pixel bounds of the given area in the board image at the given width.
+
+        :param rect: Area rect in percentage of board [x1, y1, x2, y2]
+        :param max_width: (Optional) Maximum width of board image. Defaults to full size
+        :return: (x1, y1, x2, y2) in pixels
+        """
+        image_width, image_height = self.image_size(max_width)
+
+        return (int(float(image_width) * rect[0]),
+                int(float(image_height) * rect[1]),
+                int(float(image_width) * rect[2]),
+                int(float(image_height) * rect[3]))
+
+    def remap_maps(self, max_width=None, rect=None):
+        """
+        Returns the fixed-point remap maps for the board image at the given width, optionally restricted to an area
+        of the board.
+
+        :param max_width: (Optional) Maximum width of board image. Defaults to full size
+        :param rect: (Optional) Area rect in percentage of board [x1, y1, x2, y2]. Defaults to whole board
+        :return: (map1, map2) to use with cv2.remap
+        """
+        image_size = self.image_size(max_width)
+        bounds = self.area_bounds(rect, max_width) if rect is not None else (0, 0) + image_size
+
+        with self.lock:
+            if (image_size, bounds) not in self.cached_remap_maps:
+                self.cached_remap_maps[(image_size, bounds)] = transform.perspective_remap_maps(self.perspective_transform,
+                                                                                               (self.width, self.height),
+                                                                                               image_size,
+                                                                                               bounds)
+            return self.cached_remap_maps[(image_size, bounds)]
+
+    def warp_image(self, camera_image, max_width=None, rect=None):
+        """
+        Warps the camera image into a board image at the given width. If a rect is given, only that area of the
+        board is warped, giving the same result as cropping the board image.
+
+        :param camera_image: Camera image
+        :param max_width: (Optional) Maximum width of board image. Defaults to full size
+        :param rect: (Optional) Area rect in percentage of board [x1, y1, x2, y2]. Defaults to whole board
+        :return: Board image
+        """
+
+        # Check for empty area
+        if rect is not None:
+            x1, y1, x2, y2 = self.area_bounds(rect, max_width)
+            if x2 <= x1 or y2 <= y1:
+                return np.zeros((max(0, y2 - y1), max(0, x2 - x1)) + camera_image.shape[2:], camera_image.dtype)
+
+        with metrics.get_metrics().timer("board_warp_seconds", width=self.image_size(max_width)[0], area=rect is not None):
+            map1, map2 = self.remap_maps(max_width, rect)
+
+            # Warp into pooled buffer
+            board_image = buffer_pool.get_pool().acquire(map1.shape[:2] + camera_image.shape[2:], camera_image.dtype)
+
+            return cv2.remap(camera_image, map1, map2, cv2.INTER_LINEAR, dst=board_image)
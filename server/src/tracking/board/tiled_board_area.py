@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from tracking.board.board_area import BoardArea, SnapshotSize
+from tracking.util.derived_image_cache import ImageColorspace
 from tracking.detectors.tiled_brick_detector import TiledBrickDetector
 
 
@@ -86,7 +87,7 @@ class TiledBoardArea(BoardArea):
                 tile_width_padded,
                 tile_height_padded)
 
-    def tile(self, x, y, grayscaled=False, size=SnapshotSize.ORIGINAL):
+    def tile(self, x, y, grayscaled=False, size=SnapshotSize.ORIGINAL, colorspace=None):
         """
         Returns the tile at x, y.
 
@@ -94,22 +95,24 @@ class TiledBoardArea(BoardArea):
         :param y: Y coordinate
         :param grayscaled: If true, use grayscaled image as source
         :param size: Snapshot size
+        :param colorspace: (Optional) Colorspace of source image (of type ImageColorspace enum). Overrides grayscaled
         :return: The tile at x, y
         """
-        source_image = self.area_image(size) if not grayscaled else self.grayscaled_area_image(size)
+        source_image = self.tile_source_image(grayscaled, size, colorspace)
         x1, y1, x2, y2 = self.tile_region(x, y, size)[:4]
         return source_image[y1:y2, x1:x2]
 
-    def tile_strip(self, coordinates, grayscaled=False, size=SnapshotSize.ORIGINAL):
+    def tile_strip(self, coordinates, grayscaled=False, size=SnapshotSize.ORIGINAL, colorspace=None):
         """
         Returns the tiles at the specified coordinates.
 
         :param coordinates: List of coordinates [(x, y), ...]
         :param grayscaled: If true and source_image is None, use grayscaled image as source
         :param size: Snapshot size
+        :param colorspace: (Optional) Colorspace of source image (of type ImageColorspace enum). Overrides grayscaled
         :return: The tiles in a single horizontal image strip
         """
-        source_image = self.area_image(size) if not grayscaled else self.grayscaled_area_image(size)
+        source_image = self.tile_source_image(grayscaled, size, colorspace)
 
         tile_width, tile_height = self.tile_size_padded(size)
 
@@ -118,20 +121,34 @@ class TiledBoardArea(BoardArea):
 
         channels = source_image.shape[2] if len(source_image.shape) > 2 else 1
         if channels > 1:
-            size = (image_height, image_width, channels)
+            strip_size = (image_height, image_width, channels)
         else:
-            size = (image_height, image_width)
+            strip_size = (image_height, image_width)
 
-        strip_image = np.zeros(size, source_image.dtype)
+        strip_image = np.zeros(strip_size, source_image.dtype)
 
         offset = 0.0
         for (x, y) in coordinates:
-            tile_image = self.tile(x, y, grayscaled, size)
+            tile_image = self.tile(x, y, grayscaled, size, colorspace)
             strip_image[0:image_height, int(offset):min(int(offset) + int(tile_width), image_width)] = tile_image
             offset += tile_width
 
         return strip_image
 
+    def tile_source_image(self, grayscaled=False, size=SnapshotSize.ORIGINAL, colorspace=None):
+        """
+        Returns the area image to extract tiles from.
+
+        :param grayscaled: If true, use grayscaled image as source
+        :param size: Snapshot size
+        :param colorspace: (Optional) Colorspace of source image (of type ImageColorspace enum). Overrides grayscaled
+        :return: Source image
+        """
+        if colorspace is None:
+            colorspace = ImageColorspace.GRAY if grayscaled else ImageColorspace.BGR
+
+        return self.derived_area_image(size, colorspace)
+
     def tile_from_strip_image(self, index, tile_strip_image, size=SnapshotSize.ORIGINAL):
         """
         Returns the tile at the given index from the given tile strip image.
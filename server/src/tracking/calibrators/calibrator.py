@@ -29,7 +29,15 @@ class Calibrator(object):
         """
 
         # Perform detection
-        result = self.detect(image)
+        return self.update_with_result(self.detect(image))
+
+    def update_with_result(self, result):
+        """
+        Updates detection state with the result of a single detection.
+
+        :param result: Detection result, or None if not detected
+        :return: Current detection state
+        """
 
         # Update history
         if result is not None:
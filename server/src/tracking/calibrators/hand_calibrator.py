@@ -1,8 +1,10 @@
 import cv2
 import numpy as np
 
+from tracking.board.board_snapshot import SnapshotSize
 from tracking.calibrators.calibrator import Calibrator, State
 from tracking.util import misc_math
+from tracking.util.derived_image_cache import ImageColorspace, gaussian_blur
 
 
 class HandCalibrator(Calibrator):
@@ -36,7 +38,22 @@ class HandCalibrator(Calibrator):
         #cv2.waitKey(0)
 
         # Prepare image
-        image = self.prepare_image(image)
+        return self.detect_in_prepared_image(self.prepare_image(image))
+
+    def update_with_board_area(self, board_area):
+        """
+        Updates detection state with the blurred HSV area image shared with other detectors.
+
+        :param board_area: Board area
+        :return: Current detection state
+        """
+        hsv_image = board_area.derived_area_image(SnapshotSize.EXTRA_SMALL, ImageColorspace.HSV, gaussian_blur(7))
+        if hsv_image is None:
+            return self.get_state()
+
+        return self.update_with_result(self.detect_in_prepared_image(self.center_extract_image(hsv_image)))
+
+    def detect_in_prepared_image(self, image):
 
         # Try different thresholds one after one
         for hand_thresholds in self.thresholds:
@@ -89,15 +106,8 @@ class HandCalibrator(Calibrator):
         image_height, image_width = image.shape[:2]
 
         image = cv2.resize(image, (320, int(320.0 * image_height / image_width)))
-        image_height, image_width = image.shape[:2]
-
-        # Extract area image
-        x1 = int(float(image_width) * ((1.0 - self.center_extract_pct[0]) / 2.0))
-        y1 = int(float(image_height) * ((1.0 - self.center_extract_pct[1]) / 2.0))
-        x2 = int(float(image_width) * ((1.0 + self.center_extract_pct[0]) / 2.0))
-        y2 = int(float(image_height) * ((1.0 + self.center_extract_pct[1]) / 2.0))
 
-        center_extract_image = image[y1:y2, x1:x2]
+        center_extract_image = self.center_extract_image(image)
 
         # Blur image
         blur_image = cv2.GaussianBlur(center_extract_image, (7, 7), 0)
@@ -107,6 +117,17 @@ class HandCalibrator(Calibrator):
 
         return hsv_image
 
+    def center_extract_image(self, image):
+        image_height, image_width = image.shape[:2]
+
+        # Extract area image
+        x1 = int(float(image_width) * ((1.0 - self.center_extract_pct[0]) / 2.0))
+        y1 = int(float(image_height) * ((1.0 - self.center_extract_pct[1]) / 2.0))
+        x2 = int(float(image_width) * ((1.0 + self.center_extract_pct[0]) / 2.0))
+        y2 = int(float(image_height) * ((1.0 + self.center_extract_pct[1]) / 2.0))
+
+        return image[y1:y2, x1:x2]
+
     def are_hand_conditions_satisfied_for_contour(self, index, contours, hierarchy, image):
 
         # Check hierarchy
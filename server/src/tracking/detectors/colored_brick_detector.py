@@ -7,12 +7,15 @@ from skimage.morphology import watershed
 from tracking.board.board_snapshot import SnapshotSize
 from tracking.detectors.detector import Detector
 from tracking.util import misc_math
+from tracking.util.derived_image_cache import DerivedImageCache, ImageColorspace, mean_shift_filtering
 
 
 class ColoredBrickDetector(Detector):
     """
     Class implementing simple colored brick detector.
     """
+    process_pool_enabled = True
+
     def __init__(self, detector_id):
         """
         :param detector_id: Detector ID
@@ -42,25 +45,45 @@ class ColoredBrickDetector(Detector):
         """
         return SnapshotSize.SMALL
 
-    def detect_in_image(self, image, debug=False):
+    def detect_in_board_area(self, board_area):
+        size = self.preferred_input_image_resolution()
+
+        image = board_area.area_image(size)
+        if image is None:
+            return None
+
+        return self.detect_in_area_image(board_area, size, image, lambda: self.detect_in_image(image, derived_images=board_area.derived_images(size)))
+
+    def detect_in_image(self, image, debug=False, derived_images=None):
         """
         Run detector in image.
 
         :param image: Image
+        :param derived_images: (Optional) Cache of images derived from image, shared with other detectors
         :return: List of detected bricks {detectorId, bricks: [{class, x, y, radius}]}
         """
 
         image_height, image_width = image.shape[:2]
         dest_width = 640
-        image = cv2.resize(image, (dest_width, int(dest_width * float(image_height) / float(image_width))))
+
+        # Resize image, in which case derived images cannot be used
+        if image_width != dest_width:
+            image = cv2.resize(image, (dest_width, int(dest_width * float(image_height) / float(image_width))))
+            derived_images = None
+
+        if derived_images is None:
+            derived_images = DerivedImageCache(image)
+
+        # Copy image, since result is drawn onto it
+        image = image.copy()
 
         image_height, image_width = image.shape[:2]
 
-        # Meanshift segmentation
+        # Meanshift segmentation. Copied, since debug output is drawn onto it
         #meanshift_image = cv2.pyrMeanShiftFiltering(image, 21/2, 51/2)
-        meanshift_image = cv2.pyrMeanShiftFiltering(image, 21, 51)
+        meanshift_image = derived_images.image(ImageColorspace.BGR, mean_shift_filtering(21, 51)).copy()
 
-        hsv_image = cv2.cvtColor(meanshift_image, cv2.COLOR_BGR2HSV)
+        hsv_image = derived_images.image(ImageColorspace.HSV, mean_shift_filtering(21, 51))
         hue_image, saturation_image, value_image = cv2.split(hsv_image)
 
         #floodflags = 4
@@ -1,13 +1,23 @@
+import itertools
+from threading import RLock
+
 from tracking.board.board_snapshot import SnapshotSize
+from tracking.util import detector_process_pool, result_cache
+from util import metrics
 
 
 class Detector(object):
 
+    # Whether the detector may run in the detector process pool, when started. Detectors enabling this must be
+    # picklable and implement detect_in_image
+    process_pool_enabled = False
+
     def __init__(self, detector_id=None):
         """
         :param detector_id: Detector ID
         """
         self.detector_id = detector_id
+        self.instance_id = next_detector_instance_id()
 
     def preferred_input_image_resolution(self):
         """
@@ -17,9 +27,19 @@ class Detector(object):
         """
         return SnapshotSize.MEDIUM
 
+    def detector_parameters(self):
+        """
+        Returns the parameters identifying the results of this detector. Detectors returning equal parameters share
+        results detected in the same board area and snapshot. Defaults to this detector instance only.
+
+        :return: Hashable detector parameters
+        """
+        return type(self).__name__, self.instance_id
+
     def detect(self, image=None, board_area=None):
         """
-        Run detector in image or board area.
+        Run detector in image or board area. Results in board areas are memoized per snapshot, and every caller gets
+        its own copy.
 
         :param image: Image
         :param board_area: Board area
@@ -28,11 +48,65 @@ class Detector(object):
         if image is not None:
             return self.detect_in_image(image)
         if board_area is not None:
-            return self.detect_in_board_area(board_area)
+            return self.memoized_detect_in_board_area(board_area)
         raise Exception("Either 'image' or 'board_area' must be given as input to 'detect'")
 
+    def memoized_detect_in_board_area(self, board_area):
+        """
+        Run detector in board area, or return the result already detected in the current snapshot.
+
+        :param board_area: Board area
+        :return: Detector-dependant output
+        """
+
+        # Make sure the result is detected in the snapshot it is cached for
+        with board_area.board_descriptor.pinned_snapshot() as snapshot:
+            key = (snapshot.id, board_area.area_id, tuple(board_area.rect), self.detector_parameters())
+
+            return result_cache.get_cache().result(key, lambda: self.timed_detect_in_board_area(board_area))
+
+    def timed_detect_in_board_area(self, board_area):
+        with metrics.get_metrics().timer("detector_seconds", detector=type(self).__name__):
+            return self.detect_in_board_area(board_area)
+
     def detect_in_image(self, image):
         raise Exception("Function 'detect_in_image' must be overridden!")
 
     def detect_in_board_area(self, board_area):
         return self.detect_in_image(board_area.area_image(size=self.preferred_input_image_resolution()))
+
+    def detect_in_area_image(self, board_area, size, image, detect_function):
+        """
+        Runs detect_in_image on the given board area image in the detector process pool, if enabled for this detector
+        and started, or else calls the detect function.
+
+        :param board_area: Board area
+        :param size: Size of image
+        :param image: Board area image
+        :param detect_function: Function detecting in the calling thread, fx. using the derived images of the area
+        :return: Detector-dependant output
+        """
+        pool = detector_process_pool.get_pool()
+
+        if self.process_pool_enabled and pool.is_running():
+            key = (board_area.board_descriptor.get_board_snapshot().id, tuple(board_area.rect), size)
+
+            handled, result = pool.detect(self, key, image)
+            if handled:
+                return result
+
+        return detect_function()
+
+
+def next_detector_instance_id():
+    """
+    Returns the next detector instance ID. Unlike id(), instance IDs are never reused.
+
+    :return: Detector instance ID
+    """
+    with _detector_instance_id_lock:
+        return next(_detector_instance_ids)
+
+
+_detector_instance_ids = itertools.count(1)
+_detector_instance_id_lock = RLock()
@@ -4,6 +4,7 @@ import numpy as np
 from tracking.board.board_snapshot import SnapshotSize
 from tracking.detectors.detector import Detector
 from tracking.util import misc_math
+from tracking.util.derived_image_cache import DerivedImageCache, ImageColorspace, gaussian_blur
 from util import enum
 
 
@@ -16,6 +17,8 @@ class HandDetector(Detector):
     """
     Class implementing hand detector.
     """
+    process_pool_enabled = True
+
     def __init__(self, detector_id, thresholds=[{"lower": (0, 10, 60), "upper": (20, 255, 255)}]):
         """
         :param detector_id: Detector ID
@@ -33,18 +36,19 @@ class HandDetector(Detector):
         """
         return SnapshotSize.EXTRA_SMALL
 
-    def detect_in_image(self, image):
+    def detect_in_image(self, image, derived_images=None):
         """
         Run detector in image.
 
         :param image: Image
+        :param derived_images: (Optional) Cache of images derived from image, shared with other detectors
         :return: List of detected hands each containing {gesture, boundingRect: {x1, y1, x2, y2}}
         """
 
         # Prepare image
         #cv2.imwrite("debug/hand_detector.png", image)
 
-        image = self.prepare_image(image)
+        image = self.prepare_image(derived_images if derived_images is not None else DerivedImageCache(image))
 
         #cv2.imshow("Thresholded", image)
         #cv2.waitKey(0)
@@ -79,14 +83,20 @@ class HandDetector(Detector):
         return {"detectorId": self.detector_id,
                 "hands": hands}
 
-    def prepare_image(self, image):
-        image_height, image_width = image.shape[:2]
+    def detect_in_board_area(self, board_area):
+        size = self.preferred_input_image_resolution()
+
+        image = board_area.area_image(size)
+        if image is None:
+            return None
+
+        return self.detect_in_area_image(board_area, size, image, lambda: self.detect_in_image(image, board_area.derived_images(size)))
 
-        # Blur image
-        image = cv2.GaussianBlur(image, (7, 7), 0)
+    def prepare_image(self, derived_images):
 
-        # Extract HSV image
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        # Get blurred HSV image
+        image = derived_images.image(ImageColorspace.HSV, gaussian_blur(7))
+        image_height, image_width = image.shape[:2]
 
         # Merge colorspaces into one mask
         mask_image = np.zeros((image_height, image_width, 1), np.uint8)
@@ -32,6 +32,19 @@ class NonobstructedAreaDetector(Detector):
         """
         return SnapshotSize.EXTRA_SMALL
 
+    def detector_parameters(self):
+        """
+        Returns the parameters identifying the results of this detector, so that requests for the same area share
+        results.
+
+        :return: Hashable detector parameters
+        """
+        return (type(self).__name__,
+                tuple(self.target_size),
+                tuple(self.target_point),
+                tuple(self.current_position) if self.current_position is not None else None,
+                tuple(self.padding))
+
     def detect_in_image(self, image):
         """
         Run detector in image.
@@ -0,0 +1,98 @@
+import cv2
+
+from tracking.board.board_snapshot import SnapshotSize
+from tracking.detectors.colored_brick_detector import ColoredBrickDetector
+from tracking.detectors.hand_detector import HandDetector, handDetectorId
+from tracking.detectors.image_detector import ImageDetector
+from tracking.detectors.nonobstructed_area_detector import NonobstructedAreaDetector
+from util import misc_util
+
+
+def create_hand_detector(options):
+    """
+    thresholds: (Optional) Hand calibration thresholds [{lower: [h, s, v], upper: [h, s, v]}, ...]
+    """
+    if "thresholds" in options:
+        return HandDetector(handDetectorId, thresholds=[{"lower": tuple(threshold["lower"]), "upper": tuple(threshold["upper"])}
+                                                        for threshold in options["thresholds"]])
+    return HandDetector(handDetectorId)
+
+
+def create_image_detector(options):
+    """
+    sourceImage: Filename of image to detect
+    minMatches: (Optional) Minimum number of matches
+    imageResolution: (Optional) Input resolution, fx. "LARGE"
+    """
+    source_image = cv2.imread(options["sourceImage"])
+    if source_image is None:
+        raise Exception("Could not load source image: %s" % options["sourceImage"])
+
+    return ImageDetector(detector_id=options["detectorId"] if "detectorId" in options else 0,
+                         source_image=source_image,
+                         min_matches=options["minMatches"] if "minMatches" in options else 8,
+                         input_resolution=getattr(SnapshotSize, options["imageResolution"]) if "imageResolution" in options else SnapshotSize.LARGE)
+
+
+def create_colored_brick_detector(options):
+    return ColoredBrickDetector(options["detectorId"] if "detectorId" in options else 0)
+
+
+def create_nonobstructed_area_detector(options):
+    """
+    targetSize: Size to fit [width, height]
+    targetPosition: (Optional) Target point to find nonobstructed space for
+    currentPosition: (Optional) Current position to exclude
+    padding: (Optional) Area padding
+    """
+    return NonobstructedAreaDetector(options["targetSize"],
+                                     target_position=options["targetPosition"] if "targetPosition" in options else [0.5, 0.5],
+                                     current_position=options["currentPosition"] if "currentPosition" in options else None,
+                                     padding=options["padding"] if "padding" in options else [0.0, 0.0])
+
+
+def create_tensorflow_detector(options):
+    """
+    modelName: Name of model to use
+    minScore: (Optional) Minimum score of detections
+    """
+    if not misc_util.module_exists("tensorflow"):
+        raise Exception("Tensorflow detector requires the tensorflow module")
+
+    from tracking.detectors.tensorflow_detector import TensorflowDetector
+
+    return TensorflowDetector(detector_id=options["detectorId"] if "detectorId" in options else 0,
+                              model_name=options["modelName"],
+                              min_score=options["minScore"] if "minScore" in options else 0.9)
+
+
+# Detectors that can be created by name, fx. for offline processing
+detector_factories = {"hand": create_hand_detector,
+                      "image": create_image_detector,
+                      "coloredBricks": create_colored_brick_detector,
+                      "nonobstructedArea": create_nonobstructed_area_detector,
+                      "tensorflow": create_tensorflow_detector}
+
+
+def register_detector(name, factory):
+    """
+    Registers a detector factory.
+
+    :param name: Detector name
+    :param factory: Function taking an options dict and returning a detector
+    """
+    detector_factories[name] = factory
+
+
+def create_detector(name, options={}):
+    """
+    Creates a registered detector.
+
+    :param name: Detector name
+    :param options: Detector options (see the factory of the detector)
+    :return: Detector
+    """
+    if name not in detector_factories:
+        raise Exception("Unknown detector: %s. Available: %s" % (name, ", ".join(sorted(detector_factories.keys()))))
+
+    return detector_factories[name](options)
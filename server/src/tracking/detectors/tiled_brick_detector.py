@@ -3,6 +3,7 @@ import numpy as np
 import heapq
 
 from tracking.util import histogram_util
+from tracking.util.derived_image_cache import ImageColorspace
 from util import enum
 
 
@@ -162,15 +163,13 @@ class TiledBrickDetector(object):
     def find_colored_brick_among_tiles(self, color, coordinates, debug=False):
         with self.tiled_board_area.lock:
 
-            # Extract tile strip
-            tile_strip_image = self.tiled_board_area.tile_strip(coordinates, grayscaled=False)
+            # Extract HSV tile strip from shared HSV area image
+            hsv_image = self.tiled_board_area.tile_strip(coordinates, colorspace=ImageColorspace.HSV)
 
             if debug:
                 cv2.imshow('Area image', self.tiled_board_area.board_descriptor.get_board_snapshot().board_image('MEDIUM'))
-                cv2.imshow('Tile stip image', tile_strip_image)
+                cv2.imshow('Tile stip image', cv2.cvtColor(hsv_image, cv2.COLOR_HSV2BGR))
 
-            # Extract HSV
-            hsv_image = cv2.cvtColor(tile_strip_image, cv2.COLOR_BGR2HSV)
             hue_image, saturation_image, value_image = cv2.split(hsv_image)
 
             if debug:
@@ -0,0 +1,152 @@
+import weakref
+from collections import OrderedDict
+from threading import RLock
+
+import numpy as np
+
+
+class BufferLease(object):
+    """
+    Owner of an image handed out from a pooled buffer. Handed out images, and all views of them, reference the lease
+    as their base, so the buffer is in use exactly as long as the lease is alive.
+    """
+
+    def __init__(self, buffer):
+        """
+        :param buffer: Pooled buffer
+        """
+        self.buffer = buffer
+        self.__array_interface__ = buffer.__array_interface__
+
+
+def lease_buffer(buffer, release_function=None):
+    """
+    Returns an image backed by the given buffer, and a weak reference to its lease. The lease is alive while the image
+    or any view of it is referenced.
+
+    :param buffer: Buffer
+    :param release_function: (Optional) Function called when the lease is no longer referenced
+    :return: (image, weak reference to lease)
+    """
+    lease = BufferLease(buffer)
+
+    if release_function is not None:
+        weakref.finalize(lease, release_function)
+
+    return np.asarray(lease), weakref.ref(lease)
+
+
+def memory_owner(image):
+    """
+    Returns the array owning the memory of an image, fx. the pooled buffer of an image handed out by a pool, or the
+    image a view was taken of.
+
+    :param image: Image
+    :return: Array owning the memory of the image
+    """
+    while image.base is not None:
+        if isinstance(image.base, BufferLease):
+            return image.base.buffer
+        if not isinstance(image.base, np.ndarray):
+            return image
+        image = image.base
+
+    return image
+
+
+class BufferPool(object):
+    """
+    Pool of preallocated image buffers, keyed by shape and data type.
+
+    Buffers are never explicitly released. A buffer is returned to the pool once the image it was handed out as, and
+    all views of it, have been discarded (see BufferLease).
+    """
+
+    def __init__(self, max_buffers_per_key=16, max_keys=32):
+        """
+        :param max_buffers_per_key: Maximum number of pooled buffers for each shape and data type
+        :param max_keys: Maximum number of different shapes and data types to pool buffers for
+        """
+        self.max_buffers_per_key = max_buffers_per_key
+        self.max_keys = max_keys
+
+        self.lock = RLock()
+        self.buffers = OrderedDict()
+        self.buffer_counts = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """
+        Returns a buffer of the given shape and data type. The content of the buffer is undefined.
+
+        :param shape: Buffer shape
+        :param dtype: Buffer data type
+        :return: Buffer
+        """
+        key = (tuple(shape), np.dtype(dtype))
+
+        with self.lock:
+            buffers = self.buffers.pop(key, [])
+            self.buffers[key] = buffers
+
+            # Reuse free buffer
+            if len(buffers) > 0:
+                self.hits += 1
+                return self._lease(key, buffers, buffers.pop())
+
+            self.misses += 1
+
+            # Forget least recently used shapes. Buffers of forgotten shapes still in use are not returned to the pool
+            while len(self.buffers) > self.max_keys:
+                forgotten_key, _ = self.buffers.popitem(last=False)
+                self.buffer_counts.pop(forgotten_key, None)
+
+            # Allocate new buffer, unpooled if the maximum number of buffers of this shape are in use
+            buffer = np.empty(key[0], key[1])
+            if self.buffer_counts.get(key, 0) >= self.max_buffers_per_key:
+                return buffer
+
+            self.buffer_counts[key] = self.buffer_counts.get(key, 0) + 1
+            return self._lease(key, buffers, buffer)
+
+    def stats(self):
+        """
+        Returns pool statistics.
+
+        :return: {hits, misses, buffers, bytes}
+        """
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "buffers": sum(self.buffer_counts.values()),
+                    "bytes": sum([count * int(np.prod(key[0])) * key[1].itemsize for key, count in self.buffer_counts.items()])}
+
+    def clear(self):
+        """
+        Removes all pooled buffers and resets counters. Buffers in use are not returned to the pool.
+        """
+        with self.lock:
+            self.buffers = OrderedDict()
+            self.buffer_counts = {}
+            self.hits = 0
+            self.misses = 0
+
+    def _lease(self, key, buffers, buffer):
+        return lease_buffer(buffer, lambda: self._release(key, buffers, buffer))[0]
+
+    def _release(self, key, buffers, buffer):
+
+        # Called when a handed out buffer is no longer referenced. Dropped if its shape has been forgotten meanwhile
+        with self.lock:
+            if self.buffers.get(key) is buffers:
+                buffers.append(buffer)
+
+
+def get_pool():
+    global _buffer_pool_instance
+    return _buffer_pool_instance
+
+
+_buffer_pool_instance = BufferPool()
@@ -0,0 +1,118 @@
+import cv2
+from threading import Lock, RLock
+
+from tracking.util import buffer_pool
+from util import enum
+from util import metrics
+
+
+ImageColorspace = enum.Enum('BGR', 'GRAY', 'HSV')
+
+
+def gaussian_blur(kernel_size):
+    """
+    Returns the preprocessing operation for a Gaussian blur with the given kernel size.
+
+    :param kernel_size: Kernel width and height
+    :return: Preprocessing operation
+    """
+    return 'GAUSSIAN_BLUR', kernel_size
+
+
+def mean_shift_filtering(spatial_window_radius, color_window_radius):
+    """
+    Returns the preprocessing operation for mean shift filtering with the given window radii.
+
+    :param spatial_window_radius: Spatial window radius
+    :param color_window_radius: Color window radius
+    :return: Preprocessing operation
+    """
+    return 'MEAN_SHIFT_FILTERING', spatial_window_radius, color_window_radius
+
+
+class DerivedImageCache(object):
+    """
+    Cache of images derived from a single BGR source image by preprocessing followed by colorspace conversion.
+
+    Each derived image is calculated at most once, also when requested by several threads at the same time.
+    Derived images are shared, and must not be modified by the caller.
+    """
+
+    def __init__(self, source_image):
+        """
+        :param source_image: BGR source image
+        """
+        self.source_image = source_image
+
+        self.lock = RLock()
+        self.images = {}
+        self.image_locks = {}
+
+    def image(self, colorspace=ImageColorspace.BGR, preprocessing=None):
+        """
+        Returns the source image preprocessed and converted to the given colorspace.
+
+        :param colorspace: Colorspace (of type ImageColorspace enum)
+        :param preprocessing: (Optional) Preprocessing operation, fx. gaussian_blur(7)
+        :return: Derived image
+        """
+        if colorspace == ImageColorspace.BGR and preprocessing is None:
+            return self.source_image
+
+        key = (colorspace, preprocessing)
+
+        with self.lock:
+            if key in self.images:
+                return self.images[key]
+            image_lock = self.image_locks.setdefault(key, Lock())
+
+        # Derive image while only blocking threads requesting the same image
+        with image_lock:
+            with self.lock:
+                if key in self.images:
+                    return self.images[key]
+
+            if colorspace == ImageColorspace.BGR:
+                with metrics.get_metrics().timer("image_preprocess_seconds", operation=preprocessing[0]):
+                    image = self.preprocess_image(self.source_image, preprocessing)
+            else:
+                source_image = self.image(ImageColorspace.BGR, preprocessing)
+                with metrics.get_metrics().timer("image_convert_seconds", colorspace=ImageColorspace.names[colorspace]):
+                    image = self.convert_image(source_image, colorspace)
+
+            with self.lock:
+                self.images[key] = image
+
+            return image
+
+    def derived_images(self):
+        """
+        Returns all images derived so far, excluding the source image.
+
+        :return: List of derived images
+        """
+        with self.lock:
+            return list(self.images.values())
+
+    def preprocess_image(self, image, preprocessing):
+        output_image = buffer_pool.get_pool().acquire(image.shape, image.dtype)
+
+        if preprocessing[0] == 'GAUSSIAN_BLUR':
+            kernel_size = preprocessing[1]
+            return cv2.GaussianBlur(image, (kernel_size, kernel_size), 0, dst=output_image)
+
+        if preprocessing[0] == 'MEAN_SHIFT_FILTERING':
+            return cv2.pyrMeanShiftFiltering(image, preprocessing[1], preprocessing[2], dst=output_image)
+
+        raise Exception("Unknown preprocessing operation: %s" % str(preprocessing))
+
+    def convert_image(self, image, colorspace):
+        if colorspace == ImageColorspace.GRAY:
+            output_image = buffer_pool.get_pool().acquire(image.shape[:2], image.dtype)
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=output_image)
+
+        if colorspace == ImageColorspace.HSV:
+            output_image = buffer_pool.get_pool().acquire(image.shape, image.dtype)
+            return cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=output_image)
+
+        raise Exception("Unknown colorspace: %s" % str(colorspace))
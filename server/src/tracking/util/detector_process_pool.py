@@ -0,0 +1,173 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from tracking.util import shared_frame_ring
+from tracking.util.shared_frame_ring import SharedFrameRing
+from util import metrics
+
+
+class DetectorProcessPool(object):
+    """
+    Pool of worker processes running detectors whose work is mostly pure Python loops, which would otherwise hold the
+    GIL and serialize all request workers.
+
+    Input images are published once per board snapshot and area into a shared memory frame ring, so workers receive
+    frame handles rather than pickled images. The detector itself (which must be small and picklable) is sent with
+    every task, and only its result is sent back.
+
+    The pool is stopped by default, in which case detectors run in the calling thread. If a worker process dies, the
+    pool is stopped and detectors run in the calling thread until it is started again.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.executor = None
+        self.frame_ring = None
+        self.processes = 0
+
+        self.task_count = 0
+        self.fallback_count = 0
+        self.failure_count = 0
+
+    def start(self, processes=None, slot_count=None):
+        """
+        Starts the worker processes.
+
+        :param processes: (Optional) Number of worker processes. Defaults to the number of CPUs
+        :param slot_count: (Optional) Number of frame ring slots. Defaults to twice the number of processes
+        """
+        with self.lock:
+            if self.executor is not None:
+                return
+
+            self.processes = processes if processes is not None else multiprocessing.cpu_count()
+
+            # Frame ring is created first, since it requires Python 3.8 or later
+            self.frame_ring = SharedFrameRing(slot_count if slot_count is not None else self.processes * 2)
+
+            # Workers are spawned rather than forked, since forking a process with running threads is unsafe
+            self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        """
+        Stops the worker processes, after running tasks have completed, and frees the frame ring.
+        """
+        with self.lock:
+            executor, frame_ring = self.executor, self.frame_ring
+            self.executor = None
+            self.frame_ring = None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+            frame_ring.close()
+
+    def stop_broken(self, executor):
+        """
+        Stops the pool after a worker process has died, without waiting for running tasks, which fail. Does nothing if
+        the pool has been stopped or restarted since.
+
+        :param executor: Executor of the broken pool
+        """
+        with self.lock:
+            if self.executor is not executor:
+                return
+
+            frame_ring = self.frame_ring
+            self.executor = None
+            self.frame_ring = None
+            self.failure_count += 1
+
+        print("Detector process pool broken, running detectors in request threads")
+        metrics.get_metrics().counter("detector_pool_failures").increment()
+
+        executor.shutdown(wait=False)
+        frame_ring.close()
+
+    def is_running(self):
+        return self.executor is not None
+
+    def detect(self, detector, key, image):
+        """
+        Runs detect_in_image of the detector in a worker process and waits for the result.
+
+        :param detector: Detector
+        :param key: Hashable key identifying the image, fx. (snapshot id, area rect, size)
+        :param image: Input image
+        :return: (True, result), or (False, None) if the pool is not running, is stopped while submitting, is broken or
+                 all frame slots are in use, in which case the caller should run the detector itself
+        """
+        with self.lock:
+            executor, frame_ring = self.executor, self.frame_ring
+
+        if executor is None:
+            return False, None
+
+        handle = frame_ring.publish(key, image)
+        if handle is None:
+            return self.fall_back()
+
+        future = None
+        try:
+            with metrics.get_metrics().timer("detector_pool_task_seconds", detector=type(detector).__name__):
+                future = executor.submit(detect_in_worker, detector, handle)
+
+                with self.lock:
+                    self.task_count += 1
+
+                return True, future.result()
+
+        except BrokenProcessPool:
+            self.stop_broken(executor)
+            return self.fall_back()
+
+        except RuntimeError:
+
+            # Submitted after the pool was stopped. Exceptions raised by the detector itself come from future.result()
+            if future is None:
+                return self.fall_back()
+            raise
+
+        finally:
+            frame_ring.release(handle)
+
+    def fall_back(self):
+        with self.lock:
+            self.fallback_count += 1
+        metrics.get_metrics().counter("detector_pool_fallbacks").increment()
+
+        return False, None
+
+    def stats(self):
+        """
+        Returns pool statistics.
+
+        :return: {running, processes, tasks, fallbacks, failures, frameRing}
+        """
+        with self.lock:
+            stats = {"running": self.executor is not None,
+                     "processes": self.processes,
+                     "tasks": self.task_count,
+                     "fallbacks": self.fallback_count,
+                     "failures": self.failure_count}
+            frame_ring = self.frame_ring
+
+        stats["frameRing"] = frame_ring.stats() if frame_ring is not None else None
+
+        return stats
+
+
+def detect_in_worker(detector, handle):
+    """
+    Runs a detector on a frame in the shared frame ring. Called in worker processes.
+    """
+    return detector.detect_in_image(shared_frame_ring.attach(handle))
+
+
+def get_pool():
+    global _detector_process_pool_instance
+    return _detector_process_pool_instance
+
+
+_detector_process_pool_instance = DetectorProcessPool()
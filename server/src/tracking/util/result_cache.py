@@ -0,0 +1,108 @@
+import copy
+from collections import OrderedDict
+from threading import Lock, RLock
+
+from util import metrics
+
+
+class ResultCache(object):
+    """
+    Small bounded cache of detector results, evicting the least recently used results.
+
+    Each result is calculated at most once, also when requested by several threads at the same time. Every caller gets
+    its own copy of the result, since results are handed on to several requests and connections, which may modify
+    them.
+    """
+
+    def __init__(self, max_entries=64):
+        """
+        :param max_entries: Maximum number of results to keep
+        """
+        self.max_entries = max_entries
+
+        self.lock = RLock()
+        self.results = OrderedDict()
+        self.result_locks = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def result(self, key, calculate_function):
+        """
+        Returns the cached result for the given key, or calculates and caches it if not present.
+
+        :param key: Hashable key
+        :param calculate_function: Function calculating the result, called without arguments
+        :return: Copy of result
+        """
+        with self.lock:
+            if key in self.results:
+                return self._hit(key)
+            result_lock = self.result_locks.setdefault(key, Lock())
+
+        # Calculate result while only blocking threads requesting the same result
+        with result_lock:
+            with self.lock:
+                if key in self.results:
+                    return self._hit(key)
+
+            try:
+                result = calculate_function()
+            except BaseException:
+
+                # Forget result lock. Waiting threads then calculate the result themselves
+                with self.lock:
+                    self._remove_result_lock(key, result_lock)
+                raise
+
+            # Store result before forgetting the result lock, so that later callers find either of them
+            with self.lock:
+                self.misses += 1
+                metrics.get_metrics().counter("result_cache_misses").increment()
+                self.results[key] = result
+
+                # Forget least recently used results
+                while len(self.results) > self.max_entries:
+                    self.results.popitem(last=False)
+
+                self._remove_result_lock(key, result_lock)
+
+            return copy.deepcopy(result)
+
+    def stats(self):
+        """
+        Returns cache statistics.
+
+        :return: {hits, misses, entries}
+        """
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "entries": len(self.results)}
+
+    def clear(self):
+        """
+        Removes all cached results and resets counters.
+        """
+        with self.lock:
+            self.results = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def _remove_result_lock(self, key, result_lock):
+        if self.result_locks.get(key) is result_lock:
+            del self.result_locks[key]
+
+    def _hit(self, key):
+        self.hits += 1
+        metrics.get_metrics().counter("result_cache_hits").increment()
+        self.results.move_to_end(key)
+        return copy.deepcopy(self.results[key])
+
+
+def get_cache():
+    global _result_cache_instance
+    return _result_cache_instance
+
+
+_result_cache_instance = ResultCache()
@@ -0,0 +1,213 @@
+import itertools
+import os
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+
+class FrameHandle(object):
+    """
+    Reference to a frame in a shared frame ring, small enough to send to other processes.
+    """
+
+    def __init__(self, name, slot, shape, dtype):
+        self.name = name
+        self.slot = slot
+        self.shape = shape
+        self.dtype = dtype
+
+
+class SharedFrameRing(object):
+    """
+    Ring of shared memory slots, each holding one frame (fx. a board area image), for passing frames to worker
+    processes without pickling them.
+
+    A frame is published once per key, and all callers publishing the same key while it is still in the ring get the
+    same handle. A slot is only reused when all handles to it have been released. Slots grow to fit the largest frame
+    published to them.
+
+    Closing the ring frees all slots not in use, and slots still in use when their last handle is released.
+    """
+
+    def __init__(self, slot_count=8):
+        """
+        :param slot_count: Number of slots
+        """
+        self.slot_count = slot_count
+        self.shared_memory = shared_memory_module()
+
+        self.lock = Lock()
+        self.slots = [None] * slot_count
+        self.slot_keys = [None] * slot_count
+        self.slot_handles = [None] * slot_count
+        self.slot_references = [0] * slot_count
+        self.next_slot = 0
+        self.closed = False
+
+        self.published_count = 0
+        self.reused_count = 0
+        self.full_count = 0
+
+    def publish(self, key, image):
+        """
+        Publishes a frame, or returns the handle of the frame already published with the given key. The handle must
+        be released when no longer used.
+
+        :param key: Hashable key identifying the frame, fx. (snapshot id, area rect, size)
+        :param image: Image
+        :return: Frame handle, or None if all slots are in use or the ring is closed
+        """
+        with self.lock:
+            if self.closed:
+                return None
+
+            # Frame already published
+            for slot in range(0, self.slot_count):
+                if self.slot_keys[slot] == key:
+                    self.slot_references[slot] += 1
+                    self.reused_count += 1
+                    return self.slot_handles[slot]
+
+            # Find free slot
+            slot = self._free_slot()
+            if slot is None:
+                self.full_count += 1
+                return None
+
+            # Grow slot if needed
+            if self.slots[slot] is None or self.slots[slot].size < image.nbytes:
+                self._close_slot(slot)
+                self.slots[slot] = self.shared_memory.SharedMemory(name="frame_ring_%i_%i" % (os.getpid(), next(_segment_ids)),
+                                                                   create=True, size=max(1, image.nbytes))
+
+            # Copy frame to slot
+            shared_image = np.ndarray(image.shape, dtype=image.dtype, buffer=self.slots[slot].buf)
+            shared_image[:] = image
+
+            self.slot_keys[slot] = key
+            self.slot_handles[slot] = FrameHandle(self.slots[slot].name, slot, image.shape, image.dtype.str)
+            self.slot_references[slot] = 1
+            self.published_count += 1
+
+            return self.slot_handles[slot]
+
+    def release(self, handle):
+        """
+        Releases a frame handle returned by publish.
+
+        :param handle: Frame handle
+        """
+        with self.lock:
+            if self.slot_handles[handle.slot] is handle:
+                self.slot_references[handle.slot] -= 1
+
+                if self.closed and self.slot_references[handle.slot] == 0:
+                    self._free_closed_slot(handle.slot)
+
+    def close(self):
+        """
+        Closes the ring. Frees all slots, waiting with slots in use until all their handles have been released.
+        """
+        with self.lock:
+            self.closed = True
+
+            for slot in range(0, self.slot_count):
+                if self.slot_references[slot] == 0:
+                    self._free_closed_slot(slot)
+
+    def stats(self):
+        """
+        Returns ring statistics.
+
+        :return: {slots, published, reused, full, bytes}
+        """
+        with self.lock:
+            return {"slots": self.slot_count,
+                    "published": self.published_count,
+                    "reused": self.reused_count,
+                    "full": self.full_count,
+                    "bytes": sum([slot.size for slot in self.slots if slot is not None])}
+
+    def _free_slot(self):
+        for i in range(0, self.slot_count):
+            slot = (self.next_slot + i) % self.slot_count
+            if self.slot_references[slot] == 0:
+                self.next_slot = (slot + 1) % self.slot_count
+                return slot
+        return None
+
+    def _free_closed_slot(self, slot):
+        self._close_slot(slot)
+        self.slot_keys[slot] = None
+        self.slot_handles[slot] = None
+
+    def _close_slot(self, slot):
+        if self.slots[slot] is not None:
+            self.slots[slot].close()
+            self.slots[slot].unlink()
+            self.slots[slot] = None
+
+
+# Segment names are unique within the process, since slots of a closed ring may still be in use when a new ring is
+# created
+_segment_ids = itertools.count(1)
+
+# Shared memory segments attached by this (worker) process, most recently used last
+_attached_segments = OrderedDict()
+
+
+def attach(handle, max_attached_segments=16):
+    """
+    Returns a read-only view of the frame referenced by a handle, in a worker process. Segments stay attached for
+    subsequent frames in the same slot.
+
+    :param handle: Frame handle
+    :param max_attached_segments: Maximum number of segments to keep attached
+    :return: Image
+    """
+    segment = _attached_segments.pop(handle.name, None)
+    if segment is None:
+        segment = attach_segment(handle.name)
+    _attached_segments[handle.name] = segment
+
+    # Detach segments of slots that have grown or been freed
+    while len(_attached_segments) > max_attached_segments:
+        try:
+            _attached_segments.popitem(last=False)[1].close()
+        except BufferError:
+
+            # Image of a previous task still referenced, the segment is closed when it is garbage collected
+            pass
+
+    image = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=segment.buf)
+    image.flags.writeable = False
+
+    return image
+
+
+def attach_segment(name):
+    """
+    Attaches an existing shared memory segment without taking ownership of it, so that it is not unlinked when the
+    worker process exits.
+    """
+    try:
+        return shared_memory_module().SharedMemory(name=name, track=False)
+    except TypeError:
+
+        # Before Python 3.13, attached segments are always registered with the resource tracker. Worker processes share
+        # the resource tracker of the process owning the segment, so the registration is a no-op and must be kept
+        return shared_memory_module().SharedMemory(name=name)
+
+
+def shared_memory_module():
+    """
+    Returns the multiprocessing.shared_memory module, which is imported when first used rather than when the server
+    starts, since it requires Python 3.8 or later.
+    """
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise Exception("Shared frame ring requires Python 3.8 or later")
+
+    return shared_memory
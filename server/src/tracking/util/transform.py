@@ -57,13 +57,12 @@ def distance(p1, p2):
     return math.sqrt(((p1[0] - p2[0]) ** 2) + ((p1[1] - p2[1]) ** 2))
 
 
-def transform_image(image, corners):
+def perspective_transform_from_corners(corners):
     """
-    Perspective transform source image into rectangle.
+    Calculates the perspective transform from source image into rectangle.
 
-    :param image: Source image to transform
     :param corners: Corners in source image
-    :return: Transformed image
+    :return: (perspective transform, (width, height)) where (width, height) is the size of the rectangle
     """
     source_points = order_corners(corners)
     dest_points = warp_corners(source_points)
@@ -71,4 +70,52 @@ def transform_image(image, corners):
     perspective_transform = cv2.getPerspectiveTransform(np.array(source_points, np.float32),
                                                         np.array(dest_points, np.float32))
 
-    return cv2.warpPerspective(image, perspective_transform, (dest_points[2][0], dest_points[2][1]))
+    return perspective_transform, (dest_points[2][0], dest_points[2][1])
+
+
+def transform_image(image, corners):
+    """
+    Perspective transform source image into rectangle.
+
+    :param image: Source image to transform
+    :param corners: Corners in source image
+    :return: Transformed image
+    """
+    perspective_transform, size = perspective_transform_from_corners(corners)
+
+    return cv2.warpPerspective(image, perspective_transform, size)
+
+
+def perspective_remap_maps(perspective_transform, size, dest_size=None, dest_rect=None):
+    """
+    Calculates fixed-point remap maps equivalent to warping with the given perspective transform into an image of
+    the given size, followed by resizing to the destination size and optionally cropping to the destination rect.
+
+    :param perspective_transform: Perspective transform from source image to rectangle
+    :param size: Size (width, height) of transformed rectangle
+    :param dest_size: (Optional) Size (width, height) of output image. Defaults to size
+    :param dest_rect: (Optional) Rect (x1, y1, x2, y2) in pixels of output image to calculate maps for. Defaults to whole image
+    :return: (map1, map2) to use with cv2.remap
+    """
+    width, height = size
+    dest_width, dest_height = dest_size if dest_size is not None else size
+    x1, y1, x2, y2 = dest_rect if dest_rect is not None else (0, 0, dest_width, dest_height)
+
+    # Map output pixel centers to rectangle pixel centers
+    scale_x = float(width) / float(dest_width)
+    scale_y = float(height) / float(dest_height)
+
+    scale_transform = np.array([[scale_x, 0.0, (scale_x - 1.0) / 2.0],
+                                [0.0, scale_y, (scale_y - 1.0) / 2.0],
+                                [0.0, 0.0, 1.0]])
+
+    # Map output pixels to source image
+    inverse_transform = np.linalg.inv(perspective_transform).dot(scale_transform)
+
+    xs, ys = np.meshgrid(np.arange(x1, x2, dtype=np.float64), np.arange(y1, y2, dtype=np.float64))
+
+    w = inverse_transform[2][0] * xs + inverse_transform[2][1] * ys + inverse_transform[2][2]
+    map_x = ((inverse_transform[0][0] * xs + inverse_transform[0][1] * ys + inverse_transform[0][2]) / w).astype(np.float32)
+    map_y = ((inverse_transform[1][0] * xs + inverse_transform[1][1] * ys + inverse_transform[1][2]) / w).astype(np.float32)
+
+    return cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
@@ -0,0 +1,261 @@
+import collections
+import contextlib
+import time
+from threading import Lock, RLock
+
+from util import tracing
+
+
+class Histogram(object):
+    """
+    Histogram of durations (or other values), keeping a sliding window of the most recent samples for percentiles.
+    """
+
+    def __init__(self, window_size=1024):
+        """
+        :param window_size: Number of most recent samples to calculate percentiles from
+        """
+        self.lock = Lock()
+        self.samples = collections.deque(maxlen=window_size)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        with self.lock:
+            self.samples.append(value)
+            self.count += 1
+            self.sum += value
+
+    def stats(self):
+        """
+        Returns histogram statistics. Percentiles and max are calculated from the most recent samples only.
+
+        :return: {count, sum, mean, p50, p95, p99, max}
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+            count = self.count
+            total = self.sum
+
+        return {"count": count,
+                "sum": total,
+                "mean": total / count if count > 0 else 0.0,
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+                "max": samples[-1] if len(samples) > 0 else 0.0}
+
+
+class Counter(object):
+    """
+    Monotonically increasing counter.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.value = 0
+
+    def increment(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def stats(self):
+        return self.value
+
+
+class Gauge(object):
+    """
+    Value which can go up and down, either set explicitly or read from a function when collected.
+    """
+
+    def __init__(self, function=None):
+        """
+        :param function: (Optional) Function returning current value
+        """
+        self.function = function
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def stats(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Rate(object):
+    """
+    Event rate, fx. frames per second, measured over a sliding time window.
+    """
+
+    def __init__(self, window=5.0):
+        """
+        :param window: Time window in seconds to measure rate over
+        """
+        self.window = window
+        self.lock = Lock()
+        self.timestamps = collections.deque()
+        self.count = 0
+
+    def mark(self):
+        now = time.time()
+        with self.lock:
+            self.count += 1
+            self.timestamps.append(now)
+            self._forget_old(now)
+
+    def stats(self):
+        """
+        Returns rate statistics.
+
+        :return: {count, perSecond}
+        """
+        with self.lock:
+            self._forget_old(time.time())
+            return {"count": self.count,
+                    "perSecond": len(self.timestamps) / self.window}
+
+    def _forget_old(self, now):
+        while len(self.timestamps) > 0 and self.timestamps[0] < now - self.window:
+            self.timestamps.popleft()
+
+
+class MetricsRegistry(object):
+    """
+    Registry of all metrics of the server. Metrics are identified by name and optional labels, fx.
+    histogram("detector_seconds", detector="HandDetector").
+    """
+
+    def __init__(self):
+        self.lock = RLock()
+        self.metrics = collections.OrderedDict()
+
+    def histogram(self, name, **labels):
+        return self._metric(Histogram, name, labels)
+
+    def counter(self, name, **labels):
+        return self._metric(Counter, name, labels)
+
+    def rate(self, name, **labels):
+        return self._metric(Rate, name, labels)
+
+    def gauge(self, name, function=None, **labels):
+        gauge = self._metric(Gauge, name, labels)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """
+        Records the time spent in the with-block in the given histogram. The time is also recorded as a trace span
+        named after the histogram, without the "_seconds" suffix.
+
+        Usage:
+            with metrics.get_metrics().timer("board_warp_seconds"):
+                ...
+        """
+        histogram = self.histogram(name, **labels)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start_time
+            histogram.record(duration)
+            tracing.get_tracer().record(name[:-len("_seconds")] if name.endswith("_seconds") else name, start_time, duration, labels)
+
+    def stats(self):
+        """
+        Returns statistics of all metrics.
+
+        :return: {name: {labels: stats}}, with labels formatted as "label=value,..." and empty if no labels
+        """
+        with self.lock:
+            metrics = list(self.metrics.items())
+
+        stats = collections.OrderedDict()
+        for (name, labels), metric in metrics:
+            stats.setdefault(name, collections.OrderedDict())[",".join(["%s=%s" % label for label in labels])] = metric.stats()
+        return stats
+
+    def prometheus_text(self):
+        """
+        Returns all metrics in Prometheus text exposition format. Histograms are exported as summaries.
+
+        :return: Metrics text
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.items(), key=lambda item: item[0])
+
+        lines = []
+        declared_names = set()
+
+        for (name, labels), metric in metrics:
+            if isinstance(metric, Histogram):
+                self._declare(lines, declared_names, name, "summary")
+                stats = metric.stats()
+                for quantile, key in [("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")]:
+                    lines.append("%s%s %s" % (name, label_string(labels + (("quantile", quantile),)), repr(float(stats[key]))))
+                lines.append("%s_sum%s %s" % (name, label_string(labels), repr(float(stats["sum"]))))
+                lines.append("%s_count%s %i" % (name, label_string(labels), stats["count"]))
+
+            elif isinstance(metric, Counter):
+                self._declare(lines, declared_names, name, "counter")
+                lines.append("%s%s %i" % (name, label_string(labels), metric.stats()))
+
+            elif isinstance(metric, Rate):
+                stats = metric.stats()
+                self._declare(lines, declared_names, name + "_total", "counter")
+                lines.append("%s_total%s %i" % (name, label_string(labels), stats["count"]))
+                self._declare(lines, declared_names, name + "_per_second", "gauge")
+                lines.append("%s_per_second%s %s" % (name, label_string(labels), repr(float(stats["perSecond"]))))
+
+            elif isinstance(metric, Gauge):
+                self._declare(lines, declared_names, name, "gauge")
+                lines.append("%s%s %s" % (name, label_string(labels), repr(float(metric.stats()))))
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.metrics = collections.OrderedDict()
+
+    def _metric(self, metric_class, name, labels):
+        key = (name, tuple(sorted([(label, str(value)) for label, value in labels.items()])))
+
+        with self.lock:
+            if key not in self.metrics:
+                self.metrics[key] = metric_class()
+            return self.metrics[key]
+
+    def _declare(self, lines, declared_names, name, metric_type):
+        if name not in declared_names:
+            declared_names.add(name)
+            lines.append("# TYPE %s %s" % (name, metric_type))
+
+
+def percentile(sorted_samples, fraction):
+    """
+    Returns the given percentile of the samples, using nearest rank.
+
+    :param sorted_samples: Sorted samples
+    :param fraction: Percentile as fraction, fx. 0.95
+    :return: Percentile, or 0.0 if no samples
+    """
+    if len(sorted_samples) == 0:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def label_string(labels):
+    if len(labels) == 0:
+        return ""
+    return "{%s}" % ",".join(['%s="%s"' % (label, value) for label, value in labels])
+
+
+def get_metrics():
+    global _metrics_instance
+    return _metrics_instance
+
+
+_metrics_instance = MetricsRegistry()
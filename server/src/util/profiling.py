@@ -0,0 +1,228 @@
+import collections
+import contextlib
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from threading import Condition, Lock, Thread, local
+
+
+# Before Python 3.12, each thread can run its own cProfile profiler. Since then, cProfile uses sys.monitoring, which
+# allows only one profiler per process, so only stacks are sampled
+THREAD_PROFILES_SUPPORTED = sys.version_info < (3, 12)
+
+
+class Profiler(object):
+    """
+    On-demand profiler of the threads running detectors and requests.
+
+    While running, code wrapped in profile() is profiled with a cProfile profiler per thread (if supported, see
+    THREAD_PROFILES_SUPPORTED), and the stacks of the threads inside profile() are sampled at a fixed interval. When
+    stopped, the merged profiles are written as pstats file, and the sampled stacks in collapsed format
+    ("frame;frame;frame count" per line), which can be turned into a flamegraph with fx. flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, sample_interval=0.005, stop_timeout=5.0):
+        """
+        :param sample_interval: Time in seconds between stack samples
+        :param stop_timeout: Maximum time in seconds to wait for profiled threads to leave profile() when stopping
+        """
+        self.sample_interval = sample_interval
+        self.stop_timeout = stop_timeout
+
+        self.lock = Lock()
+        self.threads_left = Condition(self.lock)
+        self.thread_state = local()
+
+        self.running = False
+        self.output_directory = None
+        self.start_time = None
+
+        self.profiles = []
+        self.profiled_threads = {}
+        self.profiled_thread_names = set()
+        self.stack_counts = collections.Counter()
+        self.sample_count = 0
+
+    def start(self, output_directory):
+        """
+        Starts profiling.
+
+        :param output_directory: Directory to write profiles to when stopped
+        :return: False if already running
+        """
+        with self.lock:
+            if self.running:
+                return False
+
+            self.running = True
+            self.output_directory = output_directory
+            self.start_time = time.time()
+
+            self.profiles = []
+            self.profiled_threads = {}
+            self.profiled_thread_names = set()
+            self.stack_counts = collections.Counter()
+            self.sample_count = 0
+
+        thread = Thread(target=self._sample, args=(), name="ProfilerSampler")
+        thread.daemon = True
+        thread.start()
+
+        return True
+
+    def stop(self):
+        """
+        Stops profiling and writes the profiles to the output directory: profile.pstats (merged cProfile
+        statistics of all threads) and stacks.collapsed (sampled stacks).
+
+        :return: {pstatsFilename, collapsedFilename, duration, sampleCount, threadCount}, or None if not running
+        """
+        with self.lock:
+            if not self.running:
+                return None
+
+            self.running = False
+
+            # Wait for other threads to leave profile(), so their profilers are disabled before stats are taken
+            current_thread_id = threading.get_ident()
+            self.threads_left.wait_for(lambda: len(set(self.profiled_threads.keys()) - {current_thread_id}) == 0, self.stop_timeout)
+
+            # Skip profiles of threads still profiling, fx. the calling thread
+            profiles = [profile for thread_id, profile in self.profiles if thread_id not in self.profiled_threads]
+            thread_count = len(self.profiled_thread_names)
+            stack_counts = collections.Counter(self.stack_counts)
+            sample_count = self.sample_count
+            duration = time.time() - self.start_time
+
+        os.makedirs(self.output_directory, exist_ok=True)
+
+        pstats_filename = os.path.join(self.output_directory, "profile.pstats")
+        collapsed_filename = os.path.join(self.output_directory, "stacks.collapsed")
+
+        # Write merged profiles of threads which have been profiled
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if len(profile.stats) == 0:
+                continue
+
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+
+        if stats is not None:
+            stats.dump_stats(pstats_filename)
+        else:
+            pstats_filename = None
+
+        # Write sampled stacks
+        with open(collapsed_filename, "w") as collapsed_file:
+            for stack, count in stack_counts.most_common():
+                collapsed_file.write("%s %i\n" % (stack, count))
+
+        return {"pstatsFilename": pstats_filename,
+                "collapsedFilename": collapsed_filename,
+                "duration": duration,
+                "sampleCount": sample_count,
+                "threadCount": thread_count}
+
+    def is_running(self):
+        return self.running
+
+    @contextlib.contextmanager
+    def profile(self):
+        """
+        Profiles the calling thread while in the with-block, if profiling is running.
+
+        Usage:
+            with profiling.get_profiler().profile():
+                ...
+        """
+        if not self.running or getattr(self.thread_state, "depth", 0) > 0:
+            yield
+            return
+
+        thread = threading.current_thread()
+
+        self.thread_state.depth = 1
+        with self.lock:
+            self.profiled_threads[thread.ident] = thread.name
+            self.profiled_thread_names.add(thread.name)
+
+        profile = self._thread_profile() if THREAD_PROFILES_SUPPORTED else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+
+                # Another profiler is active, fx. the process is run with cProfile. Stacks are still sampled
+                profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+            with self.lock:
+                self.profiled_threads.pop(thread.ident, None)
+                self.threads_left.notify_all()
+            self.thread_state.depth = 0
+
+    def _thread_profile(self):
+        """
+        Returns the profiler of the calling thread for the current profiling run.
+        """
+        with self.lock:
+            if getattr(self.thread_state, "start_time", None) != self.start_time:
+                self.thread_state.start_time = self.start_time
+                self.thread_state.profile = cProfile.Profile()
+                self.profiles.append((threading.get_ident(), self.thread_state.profile))
+            return self.thread_state.profile
+
+    def _sample(self):
+        while self.running:
+            time.sleep(self.sample_interval)
+
+            with self.lock:
+                profiled_threads = dict(self.profiled_threads)
+
+            frames = sys._current_frames()
+
+            stacks = []
+            for thread_id, thread_name in profiled_threads.items():
+                if thread_id in frames:
+                    stacks.append(collapsed_stack(thread_name, frames[thread_id]))
+
+            with self.lock:
+                self.stack_counts.update(stacks)
+                self.sample_count += 1
+
+
+def collapsed_stack(thread_name, frame):
+    """
+    Returns the stack of the frame in collapsed format, outermost frame first, prefixed with the thread name.
+
+    :param thread_name: Thread name
+    :param frame: Innermost frame
+    :return: Frames separated by semicolons
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append("%s (%s:%i)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+
+    names.append(thread_name.replace(" ", "_"))
+    return ";".join(reversed(names))
+
+
+def get_profiler():
+    global _profiler_instance
+    return _profiler_instance
+
+
+_profiler_instance = Profiler()
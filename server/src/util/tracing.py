@@ -0,0 +1,209 @@
+import collections
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from threading import Lock
+
+
+class Trace(object):
+    """
+    Trace of a single camera frame flowing through the pipeline, from capture to results sent to clients.
+
+    Field variables:
+    trace_id -- Monotonically increasing trace ID
+    capture_timestamp -- Capture timestamp (as returned by time.time())
+    """
+
+    def __init__(self, trace_id, capture_timestamp=None):
+        self.trace_id = trace_id
+        self.capture_timestamp = capture_timestamp if capture_timestamp is not None else time.time()
+
+
+class Tracer(object):
+    """
+    Bounded in-memory buffer of timed spans, which can be dumped as a Chrome/Perfetto trace-event JSON file.
+
+    Spans are tagged with the trace ID of the frame being processed (see trace_context), so individual frames can be
+    followed across threads.
+    """
+
+    def __init__(self, max_spans=20000, enabled=True):
+        """
+        :param max_spans: Maximum number of spans kept. Oldest spans are forgotten first
+        :param enabled: If False, spans are not recorded
+        """
+        self.enabled = enabled
+        self.lock = Lock()
+        self.spans = collections.deque(maxlen=max_spans)
+        self.thread_names = {}
+
+    def record(self, name, start_time, duration, args=None):
+        """
+        Records a span in the current trace context.
+
+        :param name: Span name
+        :param start_time: Start time (as returned by time.perf_counter())
+        :param duration: Duration in seconds
+        :param args: (Optional) Dict of span arguments
+        """
+        if not self.enabled:
+            return
+
+        trace = current_trace()
+        thread = threading.current_thread()
+
+        with self.lock:
+            self.spans.append((name, start_time, duration, thread.ident, trace.trace_id if trace is not None else None, args))
+            self.thread_names[thread.ident] = thread.name
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """
+        Records the time spent in the with-block as a span.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start_time, time.perf_counter() - start_time, args)
+
+    def trace_events(self):
+        """
+        Returns the recorded spans in Chrome trace-event format. Spans of the same frame are linked by flow events.
+
+        :return: Trace-event dict {traceEvents, displayTimeUnit}
+        """
+        with self.lock:
+            spans = list(self.spans)
+            thread_names = dict(self.thread_names)
+
+        process_id = os.getpid()
+        events = []
+
+        # Thread names
+        for thread_id, thread_name in thread_names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": process_id, "tid": thread_id, "args": {"name": thread_name}})
+
+        # Spans
+        spans_by_trace_id = collections.OrderedDict()
+        for name, start_time, duration, thread_id, trace_id, args in spans:
+            event_args = dict(args) if args else {}
+            if trace_id is not None:
+                event_args["traceId"] = trace_id
+                spans_by_trace_id.setdefault(trace_id, []).append((start_time, thread_id))
+
+            events.append({"name": name,
+                           "cat": "pipeline",
+                           "ph": "X",
+                           "ts": start_time * 1000000.0,
+                           "dur": duration * 1000000.0,
+                           "pid": process_id,
+                           "tid": thread_id,
+                           "args": event_args})
+
+        # Flow events linking spans of same frame
+        for trace_id, trace_spans in spans_by_trace_id.items():
+            if len(trace_spans) < 2:
+                continue
+
+            trace_spans = sorted(trace_spans)
+            for index, (start_time, thread_id) in enumerate(trace_spans):
+                phase = "s" if index == 0 else ("f" if index == len(trace_spans) - 1 else "t")
+                events.append({"name": "frame",
+                               "cat": "frame",
+                               "ph": phase,
+                               "bp": "e",
+                               "id": trace_id,
+                               "ts": start_time * 1000000.0,
+                               "pid": process_id,
+                               "tid": thread_id})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, filename):
+        """
+        Writes the recorded spans to a Chrome/Perfetto trace-event JSON file.
+
+        :param filename: Output filename
+        :return: Number of spans written
+        """
+        trace_events = self.trace_events()
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(filename, "w") as trace_file:
+            json.dump(trace_events, trace_file)
+
+        return len([event for event in trace_events["traceEvents"] if event["ph"] == "X"])
+
+    def span_count(self):
+        return len(self.spans)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+
+
+def next_trace():
+    """
+    Returns a new trace for a frame captured now.
+
+    :return: Trace
+    """
+    with _trace_id_lock:
+        return Trace(next(_trace_ids))
+
+
+def current_trace():
+    """
+    Returns the trace of the frame currently being processed by the calling thread or task.
+
+    :return: Trace, or None
+    """
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace_context(trace):
+    """
+    Sets the trace of the frame being processed while in the with-block. Spans recorded meanwhile are tagged with
+    its trace ID.
+
+    :param trace: Trace, or None
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+async def run_in_trace_context(coroutine, trace):
+    """
+    Runs the coroutine with the given trace as current trace.
+
+    :param coroutine: Coroutine
+    :param trace: Trace, or None
+    :return: Result of coroutine
+    """
+    with trace_context(trace):
+        return await coroutine
+
+
+def get_tracer():
+    global _tracer_instance
+    return _tracer_instance
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+_trace_ids = itertools.count(1)
+_trace_id_lock = Lock()
+
+_tracer_instance = Tracer()